@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import math
+import os
+from results_store import *
+from stats import *
+
+
+# Metrics compared between the result sets, and whether higher (1) or lower
+# (-1) is better
+# Every category of the breakdown tables is compared as well; those are shares
+# of the CPU time, so a change is neither better nor worse (0)
+COMPARED_METRICS = [
+    ("throughput (Gbps)", 1),
+    ("throughput per core (Gbps)", 1),
+    ("sender cache miss (%)", -1),
+    ("receiver cache miss (%)", -1),
+]
+
+# Fewest trials on each side for a change to be tested; with 3, even the most
+# extreme split of the trials gives p = 0.1 (see permutation_test)
+MIN_TESTED_TRIALS = 4
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Find the metrics that changed between two result sets.")
+
+    # Add arguments
+    parser.add_argument("baseline", type=str, help="Results store of the baseline (e.g., before a kernel upgrade).")
+    parser.add_argument("candidate", type=str, help="Results store of the candidate.")
+    parser.add_argument("--suite", type=str, default=None, help="Only compare the runs of this suite.")
+    parser.add_argument("--fdr", type=float, default=0.05, help="Expected share of false discoveries among the flagged changes.")
+    parser.add_argument("--min-change", type=float, default=1., help="Smallest relative change flagged (%%).")
+    parser.add_argument("--all", action="store_true", help="Print every comparison, not only the flagged ones.")
+
+    # Parse and verify arguments
+    args = parser.parse_args()
+    for path in [args.baseline, args.candidate]:
+        if not os.path.exists(path):
+            print("{} doesn't exist.".format(path))
+            exit(1)
+
+    if not (0 < args.fdr < 1):
+        print("Can't set --fdr outside of (0, 1).")
+        exit(1)
+
+    if args.min_change < 0:
+        print("Can't set --min-change < 0.")
+        exit(1)
+
+    # Return parsed and verified arguments
+    return args
+
+
+# Samples of every compared metric over the trials of an experiment, keyed by
+# (metric, direction)
+def experiment_samples(store, runs):
+    samples = {}
+    for run in runs:
+        metrics = store.metrics(run)
+        for name, direction in COMPARED_METRICS:
+            if metrics.get(name) is not None:
+                samples.setdefault((name, direction), []).append(metrics[name])
+
+        for table, values in sorted(store.tables(run).items()):
+            if "breakdown" in table:
+                for category, value in sorted(values.items()):
+                    if value is not None:
+                        samples.setdefault(("{}: {}".format(table, category), 0), []).append(value)
+
+    return samples
+
+
+# The options that tell the experiments apart (those that aren't the same in
+# all of them), as "name=value"
+def distinguishing_options(keys):
+    all_params = [json.loads(params) for _, _, params in keys]
+    names = sorted(set(name for params in all_params for name in params))
+    varying = [name for name in names if len(set(json.dumps(params.get(name)) for params in all_params)) > 1]
+    return {key: ",".join("{}={}".format(name, param_text(params.get(name))) for name in varying) or "-" for key, params in zip(keys, all_params)}
+
+
+# Compare every metric of the experiments found in both result sets
+# Returns a row for each (experiment, metric)
+def compare(baseline, candidate, suite):
+    baseline_experiments = baseline.experiments(suite)
+    candidate_experiments = candidate.experiments(suite)
+    keys = sorted(set(baseline_experiments) & set(candidate_experiments))
+    options = distinguishing_options(keys)
+
+    rows = []
+    for key in keys:
+        baseline_samples = experiment_samples(baseline, baseline_experiments[key])
+        candidate_samples = experiment_samples(candidate, candidate_experiments[key])
+        for metric in baseline_samples:
+            if metric not in candidate_samples:
+                continue
+
+            a = baseline_samples[metric]
+            b = candidate_samples[metric]
+            base = mean(a)
+            change = math.nan if base == 0 else 100 * (mean(b) - base) / base
+            interval = bootstrap_difference(a, b)
+            row = {
+                "suite": key[0],
+                "label": key[1],
+                "options": options[key],
+                "metric": metric[0],
+                "direction": metric[1],
+                "baseline": base,
+                "candidate": mean(b),
+                "change": change,
+                "interval": None,
+                "effect": None,
+                "p": None,
+                "trials": "{}/{}".format(len(a), len(b)),
+            }
+            if interval is not None:
+                row["interval"] = [math.nan if base == 0 else 100 * bound / base for bound in interval]
+                row["effect"] = hedges_g(a, b)
+            if min(len(a), len(b)) >= MIN_TESTED_TRIALS:
+                row["p"] = permutation_test(a, b)
+            rows.append(row)
+
+    only = (len(set(baseline_experiments) - set(candidate_experiments)), len(set(candidate_experiments) - set(baseline_experiments)))
+    return rows, only
+
+
+# Flag the significant changes (after correcting for the number of
+# comparisons) that are at least min_change
+def flag_changes(rows, fdr, min_change):
+    tested = [row for row in rows if row["p"] is not None]
+    for row, q in zip(tested, benjamini_hochberg([row["p"] for row in tested])):
+        row["q"] = q
+
+    for row in rows:
+        row["verdict"] = ""
+        if row.get("q") is not None and row["q"] <= fdr and abs(row["change"]) >= min_change:
+            if row["direction"] == 0:
+                row["verdict"] = "changed"
+            else:
+                row["verdict"] = "regression" if row["change"] * row["direction"] < 0 else "improvement"
+
+
+def format_value(value, spec="{:.3f}"):
+    return "-" if value is None or math.isnan(value) else spec.format(value)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    baseline = ResultsStore(args.baseline)
+    candidate = ResultsStore(args.candidate)
+    rows, only = compare(baseline, candidate, args.suite)
+    baseline.close()
+    candidate.close()
+    flag_changes(rows, args.fdr, args.min_change)
+
+    print("[compare] {} comparisons, {} experiments only in the baseline, {} only in the candidate".format(len(rows), *only))
+    if any(row["p"] is None for row in rows):
+        print("[compare] experiments with fewer than {0} trials on either side aren't tested, run them with --repeat {0}".format(MIN_TESTED_TRIALS))
+
+    print("\t".join(["suite", "label", "options", "metric", "baseline", "candidate", "change (%)", "change 95% CI low (%)", "change 95% CI high (%)", "hedges' g", "q-value", "trials", "verdict"]))
+    for row in rows:
+        if args.all or row["verdict"] != "":
+            interval = row["interval"] or [None, None]
+            columns = [row["suite"], row["label"], row["options"], row["metric"]]
+            columns += [format_value(row[key]) for key in ["baseline", "candidate"]]
+            columns += [format_value(row["change"], "{:+.2f}")] + [format_value(bound, "{:+.2f}") for bound in interval]
+            columns += [format_value(row["effect"], "{:+.2f}"), format_value(row.get("q")), row["trials"], row["verdict"] or "-"]
+            print("\t".join(columns))
+
+    # Exit with an error if anything got worse
+    exit(1 if any(row["verdict"] == "regression" for row in rows) else 0)
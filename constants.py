@@ -1,8 +1,6 @@
-# System Constants
+import os
 
-# In the default IRQ affinity config mode
-# ID of the RX queue for each CPU 0-23
-CPU_TO_RX_QUEUE_MAP = [0, 6, 7, 8, 1, 9, 10, 11, 2, 12, 13, 14, 3, 15, 16, 17, 4, 18, 19, 20, 5, 21, 22, 23]
+# System Constants
 
 # DDIO IO WAYS LLC mm register location
 DDIO_REG = 0xc8b
@@ -10,6 +8,9 @@ DDIO_REG = 0xc8b
 # Port for running the coordination service
 COMM_PORT = 50000
 
+# Port the sender agents listen on for the multi-host coordinator
+AGENT_PORT = 50001
+
 # Base port of using iperf and netperf
 BASE_PORT = 30000
 ADDITIONAL_BASE_PORT = 40000
@@ -17,14 +18,38 @@ ADDITIONAL_BASE_PORT = 40000
 # Maximum number of ntuple filters
 MAX_RULE_LOC = 1023
 
-# Maximum number of CPUs/connections
-# NOTE: This should be the same as number of CPUs
-MAX_CPUS = 24
-CPUS = list(range(MAX_CPUS))
-MAX_CONNECTIONS = MAX_CPUS
+# Maximum number of connections
+# NOTE: This must be the same on both hosts, the ports of the flows depend on it
+# (the CPUs of each host are discovered by topology.py)
+MAX_CONNECTIONS = 24
 MAX_RPCS = 24
 
+# Seconds of ramp-up ignored and minimum seconds measured with --adaptive
+ADAPTIVE_WARMUP = 2
+ADAPTIVE_MIN_SAMPLES = 3
+
 # Path to executables of profiling tools
 PERF_PATH = "/usr/bin/perf"
 FLAME_PATH = "/opt/FlameGraph"
 
+# Path to the built-in traffic engine
+TRAFFIC_PATH = os.path.join(os.path.split(os.path.realpath(__file__))[0], "traffic.py")
+
+# Paths to the scripts run for each point of a sweep
+NETWORK_SETUP_PATH = os.path.join(os.path.split(os.path.realpath(__file__))[0], "network_setup.py")
+SENDER_PATH = os.path.join(os.path.split(os.path.realpath(__file__))[0], "run_experiment_sender.py")
+
+# Default snapshot of the NIC configuration (see --save-state in
+# network_setup.py), by interface
+NIC_STATE_PATH = "/tmp/nic-state-{}.json"
+
+# Cache of the topology of the host (see topology.py), by host name
+TOPOLOGY_CACHE_PATH = "/tmp/topology-{}.json"
+
+# Default results store, shared by all the experiment scripts
+RESULTS_STORE_PATH = os.path.join(os.path.split(os.path.realpath(__file__))[0], "results", "results.db")
+
+
+# Histograms kept by the kernel patch (counts since boot)
+LATENCY_HIST_PATH = "/proc/tcp_latency_hist"
+SKB_SIZE_HIST_PATH = "/proc/skb_size_hist"
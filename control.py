@@ -0,0 +1,168 @@
+import asyncio
+import collections
+import json
+import queue
+import socket
+import struct
+import threading
+import time
+
+
+# Every message is a JSON object prefixed by its length
+FRAME_HEADER = struct.Struct("!I")
+
+# How often to retry connecting to a peer that is not up yet (seconds)
+CONNECT_RETRY_INTERVAL = 0.1
+
+
+# All connections share a single event loop running in a background thread
+__loop = None
+__loop_lock = threading.Lock()
+
+
+def get_loop():
+    global __loop
+    with __loop_lock:
+        if __loop is None:
+            __loop = asyncio.new_event_loop()
+            threading.Thread(target=__loop.run_forever, daemon=True).start()
+    return __loop
+
+
+def encode_frame(message):
+    payload = json.dumps(message).encode()
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+# A persistent, framed connection to a peer
+# The experiment scripts call the blocking methods from their main thread,
+# while the event loop reads frames as they arrive. Events are acknowledged
+# straight from the event loop, so the signalling side can estimate how late
+# the peer learnt about the event (half the round trip time).
+class Channel:
+    def __init__(self, loop, reader, writer):
+        self.loop = loop
+        self.reader = reader
+        self.writer = writer
+        self.cond = threading.Condition()
+        self.events = collections.Counter()
+        self.messages = collections.deque()
+        self.signalled = collections.defaultdict(collections.deque)
+        self.skews = collections.defaultdict(collections.deque)
+        self.closed = False
+
+        # Disable Nagle so that small control messages go out immediately
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        asyncio.run_coroutine_threadsafe(self.read_frames(), loop)
+
+    async def read_frames(self):
+        try:
+            while True:
+                header = await self.reader.readexactly(FRAME_HEADER.size)
+                payload = await self.reader.readexactly(FRAME_HEADER.unpack(header)[0])
+                self.dispatch(json.loads(payload.decode()))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            with self.cond:
+                self.closed = True
+                self.cond.notify_all()
+
+    def dispatch(self, message):
+        received = time.perf_counter()
+        if message["type"] == "event":
+            self.writer.write(encode_frame({"type": "ack", "name": message["name"]}))
+
+        with self.cond:
+            if message["type"] == "event":
+                self.events[message["name"]] += 1
+            elif message["type"] == "ack":
+                sent = self.signalled[message["name"]].popleft()
+                self.skews[message["name"]].append((received - sent) / 2)
+            else:
+                self.messages.append(message)
+            self.cond.notify_all()
+
+    def send(self, msg_type, **fields):
+        fields["type"] = msg_type
+        self.loop.call_soon_threadsafe(self.writer.write, encode_frame(fields))
+
+    # Wait till everything sent so far has been handed to the kernel
+    def flush(self):
+        asyncio.run_coroutine_threadsafe(self.writer.drain(), self.loop).result()
+
+    def close(self):
+        try:
+            self.flush()
+        except ConnectionError:
+            pass
+        self.loop.call_soon_threadsafe(self.writer.close)
+
+    # Tell the peer an event happened
+    def signal(self, name):
+        with self.cond:
+            self.signalled[name].append(time.perf_counter())
+        self.send("event", name=name)
+
+    # Wait till the peer signals an event
+    def wait(self, name):
+        with self.cond:
+            while self.events[name] == 0:
+                if self.closed:
+                    raise ConnectionError("Control connection closed while waiting for {}.".format(name))
+                self.cond.wait()
+            self.events[name] -= 1
+
+    # Wait till the peer sends a message of one of the given types
+    def expect(self, *msg_types):
+        with self.cond:
+            while True:
+                for message in self.messages:
+                    if message["type"] in msg_types:
+                        self.messages.remove(message)
+                        return message
+                if self.closed:
+                    raise ConnectionError("Control connection closed while waiting for {}.".format("/".join(msg_types)))
+                self.cond.wait()
+
+    # Estimated delay (in seconds) before the peer learnt about the oldest
+    # unreported signal of an event, or None if it was never acknowledged
+    def skew(self, name, timeout=1):
+        with self.cond:
+            self.cond.wait_for(lambda: len(self.skews[name]) > 0 or self.closed, timeout)
+            if len(self.skews[name]) == 0:
+                return None
+            return self.skews[name].popleft()
+
+
+# Accepts connections from peers
+class ControlServer:
+    def __init__(self, port):
+        self.loop = get_loop()
+        self.channels = queue.Queue()
+        self.server = asyncio.run_coroutine_threadsafe(asyncio.start_server(self.connected, "0.0.0.0", port, reuse_address=True), self.loop).result()
+
+    async def connected(self, reader, writer):
+        self.channels.put(Channel(self.loop, reader, writer))
+
+    # Wait for the next peer to connect
+    def accept(self):
+        return self.channels.get()
+
+    def close(self):
+        self.server.close()
+        asyncio.run_coroutine_threadsafe(self.server.wait_closed(), self.loop).result()
+
+
+# Connect to a peer, waiting till it is up
+def connect(host, port):
+    loop = get_loop()
+    while True:
+        try:
+            reader, writer = asyncio.run_coroutine_threadsafe(asyncio.open_connection(host, port), loop).result()
+            return Channel(loop, reader, writer)
+        except ConnectionRefusedError:
+            time.sleep(CONNECT_RETRY_INTERVAL)
@@ -0,0 +1,110 @@
+import array
+import math
+import struct
+import sys
+from stats import *
+
+
+# Binary columnar file with the throughput of every flow in every interval
+# A header, followed by one column per field: the benchmark process and the
+# flow id of each flow, then the samples of each flow one after the other
+# (Gbps, NaN where the flow didn't report). Everything is little endian.
+MAGIC = b"FLOWSER1"
+HEADER = struct.Struct("<8sIId")
+
+# A flow is starved in an interval if it gets less than this share of the
+# average throughput of the flows in that interval
+STARVATION_SHARE = 0.1
+
+
+class FlowSeries:
+    def __init__(self, procs, flows, samples, num_intervals, interval=1.):
+        self.procs = procs
+        self.flows = flows
+        self.samples = samples
+        self.num_intervals = num_intervals
+        self.interval = interval
+
+    def __len__(self):
+        return len(self.flows)
+
+    # Samples of a single flow
+    def flow(self, i):
+        return self.samples[i * self.num_intervals:(i + 1) * self.num_intervals]
+
+    # Samples of all the flows in a single interval
+    def at(self, k):
+        return self.samples[k::self.num_intervals]
+
+
+# Build the series from the per-interval throughput of each flow, keyed by the
+# benchmark process and the flow id (see process_throughput_intervals)
+def flow_series_from_intervals(intervals):
+    keys = sorted(intervals, key=lambda key: (key[0], int(key[1])))
+    num_intervals = max([max(intervals[key]) + 1 for key in keys if len(intervals[key]) > 0], default=0)
+    samples = array.array("d", [math.nan]) * (len(keys) * num_intervals)
+    for i, key in enumerate(keys):
+        for k, throughput in intervals[key].items():
+            samples[i * num_intervals + k] = throughput
+
+    procs = array.array("I", [key[0] for key in keys])
+    flows = array.array("I", [int(key[1]) for key in keys])
+    return FlowSeries(procs, flows, samples, num_intervals)
+
+
+def save_flow_series(path, series):
+    columns = [series.procs, series.flows, series.samples]
+    if sys.byteorder != "little":
+        columns = [array.array(column.typecode, column) for column in columns]
+        for column in columns:
+            column.byteswap()
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(series), series.num_intervals, series.interval))
+        for column in columns:
+            column.tofile(f)
+
+
+def load_flow_series(path):
+    with open(path, "rb") as f:
+        magic, num_flows, num_intervals, interval = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError("{} is not a flow series file.".format(path))
+
+        columns = []
+        for typecode, length in [("I", num_flows), ("I", num_flows), ("d", num_flows * num_intervals)]:
+            column = array.array(typecode)
+            column.fromfile(f, length)
+            if sys.byteorder != "little":
+                column.byteswap()
+            columns.append(column)
+
+    return FlowSeries(*columns, num_intervals, interval)
+
+
+# Distribution of the throughput of the flows over the intervals [begin, end)
+# Flows are compared by their mean throughput, and starvation is counted in
+# each interval
+# This is a plain loop over the samples, not a vectorised computation: without
+# an array library, the C-level alternatives (filterfalse/map over the array
+# columns) take as long, and 576 flows over 600 s take under 0.1 s
+def flow_fairness(series, begin, end):
+    means = []
+    for i in range(len(series)):
+        samples = [s for s in series.flow(i)[begin:end] if not math.isnan(s)]
+        means.append(mean(samples) if len(samples) > 0 else 0.)
+
+    starved = []
+    for k in range(begin, min(end, series.num_intervals)):
+        samples = [s for s in series.at(k) if not math.isnan(s)]
+        fair_share = mean(samples) if len(samples) > 0 else 0.
+        starved.append(sum(1 for s in samples if s < STARVATION_SHARE * fair_share))
+
+    return {
+        "jain": jain_index(means),
+        "min": min(means),
+        "p50": percentile(means, 50),
+        "max": max(means),
+        "cov": coefficient_of_variation(means),
+        "starved": starved,
+    }
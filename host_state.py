@@ -0,0 +1,133 @@
+import os
+import subprocess
+from constants import *
+
+
+# Sysctls that change the results of a run
+# net.core.packet_loss_gen is left out, the receiver sets it for every run
+# from --packet-drop
+HOST_SYSCTLS = [
+    "net.core.rmem_default",
+    "net.core.rmem_max",
+    "net.core.wmem_default",
+    "net.core.wmem_max",
+    "net.core.netdev_max_backlog",
+    "net.core.rps_sock_flow_entries",
+    "net.ipv4.tcp_rmem",
+    "net.ipv4.tcp_wmem",
+    "net.ipv4.tcp_mem",
+    "net.ipv4.tcp_congestion_control",
+    "net.ipv4.tcp_timestamps",
+    "net.ipv4.tcp_sack",
+]
+
+
+def read_sysctl(name):
+    try:
+        with open(os.path.join("/proc/sys", name.replace(".", "/")), "r") as f:
+            return " ".join(f.read().split())
+    except OSError:
+        return None
+
+
+# Output of a command, or None if it can't be run or fails
+def command_output(args):
+    try:
+        return subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Number of LLC ways DDIO can use (see set_ddio_ways in network_setup.py), or
+# None if the register can't be read
+def read_ddio_ways():
+    output = command_output(["rdmsr", "-p", "0", hex(DDIO_REG)])
+    return None if output is None else bin(int(output, 16)).count("1")
+
+
+# Offloads of an interface, as listed by ethtool -k (e.g., {"generic-receive-offload": "on"})
+def read_offloads(iface):
+    offloads = {}
+    for line in (command_output(["ethtool", "-k", iface]) or "").splitlines()[1:]:
+        name, sep, value = line.partition(":")
+        if sep != "" and len(value.split()) > 0:
+            offloads[name.strip()] = value.split()[0]
+    return offloads
+
+
+# Current RX/TX ring sizes of an interface, as listed by ethtool -g (e.g.,
+# {"rx": 1024, "tx": 1024})
+def read_ring_sizes(iface):
+    sizes = {}
+    current = False
+    for line in (command_output(["ethtool", "-g", iface]) or "").splitlines():
+        name, _, value = line.partition(":")
+        if name.startswith("Current hardware settings"):
+            current = True
+        elif current and name in ["RX", "TX"] and value.strip().isdigit():
+            sizes[name.lower()] = int(value)
+    return sizes
+
+
+# Speed (in Mbps) and auto-negotiation of an interface, as listed by ethtool
+def read_link_settings(iface):
+    settings = {"speed": None, "autoneg": None}
+    for line in (command_output(["ethtool", iface]) or "").splitlines():
+        name, _, value = line.strip().partition(":")
+        value = value.strip()
+        if name == "Speed" and value.endswith("Mb/s") and value[:-4].isdigit():
+            settings["speed"] = int(value[:-4])
+        elif name == "Auto-negotiation" and value in ["on", "off"]:
+            settings["autoneg"] = value
+    return settings
+
+
+def read_mtu(iface):
+    try:
+        with open("/sys/class/net/{}/mtu".format(iface), "r") as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+# IPv4 addresses of every interface but the loopback
+def interface_addrs():
+    addrs = {}
+    for line in (command_output(["ip", "-o", "-4", "addr", "show"]) or "").splitlines():
+        comps = line.split()
+        if len(comps) >= 4 and comps[1] != "lo":
+            addrs.setdefault(comps[1], []).append(comps[3].split("/")[0])
+    return addrs
+
+
+# Interface the host sends to an address through
+def route_interface(addr):
+    comps = (command_output(["ip", "route", "get", addr]) or "").split()
+    return comps[comps.index("dev") + 1] if "dev" in comps else None
+
+
+# Snapshot of the host configuration that changes the results of a run: the
+# kernel, the sysctls above, the DDIO ways, and the MTU and offloads of every
+# interface with an address
+def host_state():
+    interfaces = {}
+    for iface, addrs in sorted(interface_addrs().items()):
+        interfaces[iface] = {"addrs": addrs, "mtu": read_mtu(iface), "offloads": read_offloads(iface)}
+
+    return {
+        "kernel": "{} {}".format(os.uname().release, os.uname().version),
+        "sysctls": {name: read_sysctl(name) for name in HOST_SYSCTLS},
+        "ddio_ways": read_ddio_ways(),
+        "interfaces": interfaces,
+    }
+
+
+# The snapshot with only the interface that has the address (on the receiver)
+# or the interface the address is reached through (on the sender)
+def host_state_for(state, addr, iface=None):
+    if iface is None:
+        iface = next((name for name, interface in state["interfaces"].items() if addr in interface["addrs"]), None)
+
+    narrowed = {key: value for key, value in state.items() if key != "interfaces"}
+    narrowed["interface"] = state["interfaces"].get(iface)
+    return narrowed
@@ -0,0 +1,83 @@
+import errno
+import os
+import select
+import threading
+
+
+KMSG_PATH = "/dev/kmsg"
+
+# Each read of /dev/kmsg returns a single record, which must fit in the buffer
+KMSG_RECORD_SIZE = 8192
+
+# How often the reader checks whether it was stopped (seconds)
+KMSG_POLL_INTERVAL = 0.1
+
+
+# Reads the kernel log from a background thread for the whole experiment, so
+# that records aren't lost when the ring buffer wraps before the run is over
+# Only the records logged after the reader started are read
+# Records the reader was too slow for show up as gaps in the sequence numbers
+class KmsgReader:
+    def __init__(self, consumers, path=None):
+        self.fd = os.open(KMSG_PATH, os.O_RDONLY | os.O_NONBLOCK)
+        os.lseek(self.fd, 0, os.SEEK_END)
+        self.consumers = consumers
+        self.log = None if path is None else open(path, "w")
+        self.last_seq = None
+        self.num_records = 0
+        self.num_dropped = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    # Records are "<prio>,<seq>,<usecs>,<flags>[,...];<message>", followed by
+    # continuation lines (" KEY=value") which are ignored
+    def parse(self, record):
+        header, _, message = record.partition(";")
+        fields = header.split(",")
+        seq = int(fields[1])
+        if self.last_seq is not None and seq > self.last_seq + 1:
+            self.num_dropped += seq - self.last_seq - 1
+        self.last_seq = seq
+        self.num_records += 1
+
+        usecs = int(fields[2])
+        message = message.split("\n", 1)[0]
+        return "[{:5d}.{:06d}] {}\n".format(usecs // 1000000, usecs % 1000000, message)
+
+    # Read all the records available right now
+    def drain(self):
+        lines = []
+        while True:
+            try:
+                record = os.read(self.fd, KMSG_RECORD_SIZE)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                # The record was overwritten before it was read, the next read
+                # gets the oldest record left (and the gap is counted then)
+                if e.errno == errno.EPIPE:
+                    continue
+                raise
+
+            lines.append(self.parse(record.decode(errors="replace")))
+
+        if len(lines) > 0:
+            if self.log is not None:
+                self.log.writelines(lines)
+            for consumer in self.consumers:
+                consumer(lines, False)
+
+    def run(self):
+        while not self.stopped.is_set():
+            select.select([self.fd], [], [], KMSG_POLL_INTERVAL)
+            self.drain()
+
+    # Read what's left, and stop
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.drain()
+        os.close(self.fd)
+        if self.log is not None:
+            self.log.close()
@@ -0,0 +1,116 @@
+import math
+
+
+# Bits of precision kept for each value (2^11 sub-buckets keep three
+# significant digits, i.e., the error is below 0.1%)
+SUB_BUCKET_BITS = 11
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+HALF_SUB_BUCKETS = SUB_BUCKETS // 2
+
+# Percentiles reported for every run
+REPORTED_PERCENTILES = [50, 90, 99, 99.9]
+
+
+# Index of the bucket holding a value
+# Values below SUB_BUCKETS get a bucket each, larger values share buckets whose
+# width doubles every HALF_SUB_BUCKETS buckets (like HdrHistogram)
+def bucket_index(value):
+    shift = max(0, value.bit_length() - SUB_BUCKET_BITS)
+    return shift * HALF_SUB_BUCKETS + (value >> shift)
+
+
+# Lowest and highest values held by a bucket
+def bucket_range(index):
+    if index < SUB_BUCKETS:
+        return index, index
+
+    shift = index // HALF_SUB_BUCKETS - 1
+    low = (index - shift * HALF_SUB_BUCKETS) << shift
+    return low, low + (1 << shift) - 1
+
+
+# Lowest and highest values of a bucket of the kernel patch's latency histogram
+# Values below 2^sub_bits get a bucket each, then each power of two is split
+# into 2^sub_bits buckets
+def kernel_bucket_range(index, sub_bits):
+    if index < 1 << sub_bits:
+        return index, index
+
+    shift = (index >> sub_bits) - 1
+    low = ((1 << sub_bits) | (index & ((1 << sub_bits) - 1))) << shift
+    return low, low + (1 << shift) - 1
+
+
+# Streaming histogram of non-negative integer samples (e.g., latency in ns)
+# It takes constant memory whatever the number of samples, and the histograms
+# of several runs or hosts can be merged
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def record(self, value, count=1):
+        index = bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.count > 0:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def mean(self):
+        return 0 if self.count == 0 else self.total / self.count
+
+    # Smallest recorded value that at least p% of the samples don't exceed
+    # (within the precision of the buckets)
+    def percentile(self, p):
+        if self.count == 0:
+            return 0
+
+        rank = max(1, math.ceil(p / 100 * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(bucket_range(index)[1], self.max)
+        return self.max
+
+    # (highest value, fraction of the samples up to it) for each non-empty bucket
+    def cdf(self):
+        points = []
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            points.append((min(bucket_range(index)[1], self.max), seen / self.count))
+        return points
+
+    # JSON-friendly state, e.g., to push the histogram to the sender
+    def to_dict(self):
+        return {
+            "counts": sorted(self.counts.items()),
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @staticmethod
+    def from_dict(state):
+        histogram = LatencyHistogram()
+        histogram.counts = {index: count for index, count in state["counts"]}
+        histogram.count = state["count"]
+        histogram.total = state["total"]
+        histogram.min = state["min"]
+        histogram.max = state["max"]
+        return histogram
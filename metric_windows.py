@@ -0,0 +1,78 @@
+from collections import namedtuple
+
+
+# A metric that can be measured during a traffic window
+#   name:      attribute name of the command line flag
+#   label:     label used when printing progress
+#   prefix:    prefix used for the raw output files
+#   resources: collector resources the metric holds exclusively
+Metric = namedtuple("Metric", ["name", "label", "prefix", "resources"])
+
+
+# All the metrics in the order they are measured and reported
+METRICS = [
+    Metric("throughput", "throughput", "throughput", set()),
+    Metric("utilisation", "utilisation", "utilisation", set()),
+    Metric("cache_miss", "cache miss", "cache-miss", set()),
+    Metric("util_breakdown", "util breakdown", "util-breakdown", {"perf-record"}),
+    Metric("cache_breakdown", "cache breakdown", "cache-breakdown", {"perf-record"}),
+    Metric("flame", "flame", "flame", {"perf-record"}),
+    Metric("latency", "latency", "latency", set()),
+    Metric("skb_hist", "skb hist", "skb-hist", set()),
+]
+
+
+# Group the requested metrics into traffic windows
+# Without combining, every metric gets its own window (one traffic run each);
+# otherwise metrics are packed first-fit into as few windows as possible such
+# that no two metrics in a window hold the same collector resource
+def plan_windows(args, combined):
+    requested = [m for m in METRICS if getattr(args, m.name)]
+    if not combined:
+        return [[m] for m in requested]
+
+    windows = []
+    for metric in requested:
+        for window in windows:
+            if not any(m.resources & metric.resources for m in window):
+                window.append(metric)
+                break
+        else:
+            windows.append([metric])
+
+    return windows
+
+
+def window_label(window):
+    return "+".join(m.label for m in window)
+
+
+def window_prefix(window):
+    return "+".join(m.prefix for m in window)
+
+
+def window_metrics(window):
+    return set(m.name for m in window)
+
+
+# Options the traffic windows of an experiment, and the messages exchanged in
+# each, depend on (with --steady-state the sender sends the window to the
+# receiver)
+# The sender and the receiver each plan the windows from their own options,
+# and wait for each other in every window, so they must agree on them
+def window_options(args):
+    options = {"combined": args.combined, "steady_state": args.steady_state}
+    for metric in METRICS:
+        options[metric.name] = getattr(args, metric.name)
+    return options
+
+
+# The options the sender and the receiver disagree on, as an error message,
+# or None if they agree
+def window_options_mismatch(sender_options, receiver_options):
+    errors = []
+    for name in sorted(set(sender_options) | set(receiver_options)):
+        sender, receiver = sender_options.get(name, False), receiver_options.get(name, False)
+        if sender != receiver:
+            errors.append("--{} is set on the {} but not on the {}.".format(name.replace("_", "-"), *(["sender", "receiver"] if sender else ["receiver", "sender"])))
+    return None if len(errors) == 0 else " ".join(errors)
@@ -1,22 +1,33 @@
 #!/usr/bin/env python3
 
 import argparse
+import json
 import os as _os
 from constants import *
+from host_state import *
+from placement import *
+from topology import *
 
 
 # For debugging
 class os:
     VERBOSE = False
+    DRY_RUN = False
 
     @staticmethod
     def enable_logging():
         os.VERBOSE = True
 
+    # Print the commands instead of running them
+    @staticmethod
+    def enable_dry_run():
+        os.VERBOSE = True
+        os.DRY_RUN = True
+
     @staticmethod
     def system(p):
         if os.VERBOSE: print("+ " + p)
-        _os.system(p)
+        if not os.DRY_RUN: _os.system(p)
 
 
 def parse_args():
@@ -28,6 +39,8 @@ def parse_args():
     parser.add_argument("--flow-type", choices=["long", "short", "mixed"], default="long", help="Flow type to run the experiment with.")
     parser.add_argument("--config", choices=["one-to-one", "incast", "outcast", "all-to-all", "single"], default="single", help="Configuration to run the experiment with.")
     parser.add_argument("--affinity", type=int, nargs="*", help="Which CPUs are being used for IRQ processing.")
+    parser.add_argument("--placement", choices=PLACEMENT_POLICIES, default=None, help="Pick --affinity with a placement policy (as the experiment scripts do).")
+    parser.add_argument("--num-connections", type=int, default=1, help="Number of connections of the experiment, for --placement.")
 
     # Parse basic parameters
     parser.add_argument('interface', type=str, help='The network device interface to configure.')
@@ -53,8 +66,13 @@ def parse_args():
     parser.add_argument('--arfs', action='store_true', default=None, help='Enables aRFS.')
     parser.add_argument('--no-arfs', dest='arfs', action='store_false', default=None, help='Disables aRFS.')
 
+    # Snapshot parameters
+    parser.add_argument("--save-state", type=str, nargs="?", const=NIC_STATE_PATH, default=None, help="Save the current configuration of the interface before changing it (to {} by default).".format(NIC_STATE_PATH.format("<interface>")))
+    parser.add_argument("--restore-state", type=str, nargs="?", const=NIC_STATE_PATH, default=None, help="Restore a configuration saved with --save-state before applying the other options.")
+
     # Logging parameters
     parser.add_argument("--verbose", action="store_true", help="Print extra output.")
+    parser.add_argument("--dry-run", action="store_true", help="Print the commands that would configure the interface without running them.")
 
     # Actually parse arguments
     args = parser.parse_args()
@@ -68,6 +86,14 @@ def parse_args():
        print("Can't set --affinity with --arfs.")
        exit(0)
 
+    if args.placement is not None and args.arfs is not False:
+        print("Can't set --placement without --no-arfs.")
+        exit(1)
+
+    if not (1 <= args.num_connections <= MAX_CONNECTIONS):
+        print("Can't set --num-connections outside of [1, {}].".format(MAX_CONNECTIONS))
+        exit(1)
+
     if args.arfs is not None and not args.arfs:
         if args.sender is not None and args.receiver is not None:
             print("Can't set both --sender and --receiver.")
@@ -89,23 +115,37 @@ def parse_args():
             exit(0)
 
         # Set IRQ processing CPUs
-        if args.affinity is not None:
+        topology = host_topology(args.interface)
+        cpus = topology["cpus"]
+        if args.placement is not None:
+            if args.affinity is not None:
+                print("Can't set --affinity with --placement.")
+                exit(1)
+
+            # All-to-all uses RSS
+            if args.config != "all-to-all":
+                try:
+                    args.affinity = plan_placement(topology, args.placement, args.config, args.num_connections, "receiver" if args.receiver else "sender")["affinity"]
+                except ValueError as e:
+                    print(e)
+                    exit(1)
+        elif args.affinity is not None:
             if args.config in single_cpu_configs and len(args.affinity) != 1:
                 print("Please provide only 1 --affinity for --config {}cast/single.".format("in" if args.receiver else "out"))
                 exit(1)
 
-            if args.config in multiple_cpu_configs and len(args.affinity) != MAX_CPUS:
-                print("Please provide {} --affinity for --config {}cast/one-to-one.".format(MAX_CPUS, "out" if args.receiver else "in"))
+            if args.config in multiple_cpu_configs and len(args.affinity) != len(cpus):
+                print("Please provide {} --affinity for --config {}cast/one-to-one.".format(len(cpus), "out" if args.receiver else "in"))
                 exit(1)
 
-            if not all(map(lambda c: 0 <= c < MAX_CPUS, args.affinity)):
-                print("Can't set --affinity outside of [0, {}].".format(MAX_CPUS))
+            if not all(map(lambda c: c in cpus, args.affinity)):
+                print("Can't set --affinity outside of the CPUs of the host ({}).".format(format_cpu_list(cpus)))
                 exit(1)
         else:
             if args.config in single_cpu_configs:
                 args.affinity = [1]
             elif args.config in multiple_cpu_configs:
-                args.affinity = [(cpu + 1) % MAX_CPUS for cpu in CPUS]
+                args.affinity = cpus[1:] + cpus[:1]
 
     if args.mtu is not None and not (0 < args.mtu <= 9000):
         print("Can't set values of --mtu outside of (0, 9000] bytes.")
@@ -126,6 +166,19 @@ def parse_args():
     if args.checksum is not None and not args.checksum:
         args.tso = False
 
+    if args.save_state == NIC_STATE_PATH:
+        args.save_state = NIC_STATE_PATH.format(args.interface)
+
+    if args.restore_state is not None:
+        if args.restore_state == NIC_STATE_PATH:
+            args.restore_state = NIC_STATE_PATH.format(args.interface)
+        try:
+            with open(args.restore_state, "r") as f:
+                args.restore_state = json.load(f)
+        except (OSError, ValueError):
+            print("Can't read the configuration to restore from {}.".format(args.restore_state))
+            exit(1)
+
     # Return validated arguments
     return args
 
@@ -153,13 +206,66 @@ def set_irq_affinity(iface):
     os.system("set_irq_affinity.sh {} 2> /dev/null > /dev/null".format(iface))
 
 
-def ntuple_send_port_to_queue(iface, port, n, loc):
-    os.system("ethtool -U {} flow-type tcp4 dst-port {} action {} loc {}".format(iface, port, n, loc))
-    os.system("ethtool -U {} flow-type tcp4 src-port {} action {} loc {}".format(iface, port, n, MAX_RULE_LOC - loc))
-
-
-def ntuple_send_all_traffic_to_queue(iface, n, loc):
-    os.system("ethtool -U {} flow-type tcp4 action {} loc {}".format(iface, n, loc))
+# RX queue whose IRQ lands on a CPU, discovered after set_irq_affinity
+def cpu_rx_queue(topology, cpu):
+    if cpu not in topology["cpu_queues"]:
+        print("Can't find the RX queue of CPU {} on {} (see python3 topology.py {} --refresh).".format(cpu, topology["iface"], topology["iface"]))
+        exit(1)
+    return topology["cpu_queues"][cpu]
+
+
+# ntuple rules are kept as {loc: (dst port, src port, queue)}, where a port of
+# None matches any port
+def ntuple_send_port_to_queue(port, n, loc):
+    return {loc: (port, None, n), MAX_RULE_LOC - loc: (None, port, n)}
+
+
+def ntuple_send_all_traffic_to_queue(n, loc):
+    return {loc: (None, None, n)}
+
+
+# Whether an ethtool -u mask ignores the whole field (e.g., 0xffff or
+# 255.255.255.255, ethtool prints the bits that are ignored)
+def ntuple_wildcard_mask(mask):
+    if "." in mask or ":" in mask:
+        return all(int(part, 10 if "." in mask else 16) == 255 for part in mask.replace(":", ".").split("."))
+    mask = int(mask, 16)
+    return mask != 0 and mask & (mask + 1) == 0
+
+
+# Rules installed on an interface, read from ethtool -u, or None if they can't
+# be read
+# Rules that match on anything but the TCP/IPv4 ports (or don't steer to a
+# queue) are kept as None so that they're replaced
+def ntuple_read_rules(iface):
+    output = command_output(["ethtool", "-u", iface])
+    if output is None:
+        return None
+
+    rules = {}
+    fields = None
+    for line in output.splitlines():
+        name, _, value = line.strip().partition(":")
+        value = value.split()
+        if name == "Filter" and len(value) > 0:
+            fields = {"known": True}
+            rules[int(value[0])] = fields
+        elif fields is None or len(value) == 0:
+            continue
+        elif name == "Rule Type":
+            fields["known"] &= " ".join(value) == "TCP over IPv4"
+        elif name in ["Dest port", "Src port"] and len(value) == 3:
+            # A port is either matched (mask 0x0) or ignored (mask 0xffff),
+            # the rules never match on part of one
+            mask = int(value[2], 16)
+            fields[name] = int(value[0]) if mask == 0 else None
+            fields["known"] &= mask in [0, 0xffff]
+        elif name == "Action":
+            fields["queue"] = int(value[-1]) if value[:3] == ["Direct", "to", "queue"] else None
+        elif "mask:" in value:
+            fields["known"] &= ntuple_wildcard_mask(value[-1])
+
+    return {loc: (fields.get("Dest port"), fields.get("Src port"), fields["queue"]) if fields["known"] and fields.get("queue") is not None else None for loc, fields in rules.items()}
 
 
 def ntuple_clear_rules(iface):
@@ -167,54 +273,79 @@ def ntuple_clear_rules(iface):
         os.system("ethtool -U {} delete {} 2> /dev/null > /dev/null".format(iface, i))
 
 
+# Install exactly the given rules, only deleting and adding the rules that
+# differ from the installed ones
+# If the installed rules can't be read, every location is cleared first
+def ntuple_set_rules(iface, rules):
+    installed = ntuple_read_rules(iface)
+    if installed is None:
+        ntuple_clear_rules(iface)
+        installed = {}
+
+    for loc in sorted(installed):
+        if loc not in rules or installed[loc] != rules[loc]:
+            os.system("ethtool -U {} delete {}".format(iface, loc))
+
+    for loc, (dst_port, src_port, n) in sorted(rules.items()):
+        if loc not in installed or installed[loc] != rules[loc]:
+            ports = "".join(" {} {}".format(name, port) for name, port in [("dst-port", dst_port), ("src-port", src_port)] if port is not None)
+            os.system("ethtool -U {} flow-type tcp4{} action {} loc {}".format(iface, ports, n, loc))
+
+
 # Functions to set IRQ mode
 def setup_irq_mode_arfs(iface):
     stop_irq_balance()
     manage_rps(iface, True)
     manage_ntuple(iface, True)
     set_irq_affinity(iface)
-    ntuple_clear_rules(iface)
+    ntuple_set_rules(iface, {})
 
 
 def setup_irq_mode_no_arfs_sender(affinity, iface, flow_type, config):
     stop_irq_balance()
     manage_rps(iface, False)
-    ntuple_clear_rules(iface)
     set_irq_affinity(iface)
+    topology = host_topology(iface, refresh=True)
 
     # For single flow or outcast, we have to send all traffic to core 1;
     # for one-to-one and outcast, we use flow steering to the next core;
     # otherwise we just use RSS
     if config in ["outcast", "single"]:
         manage_ntuple(iface, True)
-        ntuple_send_all_traffic_to_queue(iface, CPU_TO_RX_QUEUE_MAP[affinity[0]], 0)
+        ntuple_set_rules(iface, ntuple_send_all_traffic_to_queue(cpu_rx_queue(topology, affinity[0]), 0))
     elif config in ["incast", "one-to-one"]:
         manage_ntuple(iface, True)
+        rules = {}
         for n, cpu in enumerate(affinity):
-            q = CPU_TO_RX_QUEUE_MAP[cpu]
-            ntuple_send_port_to_queue(iface, BASE_PORT + n, q, n)
+            q = cpu_rx_queue(topology, cpu)
+            rules.update(ntuple_send_port_to_queue(BASE_PORT + n, q, n))
+        ntuple_set_rules(iface, rules)
     else:
+        ntuple_set_rules(iface, {})
         manage_ntuple(iface, False)
 
 
 def setup_irq_mode_no_arfs_receiver(affinity, iface, flow_type, config):
     stop_irq_balance()
     manage_rps(iface, False)
-    ntuple_clear_rules(iface)
     set_irq_affinity(iface)
+    topology = host_topology(iface, refresh=True)
 
     # For single flow or incast, we have to send all traffic to core 1;
     # for one-to-one and outcast, we use flow steering to next core;
     # otherwise we just use RSS
     if config in ["incast", "single"]:
         manage_ntuple(iface, True)
-        ntuple_send_all_traffic_to_queue(iface, CPU_TO_RX_QUEUE_MAP[affinity[0]], 0)
+        ntuple_set_rules(iface, ntuple_send_all_traffic_to_queue(cpu_rx_queue(topology, affinity[0]), 0))
     elif config in ["outcast", "one-to-one"]:
         manage_ntuple(iface, True)
+        rules = {}
         for n, cpu in enumerate(affinity):
-            q = CPU_TO_RX_QUEUE_MAP[cpu]
-            ntuple_send_port_to_queue(iface, BASE_PORT + n, q, n)
+            q = cpu_rx_queue(topology, cpu)
+            rules.update(ntuple_send_port_to_queue(BASE_PORT + n, q, n))
+        ntuple_set_rules(iface, rules)
     else:
+        ntuple_set_rules(iface, {})
         manage_ntuple(iface, False)
 
 
@@ -228,46 +359,108 @@ def setup_affinity_mode(affinity, iface, arfs, sender, receiver, flow_type, conf
             setup_irq_mode_no_arfs_receiver(affinity, iface, flow_type, config)
 
 
-# Set connection speed
-def set_speed(iface, speed):
-    if speed is not None:
-        os.system("ethtool -s {} speed {} autoneg off".format(iface, speed))
+# Features of ethtool -k changed by the offload options
+OFFLOAD_FEATURES = {
+    "lro": "large-receive-offload",
+    "tso": "tcp-segmentation-offload",
+    "gso": "generic-segmentation-offload",
+    "gro": "generic-receive-offload",
+    "tx": "tx-checksumming",
+    "rx": "rx-checksumming",
+}
+
+# Sysctls changed by --sock-size
+SOCK_SIZE_SYSCTLS = ["net.core.wmem_max", "net.core.rmem_max"]
+
+
+# Current value of everything the options below change, in the same form as
+# requested_state
+# Values that can't be read are None, and are always set if requested
+def nic_state(iface):
+    offloads = read_offloads(iface)
+    return {
+        "offloads": {offload: offloads.get(feature) for offload, feature in OFFLOAD_FEATURES.items()},
+        "link": read_link_settings(iface),
+        "mtu": read_mtu(iface),
+        "sysctls": {name: read_sysctl(name) for name in SOCK_SIZE_SYSCTLS},
+        "ddio_ways": read_ddio_ways(),
+        "ring_buffer": read_ring_sizes(iface),
+    }
+
+
+# State requested by the options (None where an option isn't set)
+def requested_state(args):
+    offloads = {"lro": args.lro, "tso": args.tso, "gso": args.gso, "gro": args.gro, "tx": args.checksum, "rx": args.checksum}
+    sock_size = None if args.sock_size is None else "12582912"
+    return {
+        "offloads": {offload: None if enabled is None else on_or_off(enabled) for offload, enabled in offloads.items()},
+        "link": {"speed": args.speed, "autoneg": None if args.speed is None else "off"},
+        "mtu": args.mtu,
+        "sysctls": {name: sock_size for name in SOCK_SIZE_SYSCTLS},
+        "ddio_ways": args.dca,
+        "ring_buffer": {"rx": args.ring_buffer, "tx": args.ring_buffer},
+    }
+
+
+# Set connection speed (or turn auto-negotiation back on)
+def set_link(iface, link, current):
+    if link.get("autoneg") == "on":
+        if current["link"].get("autoneg") != "on":
+            os.system("ethtool -s {} autoneg on".format(iface))
+            current["link"] = dict(link)
+    elif link.get("speed") is not None and (link["speed"] != current["link"].get("speed") or current["link"].get("autoneg") != "off"):
+        os.system("ethtool -s {} speed {} autoneg off".format(iface, link["speed"]))
+        current["link"] = dict(link)
 
 
 # Set MTU
-def set_mtu(iface, mtu):
-    if mtu is not None:
+def set_mtu(iface, mtu, current):
+    if mtu is not None and mtu != current["mtu"]:
         os.system("ifconfig {} mtu {}".format(iface, mtu))
+        current["mtu"] = mtu
 
 
 # Set RX/RX ring buffer size
-def set_ring_buffer_size(iface, size):
-    if size is not None:
-        os.system("ethtool -G {0} rx {1} tx {1}".format(iface, size))
+def set_ring_buffer_size(iface, sizes, current):
+    changes = {ring: size for ring, size in sorted(sizes.items()) if size is not None and size != current["ring_buffer"].get(ring)}
+    if len(changes) > 0:
+        os.system("ethtool -G {} {}".format(iface, " ".join("{} {}".format(ring, size) for ring, size in changes.items())))
+        current["ring_buffer"].update(changes)
 
 
 # Functions to manage offloads
-def manage_offloads(iface, lro, tso, gso, gro, checksum):
-    offloads = {"lro": lro, "tso": tso, "gso": gso, "gro": gro, "tx": checksum, "rx": checksum}
-    args = ["{} {}".format(offload, on_or_off(enabled)) for offload, enabled in offloads.items() if enabled is not None]
-    if len(args) > 0:
-        os.system("ethtool -K {} {}".format(iface, " ".join(args)))
-
-
-# Increase socket memory size limit
-def increase_sock_size_limit(enabled):
-    if enabled is not None:
-        if enabled:
-            os.system("sysctl -w net.core.wmem_max=12582912 && sysctl -w net.core.rmem_max=12582912")
-        else:
-            os.system("sysctl -w net.core.wmem_max=212992 && sysctl -w net.core.rmem_max=212992")
+def manage_offloads(iface, offloads, current):
+    changes = {offload: state for offload, state in offloads.items() if state is not None and state != current["offloads"].get(offload)}
+    if len(changes) > 0:
+        os.system("ethtool -K {} {}".format(iface, " ".join("{} {}".format(offload, state) for offload, state in changes.items())))
+        current["offloads"].update(changes)
+
+
+# Set socket memory size limits
+def set_sysctls(sysctls, current):
+    for name, value in sysctls.items():
+        if value is not None and value != current["sysctls"].get(name):
+            os.system("sysctl -w {}={}".format(name, value))
+            current["sysctls"][name] = value
 
 
 # Set DDIO ways
-def set_ddio_ways(ways):
-    if ways is not None:
+def set_ddio_ways(ways, current):
+    if ways is not None and ways != current["ddio_ways"]:
         os.system("modprobe msr")
         os.system("wrmsr {} {}".format(DDIO_REG, hex((2 ** ways - 1) << (11 - ways))))
+        current["ddio_ways"] = ways
+
+
+# Only change the settings that differ from the current state, since setting
+# the MTU or ring size resets the link even if it's unchanged
+def apply_state(iface, state, current):
+    manage_offloads(iface, state["offloads"], current)
+    set_link(iface, state["link"], current)
+    set_mtu(iface, state["mtu"], current)
+    set_sysctls(state["sysctls"], current)
+    set_ddio_ways(state["ddio_ways"], current)
+    set_ring_buffer_size(iface, state["ring_buffer"], current)
 
 
 # Run the functions according to parsed arguments
@@ -275,17 +468,18 @@ if __name__ == "__main__":
     args = parse_args()
     if args.verbose:
         os.enable_logging()
-
-    # Set offload config
-    manage_offloads(args.interface, args.lro, args.tso, args.gso, args.gro, args.checksum)
-
-    # Set IRQ config
+    if args.dry_run:
+        os.enable_dry_run()
+
+    # Snapshot the current state, and restore a snapshot before applying the
+    # options
+    current = nic_state(args.interface)
+    if args.save_state is not None:
+        with open(args.save_state, "w") as f:
+            json.dump(current, f, indent=4, sort_keys=True)
+    if args.restore_state is not None:
+        apply_state(args.interface, args.restore_state, current)
+    apply_state(args.interface, requested_state(args), current)
+
+    # Set IRQ config after the MTU and ring size, which can reset the IRQs
     setup_affinity_mode(args.affinity, args.interface, args.arfs, args.sender, args.receiver, args.flow_type, args.config)
-
-    # Setup other config
-    set_speed(args.interface, args.speed)
-    set_mtu(args.interface, args.mtu)
-    increase_sock_size_limit(args.sock_size)
-    set_ddio_ways(args.dca)
-    set_ring_buffer_size(args.interface, args.ring_buffer)
-
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+import argparse
+import bisect
+import mmap
+import struct
+import subprocess
+import sys
+from constants import *
+
+
+# perf.data header: magic, header size, attr size, then the attrs, data and
+# event types sections (offset, size), and the features bitmap
+FILE_HEADER = struct.Struct("<8sQQQQQQQQ32x")
+PERF_MAGIC = b"PERFILE2"
+
+# Start of struct perf_event_attr: type, size, config, sample period/freq,
+# sample type
+EVENT_ATTR = struct.Struct("<IIQQQ")
+
+# struct perf_event_header: type, misc, size
+EVENT_HEADER = struct.Struct("<IHH")
+U32 = struct.Struct("<I")
+U64 = struct.Struct("<Q")
+
+# Record types
+PERF_RECORD_COMM = 3
+PERF_RECORD_FORK = 7
+PERF_RECORD_SAMPLE = 9
+
+# CPU mode of a sample (in misc)
+PERF_RECORD_MISC_CPUMODE_MASK = 7
+PERF_RECORD_MISC_KERNEL = 1
+
+# Sample fields, in the order they appear in a sample record
+# Only the fixed-size fields before the callchain are needed
+PERF_SAMPLE_IP = 1 << 0
+PERF_SAMPLE_TID = 1 << 1
+PERF_SAMPLE_TIME = 1 << 2
+PERF_SAMPLE_ADDR = 1 << 3
+PERF_SAMPLE_ID = 1 << 6
+PERF_SAMPLE_CPU = 1 << 7
+PERF_SAMPLE_PERIOD = 1 << 8
+PERF_SAMPLE_STREAM_ID = 1 << 9
+PERF_SAMPLE_IDENTIFIER = 1 << 16
+SAMPLE_FIELDS = [PERF_SAMPLE_IDENTIFIER, PERF_SAMPLE_IP, PERF_SAMPLE_TID, PERF_SAMPLE_TIME, PERF_SAMPLE_ADDR, PERF_SAMPLE_ID, PERF_SAMPLE_STREAM_ID, PERF_SAMPLE_CPU, PERF_SAMPLE_PERIOD]
+
+# Same threshold as the perf report we used to run
+PERCENT_LIMIT = 0.01
+
+KALLSYMS_PATH = "/proc/kallsyms"
+
+
+# Kernel symbols of the running kernel, looked up by address
+class Kallsyms:
+    def __init__(self, path=KALLSYMS_PATH):
+        symbols = []
+        with open(path, "r") as f:
+            for line in f:
+                comps = line.split()
+                if len(comps) >= 3 and comps[1] in "tTwW":
+                    dso = comps[3] if len(comps) > 3 else "[kernel.kallsyms]"
+                    symbols.append((int(comps[0], 16), comps[2], dso))
+
+        # Addresses are hidden from unprivileged users
+        symbols.sort()
+        if len(symbols) == 0 or symbols[-1][0] == 0:
+            raise ValueError("{} has no symbol addresses.".format(path))
+
+        self.addrs = [s[0] for s in symbols]
+        self.symbols = [(s[1], s[2]) for s in symbols]
+        self.cache = {}
+
+    # Symbol and module of an address
+    def lookup(self, ip):
+        if ip not in self.cache:
+            i = bisect.bisect_right(self.addrs, ip) - 1
+            self.cache[ip] = ("0x{:016x}".format(ip), "[unknown]") if i < 0 else self.symbols[i]
+        return self.cache[ip]
+
+
+# Offsets of the IP, TID, CPU and period in a sample record (None if missing)
+def sample_offsets(sample_type):
+    offsets = {}
+    offset = EVENT_HEADER.size
+    for field in SAMPLE_FIELDS:
+        if sample_type & field:
+            offsets[field] = offset
+            offset += 8
+    return [offsets.get(field) for field in [PERF_SAMPLE_IP, PERF_SAMPLE_TID, PERF_SAMPLE_CPU, PERF_SAMPLE_PERIOD]]
+
+
+# Kernel samples of a recording, weighted by their period
+# Returns the period of every (cpu, tid, ip), the total period of all the
+# samples (including user space), and the command name of every thread
+def read_kernel_samples(path):
+    periods = {}
+    total_period = 0
+    comms = {0: "swapper"}
+    parents = {}
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        magic, _, attr_size, attrs_offset, attrs_size, data_offset, data_size, _, _ = FILE_HEADER.unpack_from(m)
+        if magic != PERF_MAGIC:
+            raise ValueError("{} is not a little endian perf.data file.".format(path))
+
+        # All the events must have the same sample layout
+        attrs = [EVENT_ATTR.unpack_from(m, offset) for offset in range(attrs_offset, attrs_offset + attrs_size, attr_size)]
+        if len(attrs) == 0 or len(set(attr[4] for attr in attrs)) != 1:
+            raise ValueError("{} has events with different sample types.".format(path))
+
+        _, _, _, default_period, sample_type = attrs[0]
+        ip_offset, tid_offset, cpu_offset, period_offset = sample_offsets(sample_type)
+        if ip_offset is None:
+            raise ValueError("{} has no sample addresses.".format(path))
+
+        offset = data_offset
+        end = data_offset + data_size
+        while offset + EVENT_HEADER.size <= end:
+            typ, misc, size = EVENT_HEADER.unpack_from(m, offset)
+            if size == 0:
+                raise ValueError("{} has a corrupt record at {}.".format(path, offset))
+
+            if typ == PERF_RECORD_SAMPLE:
+                period = default_period if period_offset is None else U64.unpack_from(m, offset + period_offset)[0]
+                total_period += period
+                if misc & PERF_RECORD_MISC_CPUMODE_MASK == PERF_RECORD_MISC_KERNEL:
+                    ip = U64.unpack_from(m, offset + ip_offset)[0]
+                    tid = -1 if tid_offset is None else U32.unpack_from(m, offset + tid_offset + 4)[0]
+                    cpu = -1 if cpu_offset is None else U32.unpack_from(m, offset + cpu_offset)[0]
+                    key = (cpu, tid, ip)
+                    periods[key] = periods.get(key, 0) + period
+            elif typ == PERF_RECORD_COMM:
+                _, tid = struct.unpack_from("<II", m, offset + EVENT_HEADER.size)
+                name = m[offset + EVENT_HEADER.size + 8:offset + size]
+                comms[tid] = name[:name.find(b"\0")].decode(errors="replace")
+            elif typ == PERF_RECORD_FORK:
+                _, ppid, tid, ptid = struct.unpack_from("<IIII", m, offset + EVENT_HEADER.size)
+                parents[tid] = ptid
+
+            offset += size
+
+    # Threads that didn't set their name have their parent's
+    for tid in parents:
+        parent = tid
+        while parent not in comms and parent in parents and parents[parent] != parent:
+            parent = parents[parent]
+        if parent in comms:
+            comms.setdefault(tid, comms[parent])
+
+    return periods, total_period, comms
+
+
+# Share (%) of every kernel symbol, by CPU
+# Returns {(cpu, comm, dso, symbol): share}
+def kernel_profile(path, kallsyms=None):
+    kallsyms = Kallsyms() if kallsyms is None else kallsyms
+    periods, total_period, comms = read_kernel_samples(path)
+    profile = {}
+    for (cpu, tid, ip), period in periods.items():
+        symbol, dso = kallsyms.lookup(ip)
+        key = (cpu, comms.get(tid, ":{}".format(tid)), dso, symbol)
+        profile[key] = profile.get(key, 0.) + 100. * period / total_period
+
+    return profile
+
+
+# Kernel lines of perf report --stdio (sorted by comm, dso and symbol)
+def perf_report_lines(profile):
+    shares = {}
+    for (_, comm, dso, symbol), share in profile.items():
+        shares[(comm, dso, symbol)] = shares.get((comm, dso, symbol), 0.) + share
+
+    lines = []
+    for (comm, dso, symbol), share in sorted(shares.items(), key=lambda item: -item[1]):
+        if share >= PERCENT_LIMIT:
+            lines.append("{:>9.2f}%  {}  {}  [k] {}\n".format(share, comm, dso, symbol))
+    return lines
+
+
+# Symbols whose share differs between the two reports by more than the rounding
+def compare_reports(lines, expected_lines):
+    shares = [{}, {}]
+    for report, report_lines in zip(shares, [lines, expected_lines]):
+        for line in report_lines:
+            comps = line.split()
+            if len(comps) == 5 and comps[3] == "[k]":
+                key = (comps[1], comps[2], comps[4])
+                report[key] = report.get(key, 0.) + float(comps[0][:-1])
+
+    keys = set(shares[0]) | set(shares[1])
+    return sorted((key, shares[0].get(key, 0.), shares[1].get(key, 0.)) for key in keys if abs(shares[0].get(key, 0.) - shares[1].get(key, 0.)) > 2 * PERCENT_LIMIT)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the kernel symbols of a perf recording without perf report.")
+    parser.add_argument("perf_data_file", type=str, help="Recording to read.")
+    parser.add_argument("--compare", action="store_true", help="Check the output against perf report.")
+    args = parser.parse_args()
+
+    lines = perf_report_lines(kernel_profile(args.perf_data_file))
+    if not args.compare:
+        sys.stdout.writelines(lines)
+        exit(0)
+
+    perf = subprocess.run([PERF_PATH, "report", "--stdio", "--stdio-color", "never", "--percent-limit", str(PERCENT_LIMIT), "-i", args.perf_data_file], stdout=subprocess.PIPE, universal_newlines=True)
+    differences = compare_reports(lines, perf.stdout.splitlines())
+    for (comm, dso, symbol), share, expected_share in differences:
+        print("{}\t{}\t{}\t{:.2f}%\t{:.2f}% in perf report".format(comm, dso, symbol, share, expected_share))
+    print("{} symbols differ from perf report.".format(len(differences)))
+    exit(1 if len(differences) > 0 else 0)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+import argparse
+from constants import *
+from topology import *
+
+
+# Policies for placing the application and IRQ CPUs of the connections
+# nic-local: both on the node of the NIC, on different physical cores
+# cross-numa: IRQs on the node of the NIC, the application on another node
+# smt-shared: both on the two hyperthreads of a core on the node of the NIC
+# smt-isolated: both on the node of the NIC, on cores that run nothing else
+PLACEMENT_POLICIES = ["nic-local", "cross-numa", "smt-shared", "smt-isolated"]
+
+# Configurations with a CPU for each connection on each side (the others run
+# all the connections on a single CPU)
+MULTIPLE_CPU_CONFIGS = {
+    "sender": ["one-to-one", "incast", "all-to-all"],
+    "receiver": ["one-to-one", "outcast", "all-to-all"],
+}
+
+
+# Physical cores of a node, as the lists of their SMT siblings
+def node_cores(topology, node):
+    cores = []
+    for cpu in topology["cpus"]:
+        if topology["nodes"][cpu] == node and topology["siblings"][cpu] not in cores:
+            cores.append(topology["siblings"][cpu])
+    return cores
+
+
+# CPUs of some nodes, with the first thread of every core before the second
+# ones, so that consecutive CPUs are on different cores
+def spread_cpus(topology, nodes):
+    cores = [core for node in nodes for core in node_cores(topology, node)]
+    threads = max([len(core) for core in cores] + [0])
+    return [core[i] for i in range(threads) for core in cores if i < len(core)]
+
+
+# (application CPU, IRQ CPU) of count connections under a policy
+def plan_pairs(topology, policy, count):
+    nodes = sorted(set(topology["nodes"].values()))
+    local = topology["iface_node"] if topology["iface_node"] in nodes else topology["nodes"][topology["cpus"][0]]
+    remote = [node for node in nodes if node != local]
+
+    if policy == "nic-local":
+        cpus = spread_cpus(topology, [local])
+        pairs = list(zip(cpus[0::2], cpus[1::2]))
+    elif policy == "cross-numa":
+        pairs = list(zip(spread_cpus(topology, remote), spread_cpus(topology, [local])))
+    elif policy == "smt-shared":
+        pairs = [(core[0], core[1]) for core in node_cores(topology, local) if len(core) > 1]
+    elif policy == "smt-isolated":
+        cores = node_cores(topology, local)
+        pairs = [(a[0], b[0]) for a, b in zip(cores[0::2], cores[1::2])]
+    else:
+        raise ValueError("Unknown placement policy {}.".format(policy))
+
+    if len(pairs) < count:
+        raise ValueError("Can't place {} connections {} on this host, node {} has room for {}.".format(count, policy, local, len(pairs)))
+    return pairs[:count]
+
+
+# CPUs of one side of an experiment (the --cpus and --affinity of the
+# experiment scripts, in the order of the connections), and the CPU the
+# traffic of each port is steered to ((None, cpu) for all the traffic)
+# All-to-all spreads the IRQs over every CPU with RSS
+def plan_placement(topology, policy, config, num_connections, role):
+    multiple = config in MULTIPLE_CPU_CONFIGS[role]
+    pairs = plan_pairs(topology, policy, num_connections if multiple else 1)
+    cpus = [app for app, _ in pairs]
+    if config == "all-to-all":
+        return {"cpus": cpus, "affinity": list(topology["cpus"]), "steering": []}
+
+    affinity = [irq for _, irq in pairs]
+    steering = [(BASE_PORT + n, cpu) for n, cpu in enumerate(affinity)] if multiple else [(None, affinity[0])]
+    return {"cpus": cpus, "affinity": affinity, "steering": steering}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the CPUs an experiment would use under a placement policy.")
+    parser.add_argument("policy", choices=PLACEMENT_POLICIES, help="Placement policy.")
+    parser.add_argument("--role", choices=["sender", "receiver"], required=True, help="Side of the experiment to place.")
+    parser.add_argument("--config", choices=["one-to-one", "incast", "outcast", "all-to-all", "single"], default="single", help="Configuration of the experiment.")
+    parser.add_argument("--num-connections", type=int, default=1, help="Number of connections.")
+    parser.add_argument("--iface", type=str, default=None, help="Network interface of the experiment (its node is the local one).")
+    parser.add_argument("--root", type=str, default="/", help="Read /sys and /proc under this directory (e.g., a copy captured on another host).")
+    args = parser.parse_args()
+
+    topology = host_topology(args.iface, args.root)
+    try:
+        plan = plan_placement(topology, args.policy, args.config, args.num_connections, args.role)
+    except ValueError as e:
+        print(e)
+        exit(1)
+
+    print("--cpus {} --affinity {}".format(" ".join(str(cpu) for cpu in plan["cpus"]), " ".join(str(cpu) for cpu in plan["affinity"])))
+    print("\t".join(["port", "irq cpu", "irq node", "rx queue"]))
+    for port, cpu in plan["steering"]:
+        print("\t".join(["all" if port is None else str(port), str(cpu), str(topology["nodes"][cpu]), str(topology["cpu_queues"].get(cpu, "-"))]))
@@ -1,9 +1,20 @@
-import os
 import re
+from latency_histogram import *
+from symbol_classifier import *
 
 
-# Path to the symbols map file
-SYMBOL_MAP_FILE = os.path.join(os.path.split(os.path.realpath(__file__))[0], "symbol_mapping.tsv")
+# Per-interval line of iperf (or the built-in traffic engine)
+# e.g. "[  3]  0.0- 1.0 sec  1.09 GBytes  9.39 Gbits/sec"
+INTERVAL_LINE = re.compile(r"\[\s*(\d+)\]\s+(\d+\.\d+)-\s*(\d+\.\d+)\s+sec\s+\S+\s+\S+\s+(\d+(?:\.\d+)?)\s+([GMK]?)bits/sec")
+BITS_PER_GBIT = {"G": 1, "M": 1e3, "K": 1e6, "": 1e9}
+
+# Kernel log line of the data copy latency patch
+# e.g. "[ 1234.567890] [data-copy-latency] latency=1234"
+LATENCY_TAG = "[data-copy-latency] latency="
+
+# Kernel log line of the skb sizes histogram patch (in bins of 5 KB)
+SKB_SIZES_TAG = "[skb-sizes] "
+SKB_SIZES_BINS = 13
 
 
 def process_throughput_output(lines):
@@ -30,6 +41,60 @@ def process_throughput_output(lines):
     return 0 if num_samples == 0 else throughput / num_samples
 
 
+# Parse a 1 second interval throughput line
+# Returns the flow, the start of the interval and the throughput in Gbps
+def process_interval_line(line):
+    match = INTERVAL_LINE.match(line)
+    if match is None:
+        return None
+
+    # Skip the final summary of the flow (and partial intervals)
+    flow, begin, end, value, unit = match.groups()
+    if not (0.5 <= float(end) - float(begin) <= 1.5):
+        return None
+
+    return flow, round(float(begin)), float(value) / BITS_PER_GBIT[unit]
+
+
+# Split the output of a benchmark process into the output of each flow
+# The built-in traffic engine interleaves the iperf-like output of all its flows
+def split_flow_output(lines):
+    flows = {}
+    for line in lines:
+        match = re.match(r"\[\s*(\d+)\]", line)
+        if match:
+            flows.setdefault(match.group(1), []).append(line)
+
+    # Output from netperf isn't tagged with a flow
+    if len(flows) == 0:
+        return [lines]
+
+    return list(flows.values())
+
+
+# Per-second throughput of each flow of the long flows
+# The flows are keyed by the benchmark process and the flow id
+def process_throughput_intervals(outputs):
+    flows = {}
+    for i, lines in enumerate(outputs):
+        for line in lines:
+            sample = process_interval_line(line)
+            if sample is not None:
+                flow, second, throughput = sample
+                flows.setdefault((i, flow), {})[second] = throughput
+
+    return flows
+
+
+# Sum of the throughput of the seconds every flow reported
+def aggregate_throughput_intervals(flows):
+    samples = []
+    while len(flows) > 0 and all(len(samples) in flow for flow in flows):
+        samples.append(sum(flow[len(samples)] for flow in flows))
+
+    return samples
+
+
 def process_util_output(lines):
     cpu_util = {}
     num_samples = {}
@@ -55,6 +120,24 @@ def process_util_output(lines):
     return cpu_util
 
 
+# Total utilisation of all the cores for each sar interval
+def process_util_series(lines):
+    series = []
+    cpus = set()
+    for line in lines:
+        elements = line.split()
+        if len(elements) == 9 and elements[2] != "CPU":
+            # A new interval starts when a core shows up again
+            cpu = int(elements[2])
+            if cpu in cpus or len(series) == 0:
+                series.append(0.)
+                cpus = set()
+            cpus.add(cpu)
+            series[-1] += 100 - float(elements[8])
+
+    return series
+
+
 def process_cache_miss_output(lines):
     cache_miss = 0.
 
@@ -69,22 +152,12 @@ def process_cache_miss_output(lines):
 
 
 def process_util_breakdown_output(lines):
-    contributions = {}
+    classifier = get_symbol_classifier()
+    contributions = {typ: 0. for typ in classifier.categories}
     not_found = []
-    symbol_map = {}
     total_contrib = 0.
     unaccounted_contrib = 0.
 
-    # Read the symbols map file
-    with open(SYMBOL_MAP_FILE, "r") as f:
-        for line in f.readlines():
-            comps = line.split()
-            if len(comps) == 2:
-                symbol, typ = line.split()
-                symbol_map[symbol] = typ
-                if typ not in contributions:
-                    contributions[typ] = 0.
-
     # Process the perf output to calculate breakdown
     for line in lines:
         if total_contrib < 95:
@@ -93,8 +166,8 @@ def process_util_breakdown_output(lines):
                 func = comps[4].split(".")[0]
                 contrib = float(comps[0][:-1])
                 total_contrib += contrib
-                if func in symbol_map:
-                    typ = symbol_map[func]
+                typ = classifier.classify(func)
+                if typ is not None:
                     contributions[typ] += contrib
                 else:
                     if contrib > 0.01:
@@ -103,42 +176,152 @@ def process_util_breakdown_output(lines):
         else:
             break
 
+    classifier.save()
     return total_contrib, unaccounted_contrib, contributions, not_found
 
 
+# Role of a CPU: "app" runs the benchmark, "irq" handles the interrupts, and
+# "app+irq" does both
+def cpu_role(cpu, app_cpus, irq_cpus):
+    if cpu in app_cpus and cpu in irq_cpus:
+        return "app+irq"
+    elif cpu in app_cpus:
+        return "app"
+    elif cpu in irq_cpus:
+        return "irq"
+    return None
+
+
+# Breakdown of every CPU from a profile keyed by CPU (see kernel_profile),
+# rolled up by the role of the CPU
+# Contributions are shares of all the samples, so the roles add up to the
+# breakdown of all the CPUs
+def process_util_breakdown_by_cpu(profile, app_cpus, irq_cpus):
+    classifier = get_symbol_classifier()
+    cpus = {cpu: {typ: 0. for typ in classifier.categories} for cpu in set(app_cpus + irq_cpus)}
+    for (cpu, _, _, symbol), share in profile.items():
+        typ = classifier.classify(symbol.split(".")[0])
+        if cpu in cpus and typ is not None:
+            cpus[cpu][typ] += share
+
+    roles = {}
+    for cpu, contributions in cpus.items():
+        role = roles.setdefault(cpu_role(cpu, app_cpus, irq_cpus), {typ: 0. for typ in classifier.categories})
+        for typ, contrib in contributions.items():
+            role[typ] += contrib
+
+    classifier.save()
+    return cpus, roles
+
+
+# Feed the data copy latency (ns) in the kernel logs to a histogram
+# Lines can be fed as they arrive
+def process_latency_lines(histogram, lines):
+    for line in lines:
+        idx = line.rfind(LATENCY_TAG)
+        if idx >= 0:
+            try:
+                histogram.record(int(line[idx + len(LATENCY_TAG):]))
+            except ValueError:
+                pass
+
+
 def process_latency_output(lines):
-    samples = []
+    histogram = LatencyHistogram()
+    process_latency_lines(histogram, lines)
+    return histogram
+
 
-    # Try to parse the latecy from dmesg output
+# Add the skb sizes histograms in the kernel logs to the counts
+# Lines can be fed as they arrive
+def process_skb_sizes_lines(counts, lines):
     for line in lines:
-        try:
-            samples.append(int(re.match(r"^.*\[data-copy-latency\] latency=(.*)$", line).group(1)))
-        except:
-            pass
+        idx = line.rfind(SKB_SIZES_TAG)
+        if idx >= 0:
+            for i, c in enumerate(line[idx + len(SKB_SIZES_TAG):].split()):
+                counts[i] += int(c)
 
-    # Sort and get average and tail
-    samples.sort()
-    num_samples = len(samples)
-    avg_latency = (sum(samples) / num_samples) / 1000
-    tail_latency = samples[max(num_samples - 1, round(0.99 * num_samples + 0.5))] / 1000
 
-    return avg_latency, tail_latency
+# Fraction of packets in each bin
+def process_skb_sizes_counts(counts):
+    total = sum(counts)
+    if total == 0:
+        return counts
+    else:
+        return [c / total for c in counts]
 
 
 def process_skb_sizes_output(lines):
-    skb_sizes = [0 for _ in range(13)]
+    skb_sizes = [0 for _ in range(SKB_SIZES_BINS)]
+    process_skb_sizes_lines(skb_sizes, lines)
+    return process_skb_sizes_counts(skb_sizes)
 
-    # Try to parse the histogram from dmesg output
+
+# Snapshot of a histogram file of the kernel patch
+# "<field> <value>" lines (layout and totals) come before "<bin> <count>" lines
+def process_kernel_hist(lines):
+    fields = {}
+    counts = {}
     for line in lines:
-        counts = re.match(r"^.*\[skb-sizes\] (.*)$", line)
-        if counts is not None:
-            for idx, c in enumerate(counts.group(1).split()):
-                skb_sizes[idx] += int(c)
-    total = sum(skb_sizes)
+        key, value = line.split()
+        if key.isdigit():
+            counts[int(key)] = int(value)
+        else:
+            fields[key] = int(value)
 
-    # Get the fraction of packets
-    if total == 0:
-        return skb_sizes
-    else:
-        return [s / total for s in skb_sizes]
+    return fields, counts
+
+
+# Difference between two snapshots of a kernel histogram
+# The fields in layout must not change between the snapshots
+def process_kernel_hist_delta(before_lines, after_lines, layout):
+    before_fields, before_counts = process_kernel_hist(before_lines)
+    fields, counts = process_kernel_hist(after_lines)
+    for key in layout:
+        if before_fields[key] != fields[key]:
+            raise ValueError("{} changed from {} to {} during the run.".format(key, before_fields[key], fields[key]))
+
+    fields = {key: value if key in layout else value - before_fields.get(key, 0) for key, value in fields.items()}
+    counts = {b: c - before_counts.get(b, 0) for b, c in counts.items() if c > before_counts.get(b, 0)}
+    return fields, counts
+
+
+# Data copy latency over the run from two snapshots of the kernel histogram
+# Samples are placed at the top of their bucket, but the mean is exact
+def process_latency_hist(before_lines, after_lines):
+    fields, counts = process_kernel_hist_delta(before_lines, after_lines, ["sub_bits"])
+    histogram = LatencyHistogram()
+    for bucket, count in counts.items():
+        histogram.record(kernel_bucket_range(bucket, fields["sub_bits"])[1], count)
+    histogram.total = fields["sum"]
+    return histogram
+
+
+# Fraction of packets in each bin over the run from two snapshots of the kernel
+# histogram, and the bins (KB)
+def process_skb_size_hist(before_lines, after_lines):
+    fields, counts = process_kernel_hist_delta(before_lines, after_lines, ["min", "width", "bins"])
+    width = fields["width"] / 1000
+    bins = [(i * width, (i + 1) * width) for i in range(fields["bins"])]
+    return process_skb_sizes_counts([counts.get(i, 0) for i in range(fields["bins"])]), bins
+
+
+# LLC miss rate for each interval of perf stat -I
+def process_cache_miss_series(lines):
+    loads = {}
+    misses = {}
+    for line in lines:
+        elements = line.split()
+        if len(elements) >= 3 and elements[2] in ["LLC-loads", "LLC-load-misses"]:
+            try:
+                time = float(elements[0])
+                count = int(elements[1].replace(",", ""))
+            except ValueError:
+                continue
+
+            if elements[2] == "LLC-loads":
+                loads[time] = count
+            else:
+                misses[time] = count
 
+    return [100 * misses[time] / loads[time] if loads[time] > 0 else 0 for time in sorted(loads) if time in misses]
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+from constants import *
+from results_store import *
+from stats import *
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Print a table of results from the results store.")
+
+    # Add arguments
+    parser.add_argument("--store", type=str, default=RESULTS_STORE_PATH, help="Results store to read.")
+    parser.add_argument("--suite", type=str, required=True, help="Suite of the runs.")
+    parser.add_argument("--labels", type=str, nargs="*", default=None, help="Labels of the runs, in the order of the rows (all the labels by default).")
+    parser.add_argument("--by", type=str, nargs="*", default=[], help="Experiment options that tell the rows of a label apart (e.g., num_connections).")
+    parser.add_argument("--where", type=str, nargs="*", default=[], help="Only use the runs with these experiment options (e.g., flow_type=long).")
+    parser.add_argument("--names", type=str, nargs="*", default=None, help="Header of the label and --by columns.")
+    parser.add_argument("--metrics", type=str, nargs="*", default=None, help="Columns of the summary to print.")
+    parser.add_argument("--table", type=str, default=None, help="Table to print (e.g., \"receiver utilisation breakdown\").")
+    parser.add_argument("--histogram", type=str, default=None, help="Histogram to print (e.g., \"skb sizes (KB)\").")
+    parser.add_argument("--series", type=str, default=None, help="Time series to print (e.g., \"throughput (Gbps)\").")
+
+    # Parse and verify arguments
+    args = parser.parse_args()
+    if sum(option is not None for option in [args.metrics, args.table, args.histogram, args.series]) != 1:
+        print("Please provide exactly one of --metrics, --table, --histogram and --series.")
+        exit(1)
+
+    if not os.path.exists(args.store):
+        print("{} doesn't exist.".format(args.store))
+        exit(1)
+
+    # The label column is left out if there's a single label
+    args.show_label = args.labels is None or len(args.labels) != 1
+    names = (["label"] if args.show_label else []) + args.by
+    if args.names is not None and len(args.names) != len(names):
+        print("Please provide as many --names as the label and --by columns ({}).".format(", ".join(names)))
+        exit(1)
+    args.names = args.names or names
+
+    where = {}
+    for condition in args.where:
+        name, sep, value = condition.partition("=")
+        if sep == "":
+            print("Please provide --where as name=value.")
+            exit(1)
+        where[name] = value
+    args.where = where
+
+    # Return parsed and verified arguments
+    return args
+
+
+# Values of a run, keyed by column
+def run_values(store, run, args):
+    if args.metrics is not None:
+        return store.metrics(run)
+    elif args.table is not None:
+        return dict(zip(*store.table(run, args.table)))
+    elif args.histogram is not None:
+        return {"{:g}-{:g}".format(low, high): count for low, high, count in store.histogram(run, args.histogram)}
+
+    series = store.series(run, args.series)
+    return {} if series is None else {"{:g}".format(i * series[0]): sample for i, sample in enumerate(series[1])}
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    store = ResultsStore(args.store)
+
+    # Samples of each column over the trials of each row
+    columns = [] if args.metrics is None else args.metrics
+    rows = []
+    for label, key, runs in store.latest_runs(args.suite, args.labels, args.by, args.where):
+        samples = {}
+        for run in runs:
+            for column, value in run_values(store, run, args).items():
+                if value is not None:
+                    samples.setdefault(column, []).append(value)
+        if args.metrics is None:
+            columns += [column for column in samples if column not in columns]
+
+        rows.append((([label] if args.show_label else []) + [str(value) for value in key], samples))
+    store.close()
+
+    # Bins and seconds go in order whatever run they first appear in
+    if args.histogram is not None or args.series is not None:
+        columns.sort(key=lambda column: float(column.split("-")[0]))
+
+    # Repeated trials add their confidence interval and count to the metrics
+    # and tables (histograms and series only get the mean of each bin/second)
+    trials = args.metrics is not None or args.table is not None
+    trials = trials and any(len(values) > 1 for _, samples in rows for values in samples.values())
+    header = args.names + columns
+    if trials:
+        header = args.names + [name for c in columns for name in [c, c + " 95% CI low", c + " 95% CI high", c + " trials"]]
+
+    print("\t".join(header))
+    for key, samples in rows:
+        output = key
+        for c in columns:
+            values = samples.get(c, [])
+            output.append("{:.3f}".format(mean(values)) if len(values) > 0 else "-")
+            if trials:
+                interval = bootstrap_interval(values)
+                output += ["-", "-"] if interval is None else ["{:.3f}".format(bound) for bound in interval]
+                output.append(str(len(values)))
+        print("\t".join(output))
@@ -0,0 +1,220 @@
+import array
+import json
+import sqlite3
+import sys
+import time
+
+
+# Every run gets a row in runs, keyed by its suite, label and experiment
+# parameters (JSON), and the rows of the other tables point to it
+# Repeated trials of an experiment are runs with the same key and a different
+# trial number
+# Parameters are also kept one per row so that runs can be looked up by any of
+# them through the index
+# run_keys maps the hash of everything that went into a run (see run_key in
+# run_experiment_sender.py) to the latest run with that hash
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    suite TEXT NOT NULL,
+    label TEXT NOT NULL,
+    params TEXT NOT NULL,
+    created REAL NOT NULL,
+    trial INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS runs_by_key ON runs (suite, label, params);
+
+CREATE TABLE IF NOT EXISTS run_keys (
+    key TEXT PRIMARY KEY,
+    run INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    spec TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS params (
+    run INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (run, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS params_by_value ON params (name, value, run);
+
+CREATE TABLE IF NOT EXISTS metrics (
+    run INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run, name)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS summary_tables (
+    run INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run, name, position)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS histograms (
+    run INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    low REAL NOT NULL,
+    high REAL NOT NULL,
+    count REAL NOT NULL,
+    PRIMARY KEY (run, name, low)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS series (
+    run INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    interval REAL NOT NULL,
+    samples BLOB NOT NULL,
+    PRIMARY KEY (run, name)
+) WITHOUT ROWID;
+"""
+
+
+# Parameters are stored as text: strings as they are, anything else as JSON
+# (e.g., 8, true, null or [0, 1])
+def param_text(value):
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+# Order numbers as numbers and everything else as text
+def value_order(value):
+    try:
+        return (0, float(value), "")
+    except (TypeError, ValueError):
+        return (1, 0., str(value))
+
+
+# Time series are stored as little endian doubles
+def pack_samples(samples):
+    samples = array.array("d", samples)
+    if sys.byteorder != "little":
+        samples.byteswap()
+    return samples.tobytes()
+
+
+def unpack_samples(data):
+    samples = array.array("d")
+    samples.frombytes(data)
+    if sys.byteorder != "little":
+        samples.byteswap()
+    return samples
+
+
+# Local SQLite store of the results of every run
+class ResultsStore:
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.executescript(SCHEMA)
+
+        # Stores created before trials were added
+        if "trial" not in [row[1] for row in self.db.execute("PRAGMA table_info(runs)")]:
+            with self.db:
+                self.db.execute("ALTER TABLE runs ADD COLUMN trial INTEGER NOT NULL DEFAULT 0")
+
+    def close(self):
+        self.db.close()
+
+    # Add a run and everything measured in it
+    # metrics is a list of (name, value), tables of (name, categories, values),
+    # histograms of (name, [(low, high, count)]) and series of (name, interval,
+    # samples)
+    # key is the hash of spec, and the run can be found from it later
+    # Returns the id of the run
+    def add_run(self, suite, label, params, metrics=[], tables=[], histograms=[], series=[], key=None, spec=None, trial=0):
+        with self.db:
+            cursor = self.db.execute("INSERT INTO runs (suite, label, params, created, trial) VALUES (?, ?, ?, ?, ?)", (suite, label, json.dumps(params, sort_keys=True), time.time(), trial))
+            run = cursor.lastrowid
+            self.db.executemany("INSERT INTO params VALUES (?, ?, ?)", [(run, name, param_text(value)) for name, value in params.items()])
+            self.db.executemany("INSERT OR REPLACE INTO metrics VALUES (?, ?, ?)", [(run, name, value) for name, value in metrics])
+            for name, categories, values in tables:
+                self.db.executemany("INSERT OR REPLACE INTO summary_tables VALUES (?, ?, ?, ?, ?)", [(run, name, i, category, value) for i, (category, value) in enumerate(zip(categories, values))])
+            for name, bins in histograms:
+                self.db.executemany("INSERT OR REPLACE INTO histograms VALUES (?, ?, ?, ?, ?)", [(run, name, low, high, count) for low, high, count in bins])
+            self.db.executemany("INSERT OR REPLACE INTO series VALUES (?, ?, ?, ?)", [(run, name, interval, pack_samples(samples)) for name, interval, samples in series])
+            if key is not None:
+                self.db.execute("INSERT OR REPLACE INTO run_keys VALUES (?, ?, ?)", (key, run, json.dumps(spec, sort_keys=True)))
+
+        return run
+
+    # Latest run with the given key, or None if there's none or one of its
+    # metrics didn't come out (NaN is stored as NULL)
+    def cached_run(self, key):
+        row = self.db.execute("SELECT run FROM run_keys WHERE key = ?", (key,)).fetchone()
+        if row is None or self.db.execute("SELECT 1 FROM metrics WHERE run = ? AND value IS NULL", (row[0],)).fetchone() is not None:
+            return None
+        return row[0]
+
+    # Trials of the latest experiment of a suite for each label and value of
+    # the given parameters (the latest run of each trial)
+    # Only the runs whose parameters match all of where ({name: value}) are
+    # considered
+    # Returns [(label, (values of by), [runs])], in the order of labels (or of
+    # the label names if no labels are given), then of the values
+    def latest_runs(self, suite, labels=None, by=[], where={}):
+        query = "SELECT r.id, r.label, r.params, r.trial" + "".join(", p{}.value".format(i) for i in range(len(by))) + " FROM runs r"
+        values = []
+        for i, name in enumerate(by):
+            query += " LEFT JOIN params p{0} ON p{0}.run = r.id AND p{0}.name = ?".format(i)
+            values.append(name)
+
+        conditions = ["r.suite = ?"]
+        values.append(suite)
+        for name, value in where.items():
+            conditions.append("r.id IN (SELECT run FROM params WHERE name = ? AND value = ?)")
+            values += [name, param_text(value)]
+
+        if labels is not None:
+            conditions.append("r.label IN ({})".format(", ".join("?" * len(labels))))
+            values += labels
+
+        latest = {}
+        trials = {}
+        for row in self.db.execute(query + " WHERE " + " AND ".join(conditions) + " ORDER BY r.id", values):
+            key = (row[1], tuple(row[4:]))
+            latest[key] = row[2]
+            trials.setdefault(key + (row[2],), {})[row[3]] = row[0]
+
+        order = {label: i for i, label in enumerate(labels or [])}
+        keys = sorted(latest, key=lambda key: (order.get(key[0], 0), key[0] if labels is None else "", [value_order(v) for v in key[1]]))
+        return [(label, key, sorted(trials[(label, key, latest[(label, key)])].values())) for label, key in keys]
+
+    # Trials of every experiment (the latest run of each trial), keyed by
+    # (suite, label, params)
+    def experiments(self, suite=None):
+        query = "SELECT id, suite, label, params, trial FROM runs"
+        values = []
+        if suite is not None:
+            query += " WHERE suite = ?"
+            values.append(suite)
+
+        trials = {}
+        for run, suite, label, params, trial in self.db.execute(query + " ORDER BY id", values):
+            trials.setdefault((suite, label, params), {})[trial] = run
+        return {key: sorted(runs.values()) for key, runs in trials.items()}
+
+    def metrics(self, run):
+        return dict(self.db.execute("SELECT name, value FROM metrics WHERE run = ?", (run,)))
+
+    # Categories and values of a table of a run, in the order they were printed
+    def table(self, run, name):
+        rows = self.db.execute("SELECT category, value FROM summary_tables WHERE run = ? AND name = ? ORDER BY position", (run, name)).fetchall()
+        return [row[0] for row in rows], [row[1] for row in rows]
+
+    # All the tables of a run, as {name: {category: value}}
+    def tables(self, run):
+        tables = {}
+        for name, category, value in self.db.execute("SELECT name, category, value FROM summary_tables WHERE run = ?", (run,)):
+            tables.setdefault(name, {})[category] = value
+        return tables
+
+    def histogram(self, run, name):
+        return self.db.execute("SELECT low, high, count FROM histograms WHERE run = ? AND name = ? ORDER BY low", (run, name)).fetchall()
+
+    # (interval, samples) of a series of a run, or None
+    def series(self, run, name):
+        row = self.db.execute("SELECT interval, samples FROM series WHERE run = ? AND name = ?", (run, name)).fetchone()
+        return None if row is None else (row[0], unpack_samples(row[1]))
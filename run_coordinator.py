@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import run_experiment_receiver as receiver_side
+import run_experiment_sender as sender_side
+from constants import *
+from control import *
+from latency_histogram import *
+from metric_windows import *
+
+
+# Options that must be the same on every agent so that they agree on the windows
+SHARED_OPTIONS = [m.name for m in METRICS] + ["combined", "duration", "steady_state", "adaptive", "ci_width", "max_duration"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run a TCP measurement experiment across many sender and receiver agents.")
+
+    # Add arguments
+    parser.add_argument("spec", type=str, help="JSON file describing the experiment and the agents.")
+
+    # Parse and verify arguments
+    args = parser.parse_args()
+    with open(args.spec, "r") as f:
+        spec = json.load(f)
+
+    # Report errors
+    for role in ["senders", "receivers"]:
+        if len(spec.get(role, [])) == 0:
+            print("Please provide at least one agent in \"{}\".".format(role))
+            exit(1)
+
+        for agent in spec[role]:
+            if "host" not in agent:
+                print("Please provide the \"host\" of every agent in \"{}\".".format(role))
+                exit(1)
+
+            for option in SHARED_OPTIONS:
+                if option in agent:
+                    print("Can't override \"{}\" for a single agent, set it in \"experiment\".".format(option))
+                    exit(1)
+
+    # Each sender would stop its own flows once its throughput converges, and
+    # the others would carry on without its traffic
+    if spec.get("experiment", {}).get("adaptive", False):
+        print("Can't set \"adaptive\" for the coordinator, set \"duration\" instead.")
+        exit(1)
+
+    # Fill in the experiment options shared by all agents
+    args.experiment = spec.get("experiment", {})
+    args.senders = spec["senders"]
+    args.receivers = spec["receivers"]
+
+    # Return parsed and verified arguments
+    return args
+
+
+# Experiment options of a single agent
+# Only the options known to the agent's script are passed on
+def build_agent_spec(experiment, agent, parser):
+    known = vars(parser.parse_args([]))
+    spec = {key: value for key, value in experiment.items() if key in known}
+    spec.update({key: value for key, value in agent.items() if key != "host"})
+    return spec
+
+
+# Merge the results from several agents with the same role
+# Throughput and utilisation add up, rates are averaged, and breakdowns are
+# weighted by the utilisation of each agent (if it was measured)
+def merge_results(all_results):
+    merged = {}
+    weights = [r.get("cpu_util", 1) for r in all_results]
+
+    # Idle agents (or a utilisation that came out 0) weigh the same
+    if sum(weights) == 0:
+        weights = [1] * len(all_results)
+    for key in ["throughput", "cpu_util"]:
+        if key in all_results[0]:
+            merged[key] = sum(r[key] for r in all_results)
+
+    for key in ["cache_miss", "avg_latency"]:
+        if key in all_results[0]:
+            merged[key] = sum(r[key] for r in all_results) / len(all_results)
+
+    if "tail_latency" in all_results[0]:
+        merged["tail_latency"] = max(r["tail_latency"] for r in all_results)
+
+    # Latency over the samples of all the agents
+    if all("latency_hist" in r for r in all_results):
+        histogram = LatencyHistogram()
+        for r in all_results:
+            histogram.merge(LatencyHistogram.from_dict(r["latency_hist"]))
+        merged["latency_hist"] = histogram.to_dict()
+        merged["avg_latency"] = histogram.mean() / 1000
+        merged["tail_latency"] = histogram.percentile(99) / 1000
+
+    for key in ["util_contibutions", "cache_contibutions"]:
+        if key in all_results[0]:
+            categories = set(c for r in all_results for c in r[key])
+            merged[key] = {c: sum(w * r[key].get(c, 0) for w, r in zip(weights, all_results)) / sum(weights) for c in categories}
+
+    for key in ["util_role_contibutions", "cache_role_contibutions"]:
+        if all(key in r for r in all_results):
+            roles = set(role for r in all_results for role in r[key])
+            merged[key] = {}
+            for role in roles:
+                categories = set(c for r in all_results for c in r[key].get(role, {}))
+                merged[key][role] = {c: sum(w * r[key].get(role, {}).get(c, 0) for w, r in zip(weights, all_results)) / sum(weights) for c in categories}
+
+    # The seconds line up since all the senders are released together
+    if all("throughput_series" in r for r in all_results):
+        merged["throughput_series"] = [sum(samples) for samples in zip(*[r["throughput_series"] for r in all_results])]
+
+    if "skb_sizes" in all_results[0]:
+        merged["skb_sizes"] = [sum(sizes) / len(all_results) for sizes in zip(*[r["skb_sizes"] for r in all_results])]
+        if "skb_size_bins" in all_results[0]:
+            merged["skb_size_bins"] = all_results[0]["skb_size_bins"]
+
+    return merged
+
+
+# Worst skew across agents, or None if any agent didn't report it
+def max_skew(skews):
+    return None if None in skews else max(skews)
+
+
+if __name__ == "__main__":
+    # Parse args
+    args = parse_args()
+
+    # The coordinator prints the summary as if it was a single sender
+    summary_args = sender_side.build_parser().parse_args([])
+    for key, value in args.experiment.items():
+        setattr(summary_args, key, value)
+
+    # Connect to all the agents, waiting till they are ready
+    senders = [connect(agent["host"], AGENT_PORT) for agent in args.senders]
+    receivers = [connect(agent["host"], COMM_PORT) for agent in args.receivers]
+
+    # Hand the experiment to every agent
+    for agents, channels, parser in [(args.senders, senders, sender_side.build_parser()), (args.receivers, receivers, receiver_side.build_parser())]:
+        for agent, channel in zip(agents, channels):
+            if not channel.expect("hello")["daemon"]:
+                print("[coordinator] {} is not running as a daemon.".format(agent["host"]))
+                exit(1)
+
+            channel.send("experiment", spec=build_agent_spec(args.experiment, agent, parser))
+            reply = channel.expect("accepted", "rejected")
+            if reply["type"] == "rejected":
+                print("[coordinator] {} rejected the experiment: {}".format(agent["host"], reply["error"]))
+                exit(1)
+
+    # Drive all the agents through the same windows
+    # The receivers start once every sender is ready, and all the senders are
+    # released together once every receiver is ready
+    control = []
+    for window in plan_windows(summary_args, summary_args.combined):
+        label = window_label(window)
+        for sender in senders:
+            sender.wait("sender-ready")
+
+        for receiver in receivers:
+            receiver.signal("sender-ready")
+
+        for receiver in receivers:
+            receiver.wait("receiver-ready")
+
+        for sender in senders:
+            sender.signal("receiver-ready")
+        print("[{}] started on {} senders and {} receivers.".format(label, len(senders), len(receivers)))
+
+        for sender in senders:
+            sender.wait("sender-done")
+
+        for receiver in receivers:
+            receiver.signal("sender-done")
+        print("[{}] finished experiment.".format(label))
+
+        # The receivers measure over the seconds all the senders were steady
+        if summary_args.steady_state:
+            windows = [sender.expect("steady-state") for sender in senders]
+            begin = max(w["begin"] for w in windows)
+            end = min(w["end"] for w in windows)
+            for receiver in receivers:
+                receiver.send("steady-state", begin=begin, end=end)
+            print("[{}] steady state: {}-{} s".format(label, begin, end))
+
+        control.append((label, max_skew([sender.skew("receiver-ready") for sender in senders]), max_skew([receiver.skew("sender-done") for receiver in receivers])))
+
+    # Collect the results pushed by the agents
+    sender_results = [sender.expect("results")["results"] for sender in senders]
+    receiver_results = [receiver.expect("results")["results"] for receiver in receivers]
+    for channel in senders + receivers:
+        channel.close()
+
+    # Print the results of every agent
+    print("[agents]")
+    print("\t".join(["role", "host", "throughput (Gbps)", "utilisation (%)"]))
+    for role, agents, all_results in [("sender", args.senders, sender_results), ("receiver", args.receivers, receiver_results)]:
+        for agent, results in zip(agents, all_results):
+            columns = [role, agent["host"]]
+            columns += ["{:.3f}".format(results[key]) if key in results else "-" for key in ["throughput", "cpu_util"]]
+            print("\t".join(columns))
+
+    # Merge the results and print them like a single sender would
+    results = merge_results(sender_results)
+    merged_receiver_results = merge_results(receiver_results)
+    merged_receiver_results["header"], merged_receiver_results["output"] = receiver_side.summarise(summary_args, merged_receiver_results)
+    sender_side.print_summary(summary_args, results, merged_receiver_results)
+    sender_side.store_summary(summary_args, results, merged_receiver_results)
+
+    # The coordination delay adds up from the agents to the coordinator and back
+    rows = []
+    for i, (label, release_skew, done_skew) in enumerate(control):
+        receiver_ready_skews = [r["control"][i]["receiver_ready_skew"] for r in receiver_results]
+        sender_done_skews = [r["control"][i]["sender_done_skew"] for r in sender_results]
+        receiver_ready_skew = None if None in receiver_ready_skews + [release_skew] else max(receiver_ready_skews) + release_skew
+        sender_done_skew = None if None in sender_done_skews + [done_skew] else max(sender_done_skews) + done_skew
+        duration = max(r["control"][i]["duration"] for r in sender_results)
+        rows.append((label, receiver_ready_skew, sender_done_skew, duration))
+    sender_side.print_control(rows)
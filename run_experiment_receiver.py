@@ -1,16 +1,26 @@
 #!/usr/bin/env python3
 
 import argparse
+import copy
 import os
 import shlex
+import shutil
 import signal
 import subprocess as _sp
+import sys
 import tempfile
-import threading
 import time
-import xmlrpc.server
 from constants import *
+from control import *
+from host_state import *
+from kmsg_reader import *
+from metric_windows import *
+from perf_data import *
+from placement import *
 from process_output import *
+from stats import *
+from stream_reader import *
+from topology import *
 
 
 # For debugging
@@ -30,7 +40,7 @@ class subprocess:
         return _sp.Popen(*args, **kwargs)
 
 
-def parse_args():
+def build_parser():
     parser = argparse.ArgumentParser(description="Run TCP measurement experiments on the receiver.")
 
     # Add arguments
@@ -38,9 +48,12 @@ def parse_args():
     parser.add_argument("--config", choices=["one-to-one", "incast", "outcast", "all-to-all", "single"], default="single", help="Configuration to run the experiment with.")
     parser.add_argument("--cpus", type=int, nargs="*", help="Which CPUs to use for experiment.")
     parser.add_argument("--affinity", type=int, nargs="*", help="Which CPUs are being used for IRQ processing.")
+    parser.add_argument("--placement", choices=PLACEMENT_POLICIES, default=None, help="Pick --cpus and --affinity with a placement policy.")
+    parser.add_argument("--iface", type=str, default=None, help="Interface of the experiment, for --placement.")
     parser.add_argument("--num-connections", type=int, default=1, help="Number of connections.")
     parser.add_argument("--arfs", action="store_true", default=False, help="This experiment is run with aRFS.")
     parser.add_argument("--window", type=int, default=None, help="Specify the TCP window size (KB).")
+    parser.add_argument("--engine", choices=["iperf", "builtin"], default="iperf", help="Run long flows with iperf or with the built-in traffic engine.")
     parser.add_argument("--packet-drop", type=int, default=0, help="Inverse packet drop rate.")
     parser.add_argument("--output", type=str, default=None, help="Write raw output to the directory.")
     parser.add_argument("--throughput", action="store_true", help="Measure throughput.")
@@ -51,45 +64,62 @@ def parse_args():
     parser.add_argument("--flame", action="store_true", help="Create a flamegraph from the experiment.")
     parser.add_argument("--latency", action="store_true", help="Calculate the average data copy latency for each packet.")
     parser.add_argument("--skb-hist", action="store_true", help="Record the skb sizes histogram.")
+    parser.add_argument("--combined", action="store_true", help="Measure all compatible metrics in a shared traffic window.")
+    parser.add_argument("--steady-state", action="store_true", help="Measure over the steady-state window picked by the sender.")
+    parser.add_argument("--daemon", action="store_true", help="Keep running and accept experiments from the sender.")
+    parser.add_argument("--num-experiments", type=int, default=None, help="Exit the daemon after this many experiments.")
     parser.add_argument("--verbose", action="store_true", help="Print extra output.")
 
-    # Parse and verify arguments
-    args = parser.parse_args()
+    return parser
+
 
+# Verify the experiment arguments and fill in the defaults
+# Returns an error message if the arguments are invalid
+def verify_args(args):
     # Report errors
     if args.config == "single" and args.num_connections != 1:
-        print("Can't set --num-connections > 1 with --config single.")
-        exit(1)
+        return "Can't set --num-connections > 1 with --config single."
 
     if args.flow_type == "mixed" and args.config != "single":
-        print("--flow-type mixed can only be combined with --config single.")
-        exit(1)
+        return "--flow-type mixed can only be combined with --config single."
 
     if not (1 <= args.num_connections <= MAX_CONNECTIONS):
-        print("Can't set --num-connections outside of [1, {}].".format(MAX_CONNECTIONS))
-        exit(1)
+        return "Can't set --num-connections outside of [1, {}].".format(MAX_CONNECTIONS)
+
+    if args.steady_state and args.flow_type != "long":
+        return "Can't set --steady-state for --flow-type short/mixed."
 
     if args.window is not None and args.flow_type != "long":
-        print("Can't set --window for --flow-type short/mixed.")
-        exit(1)
+        return "Can't set --window for --flow-type short/mixed."
 
     if args.flame and args.output is None:
-        print("Please provide --output if using --flame.")
-        exit(1)
+        return "Please provide --output if using --flame."
+
+    # Plan the CPUs with a placement policy
+    if args.placement is not None:
+        if args.cpus is not None or args.affinity is not None or args.arfs:
+            return "Can't set --cpus, --affinity or --arfs with --placement."
+        if args.iface is None:
+            return "Please provide --iface with --placement."
+
+        try:
+            plan = plan_placement(host_topology(args.iface), args.placement, args.config, args.num_connections, "receiver")
+        except ValueError as e:
+            return str(e)
+        args.cpus = plan["cpus"]
+        args.affinity = plan["affinity"]
 
     # Set CPUs to be used
+    cpus = host_topology()["cpus"]
     if args.cpus is not None:
         if args.config in ["single", "incast"] and len(args.cpus) != 1:
-            print("Please provide only 1 --cpus for --config incast/single.")
-            exit(1)
+            return "Please provide only 1 --cpus for --config incast/single."
 
         if args.config in ["one-to-one", "outcast", "all-to-all"] and len(args.cpus) != args.num_connections:
-            print("Please provide as many --cpus as --num-connections for --config outcast/one-to-one/all-to-all.")
-            exit(1)
+            return "Please provide as many --cpus as --num-connections for --config outcast/one-to-one/all-to-all."
 
-        if not all(map(lambda c: 0 <= c < MAX_CPUS, args.cpus)):
-            print("Can't set --cpus outside of [0, {}].".format(MAX_CPUS))
-            exit(1)
+        if not all(map(lambda c: c in cpus, args.cpus)):
+            return "Can't set --cpus outside of the CPUs of the host ({}).".format(format_cpu_list(cpus))
     else:
         if args.config in ["incast", "single"]:
             args.cpus = [0]
@@ -97,21 +127,19 @@ def parse_args():
             args.cpus = list(range(args.num_connections))
 
     if args.arfs and args.affinity is not None:
-        print("Can't set --affinity with --arfs.")
-        exit(0)
+        return "Can't set --affinity with --arfs."
 
     # Set IRQ processing CPUs
     if args.affinity is not None:
-        if not all(map(lambda c: 0 <= c < MAX_CPUS, args.affinity)):
-            print("Can't set --affinity outside of [0, {}].".format(MAX_CPUS))
-            exit(1)
+        if not all(map(lambda c: c in cpus, args.affinity)):
+            return "Can't set --affinity outside of the CPUs of the host ({}).".format(format_cpu_list(cpus))
     elif not args.arfs:
         if args.config in ["incast", "single"]:
             args.affinity = [1]
         elif args.config in ["outcast", "one-to-one"]:
             args.affinity = [cpu + 1 for cpu in args.cpus]
         elif args.config == "all-to-all":
-            args.affinity = list(range(MAX_CPUS))
+            args.affinity = cpus
     else:
         args.affinity = []
 
@@ -119,123 +147,175 @@ def parse_args():
     if args.output is not None:
         os.makedirs(args.output, exist_ok=True)
 
+    return None
+
+
+def parse_args():
+    args = build_parser().parse_args()
+
+    # The daemon receives the experiment arguments from the sender
+    if args.daemon:
+        if args.num_experiments is not None and args.num_experiments < 1:
+            print("Can't set --num-experiments < 1.")
+            exit(1)
+
+        if args.output is not None:
+            os.makedirs(args.output, exist_ok=True)
+
+        return args
+
+    if args.num_experiments is not None:
+        print("Can't set --num-experiments without --daemon.")
+        exit(1)
+
+    # Parse and verify arguments
+    error = verify_args(args)
+    if error is not None:
+        print(error)
+        exit(1)
+
     # Return parsed and verified arguments
     return args
 
 
-# Need to synchronize with the sender before starting experiment
-server = xmlrpc.server.SimpleXMLRPCServer(("0.0.0.0", COMM_PORT), logRequests=False)
-server.register_introspection_functions()
-server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+# Build the arguments of an experiment submitted to the daemon
+# The raw outputs are written to a directory of the same name under the
+# daemon's --output directory
+def parse_spec(spec, daemon_args):
+    args = build_parser().parse_args([])
+    for key, value in spec.items():
+        if key in ["daemon", "num_experiments", "verbose"] or not hasattr(args, key):
+            return None, "Unknown experiment option {}.".format(key)
+        setattr(args, key, value)
 
+    if args.output is not None and daemon_args.output is not None:
+        args.output = os.path.join(daemon_args.output, os.path.basename(os.path.normpath(args.output)))
+    else:
+        args.output = None
+    args.verbose = daemon_args.verbose
 
-# Event objects to synchronize sender and receiver
-__sender_ready = threading.Event()
-__receiver_ready = threading.Event()
-__sender_done = threading.Event()
-
+    error = verify_args(args)
+    if error is not None:
+        return None, error
 
-# Stores the results from the receiver
-__results = {}
+    return args, None
 
 
-# Functions to query/set synchronization events
-def mark_sender_ready():
-    __sender_ready.set()
-    return True
+# Convenience functions
+def clear_processes():
+    os.system("pkill iperf")
+    os.system("pkill -f '[t]raffic.py'")
+    os.system("pkill netserver")
+    os.system("pkill netperf")
+    os.system("pkill perf")
+    os.system("pkill sar")
 
 
-def is_receiver_ready():
-    __receiver_ready.wait()
-    __receiver_ready.clear()
-    return True
+def iperf_args(cpu, port, window):
+    if window is None:
+        return ["taskset", "-c", str(cpu), "iperf", "-i", "1", "-s", "-p", str(port)]
+    else:
+        return ["taskset", "-c", str(cpu), "iperf", "-s", "-i", "1", "-p", str(port), "-w", str(window / 2) + "K"]
 
 
-def mark_receiver_ready():
-    __receiver_ready.set()
-    return True
+def traffic_args(cpu, ports, window):
+    args = ["taskset", "-c", str(cpu), sys.executable, TRAFFIC_PATH, "server", "--ports"] + [str(port) for port in ports]
+    if window is not None:
+        args += ["--window", str(window / 2)]
 
+    return args
 
-def is_sender_ready():
-    __sender_ready.wait()
-    __sender_ready.clear()
-    return True
 
+def netserver_args(cpu, port):
+    return ["taskset", "-c", str(cpu), "netserver", "-p", str(port), "-D", "f"]
 
-def mark_sender_done():
-    __sender_done.set()
-    return True
 
+# A listener process with its output drained by the reader pool
+class Listener:
+    def __init__(self, args):
+        self.proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, universal_newlines=True)
+        self.output = get_reader_pool().add(self.proc)
 
-def is_sender_done():
-    __sender_done.wait()
-    __sender_done.clear()
-    return True
+    # Return the output since the last call
+    def readlines(self):
+        return self.output.take()
 
+    def kill(self):
+        self.proc.kill()
+        self.output.wait()
 
-def get_results():
-    return __results
 
+# Listeners are reused across experiments when they have the same command line,
+# so the daemon doesn't restart the iperf/netserver instances between runs
+class ListenerPool:
+    def __init__(self):
+        self.listeners = {}
 
-# Register functions
-server.register_function(mark_sender_ready)
-server.register_function(is_receiver_ready)
-server.register_function(mark_sender_done)
-server.register_function(get_results)
+    def start(self, all_args):
+        keys = [tuple(args) for args in all_args]
 
+        # Stop the listeners that are not needed anymore (or died)
+        for key in list(self.listeners.keys()):
+            if key not in keys or self.listeners[key].proc.poll() is not None:
+                self.listeners.pop(key).kill()
 
-# Convenience functions
-def clear_processes():
-    os.system("pkill iperf")
-    os.system("pkill netserver")
-    os.system("pkill netperf")
-    os.system("pkill perf")
-    os.system("pkill sar")
+        # Start the missing listeners
+        for key in keys:
+            if key not in self.listeners:
+                self.listeners[key] = Listener(list(key))
 
+        return [self.listeners[key] for key in keys]
 
-def run_iperf(cpu, port, window):
-    if window is None:
-        args = ["taskset", "-c", str(cpu), "iperf", "-i", "1", "-s", "-p", str(port)]
-    else:
-        args = ["taskset", "-c", str(cpu), "iperf", "-s", "-i", "1", "-p", str(port), "-w", str(window / 2) + "K"]
+    def stop(self):
+        for listener in self.listeners.values():
+            listener.kill()
+        self.listeners = {}
 
-    return subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, universal_newlines=True)
 
+# Long flows run with one iperf server process per flow, or with one traffic
+# engine process per CPU that multiplexes all the flows of that CPU
+def long_flow_args(engine, flows, window):
+    if engine == "iperf":
+        return [iperf_args(cpu, port, window) for cpu, port in flows]
 
-def run_netperf(cpu, port):
-    args = ["taskset", "-c", str(cpu), "netserver", "-p", str(port), "-D", "f"]
+    ports = {}
+    for cpu, port in flows:
+        ports.setdefault(cpu, []).append(port)
 
-    return subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, universal_newlines=True)
+    return [traffic_args(cpu, cpu_ports, window) for cpu, cpu_ports in ports.items()]
 
 
-# We run one iperf server process per flow, and one netserver process per CPU
-def run_flows(flow_type, config, num_connections, cpus, window):
-    procs = []
+# We run one netserver process per CPU for short flows
+def run_flows(flow_type, config, engine, num_connections, cpus, window, pool):
+    flows = []
+    args = []
     if flow_type == "mixed":
-        procs.append(run_iperf(cpus[0], BASE_PORT, window))
-        procs.append(run_netperf(cpus[0], ADDITIONAL_BASE_PORT))
+        flows.append((cpus[0], BASE_PORT))
+        args.append(netserver_args(cpus[0], ADDITIONAL_BASE_PORT))
     elif flow_type == "long":
         if config == "single":
-            procs.append(run_iperf(cpus[0], BASE_PORT, window))
+            flows.append((cpus[0], BASE_PORT))
         elif config == "incast":
-            procs += [run_iperf(cpus[0], BASE_PORT + n, window) for n in range(num_connections)]
+            flows += [(cpus[0], BASE_PORT + n) for n in range(num_connections)]
         elif config in ["outcast", "one-to-one"]:
-            procs += [run_iperf(cpu, BASE_PORT + n, window) for n, cpu in enumerate(cpus)]
+            flows += [(cpu, BASE_PORT + n) for n, cpu in enumerate(cpus)]
         else:
             for i, sender_cpu in enumerate(cpus):
                 for j, receiver_cpu in enumerate(cpus):
-                    procs.append(run_iperf(receiver_cpu, BASE_PORT + i * MAX_CONNECTIONS + j, window))
+                    flows.append((receiver_cpu, BASE_PORT + i * MAX_CONNECTIONS + j))
     else:
         if config in ["single", "incast"]:
-            procs.append(run_netperf(cpus[0], BASE_PORT))
+            args.append(netserver_args(cpus[0], BASE_PORT))
         else:
-            procs += [run_netperf(cpu, BASE_PORT + n) for n, cpu in enumerate(cpus)]
+            args += [netserver_args(cpu, BASE_PORT + n) for n, cpu in enumerate(cpus)]
 
-    return procs
+    return pool.start(long_flow_args(engine, flows, window) + args)
 
 
-def run_perf_cache(cpus):
+def run_perf_cache(cpus, interval):
     args = [PERF_PATH, "stat", "-C", ",".join(map(str, set(cpus))), "-e", "LLC-loads,LLC-load-misses,LLC-stores,LLC-store-misses"]
+    if interval:
+        args += ["-I", "1000"]
     return subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, universal_newlines=True)
 
 
@@ -259,6 +339,22 @@ def run_perf_report(perf_data_file):
     return subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, universal_newlines=True)
 
 
+# Kernel lines of the perf report of a recording, and its profile by CPU
+# The recording is read directly, unless the kernel symbols can't be read (then
+# there's no profile)
+def read_perf_report(perf_data_file):
+    try:
+        profile = kernel_profile(perf_data_file)
+        return perf_report_lines(profile), profile
+    except (OSError, ValueError) as e:
+        print("[perf] can't read {} directly, running perf report: {}".format(perf_data_file, e))
+
+    perf = run_perf_report(perf_data_file)
+    lines = perf.stdout.readlines()
+    perf.wait()
+    return lines, None
+
+
 def run_flamegraph(perf_data_file, output_svg_file):
     os.system("{} script -i {} | {}/stackcollapse-perf.pl > out.perf-folded".format(PERF_PATH, perf_data_file, FLAME_PATH))
     os.system("{}/flamegraph.pl out.perf-folded > {}".format(FLAME_PATH, output_svg_file))
@@ -269,13 +365,9 @@ def run_sar(cpus):
     return subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, universal_newlines=True)
 
 
-def dmesg_clear():
-    os.system("dmesg -c > /dev/null 2> /dev/null")
-
-
-def run_dmesg(level="info"):
-    args = ["dmesg", "-c", "-l", level]
-    return subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, universal_newlines=True)
+def read_kernel_hist(path):
+    with open(path, "r") as f:
+        return f.readlines()
 
 
 def latency_measurement(enabled):
@@ -290,385 +382,344 @@ def set_packet_drop_rate(rate):
     os.system("sysctl -w net.core.packet_loss_gen={}".format(rate))
 
 
-if __name__ == "__main__":
-    # Parse args
-    args = parse_args()
-    if args.verbose:
-        subprocess.enable_logging()
-
-    # Start the XMLRPC server thread
-    server_thread.start()
+# Only touch the sysctl when the rate changes between experiments
+__packet_drop = None
 
-    # Set packet drop rate
-    set_packet_drop_rate(args.packet_drop)
 
-    # Print the output directory
-    if args.output is not None:
-        print("[output] writing results to {}".format(args.output))
+def update_packet_drop_rate(rate):
+    global __packet_drop
+    if rate != __packet_drop:
+        set_packet_drop_rate(rate)
+        __packet_drop = rate
 
-    # Run the experiments
-    clear_processes()
-    header = []
-    output = []
-    if args.throughput:
-        # Wait till sender starts
-        is_sender_ready()
-        print("[throughput] starting experiment...")
-
-        # Start iperf and/or netperf instances
-        procs = run_flows(args.flow_type, args.config, args.num_connections, args.cpus, args.window)
-
-        # Wait till sender is done sending
-        mark_receiver_ready()
-        is_sender_done()
-
-        # Kill all the processes
-        for p in procs:
-            p.kill()
-        print("[throughput] finished experiment.")
-
-        # Process and write the raw output
-        for i, p in enumerate(procs):
-            lines = p.stdout.readlines()
-            if args.output is not None:
-                with open(os.path.join(args.output, "throughput_benchmark_{}.log".format(i)), "w") as f:
-                    f.writelines(lines)
 
-    if args.utilisation:
-        # Wait till sender starts
-        is_sender_ready()
-        print("[utilisation] starting experiment...")
-
-        # Start iperf and/or netperf instances
-        procs = run_flows(args.flow_type, args.config, args.num_connections, args.cpus, args.window)
-
-        # Start the sar instance
-        sar = run_sar(list(set(args.cpus + args.affinity)))
-
-        # Wait till sender is done sending
-        mark_receiver_ready()
-        is_sender_done()
-
-        # Kill sar
-        sar.send_signal(signal.SIGINT)
-        sar.wait()
-
-        # Kill all the processes
-        for p in procs:
-            p.kill()
-        print("[utilisation] finished experiment.")
-
-        # Process and write the raw output
-        for i, p in enumerate(procs):
-            lines = p.stdout.readlines()
-            if args.output is not None:
-                with open(os.path.join(args.output, "utilisation_benchmark_{}.log".format(i)), "w") as f:
-                    f.writelines(lines)
-
-        lines = sar.stdout.readlines()
-        cpu_util = sum(process_util_output(lines).values())
-        __results["cpu_util"] = cpu_util
-        if args.output is not None:
-            with open(os.path.join(args.output, "utilisation_sar.log"), "w") as f:
-                f.writelines(lines)
+def raw_output_path(output, filename):
+    return None if output is None else os.path.join(output, filename)
 
-        # Print the output
-        print("[utilisation] utilisation: {:.3f}".format(cpu_util))
-        header.append("receiver utilisation (%)")
-        output.append("{:.3f}".format(cpu_util))
 
-    if args.cache_miss:
-        # Wait till sender starts
-        is_sender_ready()
-        print("[cache miss] starting experiment...")
-
-       # Start iperf and/or netperf instances
-        procs = run_flows(args.flow_type, args.config, args.num_connections, args.cpus, args.window)
-
-        # Start the perf instance
-        perf = run_perf_cache(list(set(args.cpus + args.affinity)))
-
-        # Wait till sender is done sending
-        mark_receiver_ready()
-        is_sender_done()
-
-        # Kill perf
-        perf.send_signal(signal.SIGINT)
-        perf.wait()
-
-        # Kill all the processes
-        for p in procs:
-            p.kill()
-        print("[cache miss] finished experiment.")
-
-        # Process and write the raw output
-        for i, p in enumerate(procs):
-            lines = p.stdout.readlines()
-            if args.output is not None:
-                with open(os.path.join(args.output, "cache-miss_benchmark_{}.log".format(i)), "w") as f:
-                    f.writelines(lines)
-
-        lines = perf.stdout.readlines()
-        cache_miss = process_cache_miss_output(lines)
-        __results["cache_miss"] = cache_miss
-        if args.output is not None:
-            with open(os.path.join(args.output, "cache-miss_perf.log"), "w") as f:
-                f.writelines(lines)
+def write_raw_output(output, filename, lines):
+    if output is not None:
+        with open(os.path.join(output, filename), "w") as f:
+            f.writelines(lines)
 
-        # Print the output
-        print("[cache miss] cache miss: {:.3f}".format(cache_miss))
-        header.append("receiver cache miss (%)")
-        output.append("{:.3f}".format(cache_miss))
 
-    if args.util_breakdown:
-        # Wait till sender starts
-        is_sender_ready()
-        print("[util breakdown] starting experiment...")
+# Run a single traffic window and measure all the metrics assigned to it
+# With warm set, the listeners are left running for the next window
+def run_window(sender, args, window, results, pool, warm):
+    label = window_label(window)
+    prefix = window_prefix(window)
+    metrics = window_metrics(window)
+    cpus = list(set(args.cpus + args.affinity))
 
-        # Start iperf and/or netperf instances
-        procs = run_flows(args.flow_type, args.config, args.num_connections, args.cpus, args.window)
+    # Snapshot the histograms kept by the kernel, or read the kernel logs for
+    # the whole window on kernels that still log every sample
+    histogram = LatencyHistogram()
+    skb_counts = [0 for _ in range(SKB_SIZES_BINS)]
+    snapshots = {}
+    consumers = {}
+    if "latency" in metrics:
+        if os.path.exists(LATENCY_HIST_PATH):
+            snapshots["latency"] = read_kernel_hist(LATENCY_HIST_PATH)
+        else:
+            consumers["latency"] = lambda lines, closed: process_latency_lines(histogram, lines)
 
-        # Start the perf instance
-        output_dir = tempfile.TemporaryDirectory()
-        perf_data_file = os.path.join(output_dir.name, "perf.data")
-        perf = run_perf_record_util(list(set(args.cpus + args.affinity)), perf_data_file)
-
-        # Wait till sender is done sending
-        mark_receiver_ready()
-        is_sender_done()
-
-        # Kill perf
-        perf.send_signal(signal.SIGINT)
-        perf.wait()
-
-        # Kill all the processes
-        for p in procs:
-            p.kill()
-        print("[util breakdown] finished experiment.")
-
-        # Process and write the raw output
-        for i, p in enumerate(procs):
-            lines = p.stdout.readlines()
-            if args.output is not None:
-                with open(os.path.join(args.output, "util-breakdown_benchmark_{}.log".format(i)), "w") as f:
-                    f.writelines(lines)
-
-        # Start a perf report instance
-        perf = run_perf_report(perf_data_file)
-        perf.wait()
-        output_dir.cleanup()
-        lines = perf.stdout.readlines()
-        total_contrib, unaccounted_contrib, util_contibutions, not_found = process_util_breakdown_output(lines)
-        __results["util_contibutions"] = util_contibutions
-        if args.output is not None:
-            with open(os.path.join(args.output, "util-breakdown_perf.log"), "w") as f:
-                f.writelines(lines)
+    if "skb_hist" in metrics:
+        if os.path.exists(SKB_SIZE_HIST_PATH):
+            snapshots["skb_hist"] = read_kernel_hist(SKB_SIZE_HIST_PATH)
+        else:
+            consumers["skb_hist"] = lambda lines, closed: process_skb_sizes_lines(skb_counts, lines)
 
-        # Print the output
-        print("[util breakdown] total contribution: {:.3f}\tunaccounted contribution: {:.3f}".format(total_contrib, unaccounted_contrib))
-        if unaccounted_contrib > 5 and args.verbose:
-            print("[util breakdown] unknown symbols: {}".format(", ".join(not_found)))
+    if len(consumers) > 0:
+        filename = "latency_dmesg.log" if "latency" in consumers else "skb-hist_dmesg.log"
+        kmsg = KmsgReader(list(consumers.values()), raw_output_path(args.output, filename))
 
-    if args.cache_breakdown:
-        # Wait till sender starts
-        is_sender_ready()
-        print("[cache breakdown] starting experiment...")
+    if "latency" in metrics:
+        latency_measurement(enabled=True)
 
-        # Start iperf and/or netperf instances
-        procs = run_flows(args.flow_type, args.config, args.num_connections, args.cpus, args.window)
+    if "skb_hist" in metrics:
+        skb_hist_measurement(enabled=True)
 
-        # Start the perf instance
-        output_dir = tempfile.TemporaryDirectory()
-        perf_data_file = os.path.join(output_dir.name, "perf.data")
-        perf = run_perf_record_cache(list(set(args.cpus + args.affinity)), perf_data_file)
-
-        # Wait till sender is done sending
-        mark_receiver_ready()
-        is_sender_done()
-
-        # Kill perf
-        perf.send_signal(signal.SIGINT)
-        perf.wait()
-
-        # Kill all the processes
-        for p in procs:
-            p.kill()
-        print("[cache breakdown] finished experiment.")
-
-        # Process and write the raw output
-        for i, p in enumerate(procs):
-            lines = p.stdout.readlines()
-            if args.output is not None:
-                with open(os.path.join(args.output, "cache-breakdown_benchmark_{}.log".format(i)), "w") as f:
-                    f.writelines(lines)
-
-        # Start a perf report instance
-        perf = run_perf_report(perf_data_file)
-        perf.wait()
-        output_dir.cleanup()
-        lines = perf.stdout.readlines()
-        total_contrib, unaccounted_contrib, cache_contibutions, not_found = process_util_breakdown_output(lines)
-        __results["cache_contibutions"] = cache_contibutions
-        if args.output is not None:
-            with open(os.path.join(args.output, "cache-breakdown_perf.log"), "w") as f:
-                f.writelines(lines)
+    # Wait till sender starts
+    sender.wait("sender-ready")
+    print("[{}] starting experiment...".format(label))
 
-        # Print the output
-        print("[cache breakdown] total contribution: {:.3f}\tunaccounted contribution: {:.3f}".format(total_contrib, unaccounted_contrib))
-        if unaccounted_contrib > 5 and not args.verbose:
-            print("[cache breakdown] unknown symbols: {}".format(", ".join(not_found)))
+    # Start iperf and/or netperf instances
+    procs = run_flows(args.flow_type, args.config, args.engine, args.num_connections, args.cpus, args.window, pool)
 
-    if args.flame:
-        # Wait till sender starts
-        is_sender_ready()
-        print("[flame] starting experiment...")
+    # Start the collectors for this window
+    collectors = {}
+    if "utilisation" in metrics:
+        collectors["sar"] = run_sar(cpus)
 
-       # Start iperf and/or netperf instances
-        procs = run_flows(args.flow_type, args.config, args.num_connections, args.cpus, args.window)
+    if "cache_miss" in metrics:
+        collectors["perf_stat"] = run_perf_cache(cpus, args.steady_state)
 
-        # Start the perf instance
+    if len(metrics & {"util_breakdown", "cache_breakdown", "flame"}) > 0:
         output_dir = tempfile.TemporaryDirectory()
         perf_data_file = os.path.join(output_dir.name, "perf.data")
-        perf = run_perf_record_flame(list(set(args.cpus + args.affinity)), perf_data_file)
-
-        # Wait till sender is done sending
-        mark_receiver_ready()
-        is_sender_done()
+        if "util_breakdown" in metrics:
+            collectors["perf_record"] = run_perf_record_util(cpus, perf_data_file)
+        elif "cache_breakdown" in metrics:
+            collectors["perf_record"] = run_perf_record_cache(cpus, perf_data_file)
+        else:
+            collectors["perf_record"] = run_perf_record_flame(cpus, perf_data_file)
+
+    # Drain the output of the collectors as it arrives, writing the raw output on the way
+    outputs = {}
+    for name, filename in [("sar", "utilisation_sar.log"), ("perf_stat", "cache-miss_perf.log")]:
+        if name in collectors:
+            outputs[name] = get_reader_pool().add(collectors[name], raw_output_path(args.output, filename))
+
+    # Wait till sender is done sending
+    sender.signal("receiver-ready")
+    sender.wait("sender-done")
+
+    # Kill the collectors
+    for p in collectors.values():
+        p.send_signal(signal.SIGINT)
+        p.wait()
+
+    # Kill all the processes
+    if not warm:
+        pool.stop()
+    print("[{}] finished experiment.".format(label))
+
+    # Record how late the sender learnt that the receiver is ready
+    results["control"].append({"window": label, "receiver_ready_skew": sender.skew("receiver-ready")})
+
+    # Measure over the same seconds as the sender
+    if args.steady_state:
+        message = sender.expect("steady-state")
+        begin, end = message["begin"], message["end"]
+        print("[{}] steady state: {}-{} s".format(label, begin, end))
+
+    # Disable the kernel instrumentation
+    if "latency" in metrics:
+        latency_measurement(enabled=False)
 
-        # Kill perf
-        perf.send_signal(signal.SIGINT)
-        perf.wait()
+    if "skb_hist" in metrics:
+        skb_hist_measurement(enabled=False)
 
-        # Kill all the processes
-        for p in procs:
-            p.kill()
-        print("[flame] finished experiment.")
+    if len(consumers) > 0:
+        kmsg.stop()
+        results["kernel_log_lost"] = kmsg.num_dropped
+        if kmsg.num_dropped > 0:
+            print("[{}] kernel log: {} of {} records lost".format(label, kmsg.num_dropped, kmsg.num_dropped + kmsg.num_records))
+
+    # Process and write the raw output
+    for i, p in enumerate(procs):
+        lines = p.readlines()
+        write_raw_output(args.output, "{}_benchmark_{}.log".format(prefix, i), lines)
+
+    if "utilisation" in metrics:
+        lines = outputs["sar"].readlines()
+        if args.steady_state:
+            cpu_util = window_mean(process_util_series(lines), begin, end)
+        else:
+            cpu_util = sum(process_util_output(lines).values())
+        results["cpu_util"] = cpu_util
+        print("[utilisation] utilisation: {:.3f}".format(cpu_util))
 
-        # Process and write the raw output
-        for i, p in enumerate(procs):
-            lines = p.stdout.readlines()
-            if args.output is not None:
-                with open(os.path.join(args.output, "flame_benchmark_{}.log".format(i)), "w") as f:
-                    f.writelines(lines)
+    if "cache_miss" in metrics:
+        lines = outputs["perf_stat"].readlines()
+        if args.steady_state:
+            cache_miss = window_mean(process_cache_miss_series(lines), begin, end)
+        else:
+            cache_miss = process_cache_miss_output(lines)
+        results["cache_miss"] = cache_miss
+        print("[cache miss] cache miss: {:.3f}".format(cache_miss))
 
-        # Start a perf report instance
+    for name, metric_label, metric_prefix, key, role_key in [("util_breakdown", "util breakdown", "util-breakdown", "util_contibutions", "util_role_contibutions"), ("cache_breakdown", "cache breakdown", "cache-breakdown", "cache_contibutions", "cache_role_contibutions")]:
+        if name in metrics:
+            # Read the recording
+            lines, profile = read_perf_report(perf_data_file)
+            total_contrib, unaccounted_contrib, contributions, not_found = process_util_breakdown_output(lines)
+            results[key] = contributions
+            write_raw_output(args.output, "{}_perf.log".format(metric_prefix), lines)
+
+            # Split the breakdown between the application and the IRQ cores
+            if profile is not None:
+                cpu_contributions, results[role_key] = process_util_breakdown_by_cpu(profile, args.cpus, args.affinity)
+                keys = sorted(contributions.keys())
+                cpu_lines = ["\t".join(["cpu", "role"] + keys) + "\n"]
+                for cpu in sorted(cpu_contributions):
+                    cpu_lines.append("\t".join([str(cpu), cpu_role(cpu, args.cpus, args.affinity)] + ["{:.3f}".format(cpu_contributions[cpu][k]) for k in keys]) + "\n")
+                write_raw_output(args.output, "{}_cpus.log".format(metric_prefix), cpu_lines)
+
+            # Print the output
+            print("[{}] total contribution: {:.3f}\tunaccounted contribution: {:.3f}".format(metric_label, total_contrib, unaccounted_contrib))
+            if unaccounted_contrib > 5 and args.verbose:
+                print("[{}] unknown symbols: {}".format(metric_label, ", ".join(not_found)))
+
+    if "flame" in metrics:
         output_svg_file = os.path.join(args.output, "flame.svg")
         run_flamegraph(perf_data_file, output_svg_file)
+
+    if "perf_record" in collectors:
         output_dir.cleanup()
 
-    if args.latency:
-        # Clear dmesg
-        dmesg_clear()
+    if "latency" in snapshots:
+        try:
+            histogram = process_latency_hist(snapshots["latency"], read_kernel_hist(LATENCY_HIST_PATH))
+        except ValueError as e:
+            print("[latency] can't use the kernel histogram: {}".format(e))
+
+    if "latency" in metrics:
+        results["avg_latency"] = histogram.mean() / 1000
+        results["tail_latency"] = histogram.percentile(99) / 1000
+        results["latency_hist"] = histogram.to_dict()
+        write_raw_output(args.output, "latency_cdf.log", ["{:.3f}\t{:.6f}\n".format(value / 1000, fraction) for value, fraction in histogram.cdf()])
+        print("[latency] samples: {}\tavg. data copy latency: {:.3f}\t{}\tmax: {:.3f}".format(histogram.count, results["avg_latency"], "\t".join("p{}: {:.3f}".format(p, histogram.percentile(p) / 1000) for p in REPORTED_PERCENTILES), (histogram.max or 0) / 1000))
+
+    if "skb_hist" in snapshots:
+        lines = read_kernel_hist(SKB_SIZE_HIST_PATH)
+        write_raw_output(args.output, "skb-hist_kernel.log", snapshots["skb_hist"] + lines)
+        try:
+            results["skb_sizes"], results["skb_size_bins"] = process_skb_size_hist(snapshots["skb_hist"], lines)
+        except ValueError as e:
+            print("[skb hist] can't use the kernel histogram: {}".format(e))
+            results["skb_sizes"] = process_skb_sizes_counts(skb_counts)
+    elif "skb_hist" in metrics:
+        results["skb_sizes"] = process_skb_sizes_counts(skb_counts)
+        if "latency" in consumers and args.output is not None:
+            shutil.copyfile(os.path.join(args.output, "latency_dmesg.log"), os.path.join(args.output, "skb-hist_dmesg.log"))
+
+
+# Receiver columns of the summary
+def summarise(args, results):
+    header = []
+    output = []
+    if args.utilisation:
+        header.append("receiver utilisation (%)")
+        output.append("{:.3f}".format(results["cpu_util"]))
 
-        # Enable latency measurement
-        latency_measurement(enabled=True)
+    if args.cache_miss:
+        header.append("receiver cache miss (%)")
+        output.append("{:.3f}".format(results["cache_miss"]))
 
-        # Wait till sender starts
-        is_sender_ready()
-        print("[latency] starting experiment...")
+    if args.latency:
+        header.append("avg. data copy latency (us)")
+        output.append("{:.3f}".format(results["avg_latency"]))
+        header.append("tail data copy latency (us)")
+        output.append("{:.3f}".format(results["tail_latency"]))
 
-        # Start iperf and/or netperf instances
-        procs = run_flows(args.flow_type, args.config, args.num_connections, args.cpus, args.window)
+    return header, output
 
-        # Wait till sender is done sending
-        mark_receiver_ready()
-        is_sender_done()
 
-        # Kill all the processes
-        for p in procs:
-            p.kill()
-        print("[latency] finished experiment.")
+# Run all the windows of an experiment and push the results to the sender
+def run_experiment(sender, args, pool, warm):
+    # Set packet drop rate
+    update_packet_drop_rate(args.packet_drop)
 
-        # Disable latency measurement
-        latency_measurement(enabled=False)
+    # Print the output directory
+    if args.output is not None:
+        print("[output] writing results to {}".format(args.output))
 
-        # Process and write the raw output
-        for i, p in enumerate(procs):
-            lines = p.stdout.readlines()
-            if args.output is not None:
-                with open(os.path.join(args.output, "latency_benchmark_{}.log".format(i)), "w") as f:
-                    f.writelines(lines)
-
-        # Start a dmesg instance to read the kernel logs
-        dmesg = run_dmesg()
-        lines = []
-        while True:
-            new_lines = dmesg.stdout.readlines()
-            lines += new_lines
-            if len(new_lines) == 0 and dmesg.poll() != None:
-                break
-        avg_latency, tail_latency = process_latency_output(lines)
-        __results["avg_latency"] = avg_latency
-        __results["tail_latency"] = tail_latency
-        if args.output is not None:
-            with open(os.path.join(args.output, "latency_dmesg.log"), "w") as f:
-                f.writelines(lines)
+    # Run the experiments, one traffic window at a time
+    results = {"control": []}
+    for window in plan_windows(args, args.combined):
+        run_window(sender, args, window, results, pool, warm)
 
-        # Print the output
-        print("[latency] avg. data copy latency: {:.3f}\ttail data copy latency: {}".format(avg_latency, tail_latency))
-        header.append("avg. data copy latency (us)")
-        output.append("{:.3f}".format(avg_latency))
-        header.append("tail data copy latency (us)")
-        output.append("{}".format(tail_latency))
+    # Add the headers to the results
+    results["header"], results["output"] = summarise(args, results)
 
-    if args.skb_hist:
-        # Clear dmesg
-        dmesg_clear()
+    # Hand the results to the sender
+    sender.send("results", results=results)
+    sender.flush()
 
-        # Enable skb size histogram measurement
-        skb_hist_measurement(enabled=True)
 
-        # Wait till sender starts
-        is_sender_ready()
-        print("[skb hist] starting experiment...")
+# Run the trials the sender asked for (see --repeat on the sender), each with
+# its own output directory if there are several
+def run_trials(sender, args, pool, warm, message):
+    for trial in message.get("trials", [0]):
+        trial_args = args
+        if message.get("trial_output", False) and args.output is not None:
+            trial_args = copy.copy(args)
+            trial_args.output = os.path.join(args.output, "trial-{}".format(trial))
+            os.makedirs(trial_args.output, exist_ok=True)
 
-        # Start iperf and/or netperf instances
-        procs = run_flows(args.flow_type, args.config, args.num_connections, args.cpus, args.window)
+        run_experiment(sender, trial_args, pool, warm)
 
-        # Wait till sender is done sending
-        mark_receiver_ready()
-        is_sender_done()
 
-        # Kill all the processes
-        for p in procs:
-            p.kill()
-        print("[skb hist] finished experiment.")
+# Run network_setup.py for the sweep driven by run_sweep.py
+def run_network_setup(setup_args):
+    print("[setup] network_setup.py {}".format(" ".join(setup_args)))
+    return subprocess.Popen([sys.executable, NETWORK_SETUP_PATH] + setup_args, stdin=subprocess.DEVNULL).wait()
 
-        # Disable skb size histogram measurement
-        skb_hist_measurement(enabled=False)
 
-        # Process and write the raw output
-        for i, p in enumerate(procs):
-            lines = p.stdout.readlines()
-            if args.output is not None:
-                with open(os.path.join(args.output, "skb-hist_benchmark_{}.log".format(i)), "w") as f:
-                    f.writelines(lines)
-
-        # Start a dmesg instance to read the kernel logs
-        dmesg = run_dmesg()
-        lines = []
-        while True:
-            new_lines = dmesg.stdout.readlines()
-            lines += new_lines
-            if len(new_lines) == 0 and dmesg.poll() != None:
-                break
-        skb_sizes = process_skb_sizes_output(lines)
-        __results["skb_sizes"] = skb_sizes
-        if args.output is not None:
-            with open(os.path.join(args.output, "skb-hist_dmesg.log"), "w") as f:
-                f.writelines(lines)
+if __name__ == "__main__":
+    # Parse args
+    args = parse_args()
+    if args.verbose:
+        subprocess.enable_logging()
 
-    # Add the headers to the results
-    __results["header"] = header
-    __results["output"] = output
+    # Start the control server to synchronize with the sender
+    server = ControlServer(COMM_PORT)
 
-    # Sync with server again
-    mark_receiver_ready()
-    is_sender_ready()
+    # Run the experiments
+    clear_processes()
+    pool = ListenerPool()
+    if args.daemon:
+        print("[daemon] waiting for experiments on port {}...".format(COMM_PORT))
+        num_experiments = 0
+        while args.num_experiments is None or num_experiments < args.num_experiments:
+            sender = server.accept()
+            sender.send("hello", daemon=True, host_state=host_state())
+
+            # Get the experiment from the sender, which skips it if it already
+            # has its results
+            # Sweeps also set up the NIC between experiments
+            try:
+                message = sender.expect("experiment", "skip", "setup")
+                if message["type"] == "setup":
+                    sender.send("setup-done", returncode=run_network_setup(message["args"]))
+                    sender.close()
+                    continue
+
+                if message["type"] == "skip":
+                    print("[daemon] the sender already has the results of the experiment.")
+                    num_experiments += 1
+                    sender.close()
+                    continue
+
+                experiment_args, error = parse_spec(message["spec"], args)
+                if error is not None:
+                    sender.send("rejected", error=error)
+                    sender.close()
+                    continue
+
+                sender.send("accepted")
+                run_trials(sender, experiment_args, pool, True, message)
+                num_experiments += 1
+            except ConnectionError:
+                print("[daemon] lost connection to the sender, cleaning up.")
+                pool.stop()
+                clear_processes()
+            sender.close()
+        pool.stop()
+    else:
+        sender = server.accept()
+        sender.send("hello", daemon=False, host_state=host_state())
+        message = sender.expect("start", "skip")
+        if message["type"] == "start":
+            # Both sides plan the same windows or they wait for each other
+            # forever
+            error = window_options_mismatch(message["windows"], window_options(args))
+            if error is None:
+                sender.send("accepted")
+                run_trials(sender, args, pool, False, message)
+            else:
+                print("[start] {}".format(error))
+                sender.send("rejected", error=error)
+                sender.close()
+                server.close()
+                exit(1)
+        else:
+            print("[skip] the sender already has the results of the experiment.")
+        sender.close()
 
     # Close the server
-    server.shutdown()
-    server_thread.join()
+    server.close()
 
     # Reset packet drop rate
     set_packet_drop_rate(0)
@@ -1,16 +1,30 @@
 #!/usr/bin/env python3
 
 import argparse
+import copy
+import hashlib
+import json
+import math
 import os
 import shlex
 import signal
 import subprocess as _sp
+import sys
 import tempfile
 import threading
 import time
-import xmlrpc.client
 from constants import *
+from control import *
+from flow_series import *
+from host_state import *
+from metric_windows import *
+from perf_data import *
+from placement import *
 from process_output import *
+from results_store import *
+from stats import *
+from stream_reader import *
+from topology import *
 
 
 # For debugging
@@ -30,22 +44,30 @@ class subprocess:
         return _sp.Popen(*args, **kwargs)
 
 
-def parse_args():
+def build_parser():
     parser = argparse.ArgumentParser(description="Run TCP measurement experiments on the sender.")
 
     # Add arguments
-    parser.add_argument("--receiver", required=True, type=str, help="Address of the receiver to communicate metadata.")
+    parser.add_argument("--receiver", type=str, help="Address of the receiver to communicate metadata.")
     parser.add_argument("--flow-type", choices=["long", "short", "mixed"], default="long", help="Type of flow used for the experiment.")
-    parser.add_argument("--addr", required=True, type=str, help="Address of the receiver interface to run experiments on.")
+    parser.add_argument("--addr", type=str, help="Address of the receiver interface to run experiments on.")
     parser.add_argument("--config", choices=["one-to-one", "incast", "outcast", "all-to-all", "single"], default="single", help="Configuration to run the experiment with.")
     parser.add_argument("--cpus", type=int, nargs="*", help="Which CPUs to use for experiment.")
     parser.add_argument("--affinity", type=int, nargs="*", help="Which CPUs are being used for IRQ processing.")
+    parser.add_argument("--placement", choices=PLACEMENT_POLICIES, default=None, help="Pick --cpus and --affinity with a placement policy.")
+    parser.add_argument("--iface", type=str, default=None, help="Interface of the experiment, for --placement (the one --addr is reached through by default).")
     parser.add_argument("--num-connections", type=int, default=1, help="Number of connections.")
     parser.add_argument("--rpc-size", type=int, default=4000, help="Size of the RPC for short flows.")
     parser.add_argument("--num-rpcs", type=int, default=0, help="Number of short flows (for mixed flow type).")
     parser.add_argument("--arfs", action="store_true", default=False, help="This experiment is run with aRFS.")
     parser.add_argument("--duration", type=int, default=20, help="Duration of the experiment in seconds.")
+    parser.add_argument("--adaptive", action="store_true", help="Stop each traffic window once the throughput converges.")
+    parser.add_argument("--ci-width", type=float, default=0.02, help="Relative width of the throughput confidence interval to stop at (for --adaptive).")
+    parser.add_argument("--max-duration", type=int, default=60, help="Maximum duration of each traffic window in seconds (for --adaptive).")
+    parser.add_argument("--steady-state", action="store_true", help="Measure over the steady-state window of the throughput.")
     parser.add_argument("--window", type=int, default=None, help="Specify the TCP window size (KB).")
+    parser.add_argument("--engine", choices=["iperf", "builtin"], default="iperf", help="Run long flows with iperf or with the built-in traffic engine.")
+    parser.add_argument("--send-mode", choices=["write", "sendfile", "zerocopy", "splice"], default="write", help="How the built-in traffic engine sends data.")
     parser.add_argument("--output", type=str, default=None, help="Write raw output to the directory.")
     parser.add_argument("--throughput", action="store_true", help="Measure throughput.")
     parser.add_argument("--utilisation", action="store_true", help="Measure CPU utilisation.")
@@ -55,61 +77,103 @@ def parse_args():
     parser.add_argument("--flame", action="store_true", help="Create a flame graph from the experiment.")
     parser.add_argument("--latency", action="store_true", help="Calculate the average data copy latency for each packet.")
     parser.add_argument("--skb-hist", action="store_true", help="Record the skb sizes histogram.")
+    parser.add_argument("--combined", action="store_true", help="Measure all compatible metrics in a shared traffic window.")
+    parser.add_argument("--receiver-cpus", type=int, nargs="*", help="Which CPUs the receiver daemon uses for the experiment.")
+    parser.add_argument("--receiver-affinity", type=int, nargs="*", help="Which CPUs are being used for IRQ processing on the receiver daemon.")
+    parser.add_argument("--receiver-placement", choices=PLACEMENT_POLICIES, default=None, help="Placement policy of the receiver daemon.")
+    parser.add_argument("--receiver-iface", type=str, default=None, help="Interface of the experiment on the receiver daemon, for --receiver-placement.")
+    parser.add_argument("--packet-drop", type=int, default=0, help="Inverse packet drop rate on the receiver daemon.")
+    parser.add_argument("--daemon", action="store_true", help="Run as an agent taking experiments from a coordinator.")
+    parser.add_argument("--num-experiments", type=int, default=None, help="Exit the agent after this many experiments.")
+    parser.add_argument("--store", type=str, default=RESULTS_STORE_PATH, help="Add the results to this results store.")
+    parser.add_argument("--no-store", action="store_true", help="Don't add the results to the results store.")
+    parser.add_argument("--suite", type=str, default="default", help="Suite the run belongs to in the results store.")
+    parser.add_argument("--label", type=str, default="default", help="Label of the run in the results store (e.g., the NIC configuration).")
+    parser.add_argument("--force", action="store_true", help="Run the experiment even if the results store already has its results.")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of trials of the experiment.")
+    parser.add_argument("--trial", type=int, default=0, help="Number of the first trial (e.g., to add trials to an experiment).")
     parser.add_argument("--verbose", action="store_true", help="Print extra output.")
 
-    # Parse and verify arguments
-    args = parser.parse_args()
+    return parser
 
+
+# Verify the experiment arguments and fill in the defaults
+# Returns an error message if the arguments are invalid
+def verify_args(args):
     # Report errors
+    if args.addr is None:
+        return "Please provide --addr."
+
     if args.config == "single" and args.num_connections != 1:
-        print("Can't set --num-connections > 1 with --config single.")
-        exit(1)
+        return "Can't set --num-connections > 1 with --config single."
 
     if args.flow_type == "mixed" and args.config != "single":
-        print("Can't set --flow-type mixed without --config single.")
-        exit(1)
+        return "Can't set --flow-type mixed without --config single."
 
     if not (1 <= args.num_connections <= MAX_CONNECTIONS):
-        print("Can't set --num-connections outside of [1, {}].".format(MAX_CONNECTIONS))
-        exit(1)
+        return "Can't set --num-connections outside of [1, {}].".format(MAX_CONNECTIONS)
 
     if args.flow_type != "mixed" and args.num_rpcs > 0:
-        print("Can't set --num-rpcs > 0 without --flow-type mixed.")
-        exit(1)
+        return "Can't set --num-rpcs > 0 without --flow-type mixed."
 
     if args.window is not None and args.flow_type != "long":
-        print("Can't set --window for --flow-type short/mixed.")
-        exit(1)
+        return "Can't set --window for --flow-type short/mixed."
 
-    if not (0 <= args.num_rpcs <= MAX_RPCS):
-        print("Can't set --num-rpcs outside of [0, {}].".format(MAX_RPCS))
-        exit(1)
+    if args.send_mode != "write" and args.engine != "builtin":
+        return "Can't set --send-mode without --engine builtin."
 
     if not (0 <= args.num_rpcs <= MAX_RPCS):
-        print("Can't set --num-rpcs outside of [0, {}].".format(MAX_RPCS))
-        exit(1)
+        return "Can't set --num-rpcs outside of [0, {}].".format(MAX_RPCS)
 
     if not (5 <= args.duration <= 60):
-        print("Can't set --duration outside of [5, 60].")
-        exit(1)
+        return "Can't set --duration outside of [5, 60]."
+
+    if args.adaptive and args.flow_type != "long":
+        return "Can't set --adaptive for --flow-type short/mixed."
+
+    if args.steady_state and args.flow_type != "long":
+        return "Can't set --steady-state for --flow-type short/mixed."
+
+    if not (0 < args.ci_width < 1):
+        return "Can't set --ci-width outside of (0, 1)."
+
+    if not (5 <= args.max_duration <= 60):
+        return "Can't set --max-duration outside of [5, 60]."
 
     if args.flame and args.output is None:
-        print("Please provide --output if using --flame.")
-        exit(1)
+        return "Please provide --output if using --flame."
+
+    if args.repeat < 1:
+        return "Can't set --repeat < 1."
+
+    if args.trial < 0:
+        return "Can't set --trial < 0."
+
+    # Plan the CPUs with a placement policy
+    if args.placement is not None:
+        if args.cpus is not None or args.affinity is not None or args.arfs:
+            return "Can't set --cpus, --affinity or --arfs with --placement."
+        if args.iface is None:
+            args.iface = route_interface(args.addr)
+
+        try:
+            plan = plan_placement(host_topology(args.iface), args.placement, args.config, args.num_connections, "sender")
+        except ValueError as e:
+            return str(e)
+        args.cpus = plan["cpus"]
+        args.affinity = plan["affinity"]
 
     # Set CPUs to be used
+    cpus = host_topology()["cpus"]
     if args.cpus is not None:
         if args.config in ["single", "outcast"] and len(args.cpus) != 1:
-            print("Please provide only 1 --cpus for --config outcast/single.")
-            exit(1)
+            return "Please provide only 1 --cpus for --config outcast/single."
 
         if args.config in ["one-to-one", "incast", "all-to-all"] and len(args.cpus) != args.num_connections:
-            print("Please provide as many --cpus as --num-connections for --config incast/one-to-one/all-to-all.")
-            exit(1)
+            return "Please provide as many --cpus as --num-connections for --config incast/one-to-one/all-to-all."
 
-        if not all(map(lambda c: 0 <= c < MAX_CPUS, args.cpus)):
-            print("Can't set --cpus outside of [0, {}].".format(MAX_CPUS))
-            exit(1)
+        if not all(map(lambda c: c in cpus, args.cpus)):
+            return "Can't set --cpus outside of the CPUs of the host ({}).".format(format_cpu_list(cpus))
     else:
         if args.config in ["outcast", "single"]:
             args.cpus = [0]
@@ -117,21 +181,19 @@ def parse_args():
             args.cpus = list(range(args.num_connections))
 
     if args.arfs and args.affinity is not None:
-        print("Can't set --affinity with --arfs.")
-        exit(0)
+        return "Can't set --affinity with --arfs."
 
     # Set IRQ processing CPUs
     if args.affinity is not None:
-        if not all(map(lambda c: 0 <= c < MAX_CPUS, args.affinity)):
-            print("Can't set --affinity outside of [0, {}].".format(MAX_CPUS))
-            exit(1)
+        if not all(map(lambda c: c in cpus, args.affinity)):
+            return "Can't set --affinity outside of the CPUs of the host ({}).".format(format_cpu_list(cpus))
     elif not args.arfs:
         if args.config in ["outcast", "single"]:
             args.affinity = [1]
         elif args.config in ["incast", "one-to-one"]:
             args.affinity = [cpu + 1 for cpu in args.cpus]
         elif args.config == "all-to-all":
-            args.affinity = list(range(MAX_CPUS))
+            args.affinity = cpus
     else:
         args.affinity = []
 
@@ -139,13 +201,96 @@ def parse_args():
     if args.output is not None:
         os.makedirs(args.output, exist_ok=True)
 
+    return None
+
+
+def parse_args():
+    args = build_parser().parse_args()
+
+    # The agent receives the experiment arguments from the coordinator
+    if args.daemon:
+        if args.num_experiments is not None and args.num_experiments < 1:
+            print("Can't set --num-experiments < 1.")
+            exit(1)
+
+        if args.output is not None:
+            os.makedirs(args.output, exist_ok=True)
+
+        return args
+
+    if args.num_experiments is not None:
+        print("Can't set --num-experiments without --daemon.")
+        exit(1)
+
+    if args.receiver is None:
+        print("Please provide --receiver.")
+        exit(1)
+
+    # Parse and verify arguments
+    error = verify_args(args)
+    if error is not None:
+        print(error)
+        exit(1)
+
     # Return parsed and verified arguments
     return args
 
 
+# Build the arguments of an experiment submitted to the agent
+# The raw outputs are written to a directory of the same name under the
+# agent's --output directory
+def parse_spec(spec, daemon_args):
+    args = build_parser().parse_args([])
+    for key, value in spec.items():
+        if key in ["receiver", "daemon", "num_experiments", "verbose"] or not hasattr(args, key):
+            return None, "Unknown experiment option {}.".format(key)
+        setattr(args, key, value)
+
+    if args.output is not None and daemon_args.output is not None:
+        args.output = os.path.join(daemon_args.output, os.path.basename(os.path.normpath(args.output)))
+    else:
+        args.output = None
+    args.verbose = daemon_args.verbose
+
+    # The coordinator runs a single trial
+    if args.repeat != 1 or args.trial != 0:
+        return None, "Can't set repeat or trial for an agent."
+
+    error = verify_args(args)
+    if error is not None:
+        return None, error
+
+    return args, None
+
+
+# Experiment options sent to a receiver running as a daemon
+def build_receiver_spec(args):
+    spec = {
+        "flow_type": args.flow_type,
+        "config": args.config,
+        "cpus": args.receiver_cpus,
+        "affinity": args.receiver_affinity,
+        "placement": args.receiver_placement,
+        "iface": args.receiver_iface,
+        "num_connections": args.num_connections,
+        "arfs": args.arfs,
+        "window": args.window,
+        "engine": args.engine,
+        "packet_drop": args.packet_drop,
+        "output": args.output,
+        "combined": args.combined,
+        "steady_state": args.steady_state,
+    }
+    for metric in METRICS:
+        spec[metric.name] = getattr(args, metric.name)
+
+    return spec
+
+
 # Convenience functions
 def clear_processes():
     os.system("pkill iperf")
+    os.system("pkill -f '[t]raffic.py'")
     os.system("pkill netserver")
     os.system("pkill netperf")
     os.system("pkill perf")
@@ -161,31 +306,60 @@ def run_iperf(cpu, addr, port, duration, window):
     return subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, universal_newlines=True)
 
 
+def run_traffic(cpu, addr, ports, duration, window, send_mode):
+    args = ["taskset", "-c", str(cpu), sys.executable, TRAFFIC_PATH, "client", "--addr", addr, "--duration", str(duration), "--send-mode", send_mode, "--ports"] + [str(port) for port in ports]
+    if window is not None:
+        args += ["--window", str(window / 2)]
+
+    return subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, universal_newlines=True)
+
+
 def run_netperf(cpu, addr, port, duration, rpc_size):
     args = ["taskset", "-c", str(cpu), "netperf", "-H", addr, "-t", "TCP_RR", "-l", str(duration), "-p", str(port), "-f", "g", "--", "-r", "{0},{0}".format(rpc_size), "-o", "throughput"]
 
     return subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, universal_newlines=True)
 
 
-# We run one iperf client process per flow, and one netperf process per flow
-def run_flows(flow_type, config, addr, num_connections, num_rpcs, cpus, duration, window, rpc_size):
-    procs = []
+# Long flows run with one iperf client process per flow, or with one traffic
+# engine process per CPU that multiplexes all the flows of that CPU
+def run_long_flows(engine, send_mode, addr, flows, duration, window):
+    if engine == "iperf":
+        return [run_iperf(cpu, addr, port, duration, window) for cpu, port in flows]
+
+    ports = {}
+    for cpu, port in flows:
+        ports.setdefault(cpu, []).append(port)
+
+    return [run_traffic(cpu, addr, cpu_ports, duration, window, send_mode) for cpu, cpu_ports in ports.items()]
+
+
+# The (CPU, port) of each long flow
+def long_flows(flow_type, config, num_connections, cpus):
+    flows = []
     if flow_type == "mixed":
-        procs.append(run_iperf(cpus[0], addr, BASE_PORT, duration, window))
-        for _ in range(num_rpcs):
-            procs.append(run_netperf(cpus[0], addr, ADDITIONAL_BASE_PORT, duration, rpc_size))
+        flows.append((cpus[0], BASE_PORT))
     elif flow_type == "long":
         if config == "single":
-            procs.append(run_iperf(cpus[0], addr, BASE_PORT, duration, window))
+            flows.append((cpus[0], BASE_PORT))
         elif config == "outcast":
-            procs += [run_iperf(cpus[0], addr, BASE_PORT + n, duration, window) for n in range(num_connections)]
+            flows += [(cpus[0], BASE_PORT + n) for n in range(num_connections)]
         elif config in ["incast", "one-to-one"]:
-            procs += [run_iperf(cpu, addr, BASE_PORT + n, duration, window) for n, cpu in enumerate(cpus)]
+            flows += [(cpu, BASE_PORT + n) for n, cpu in enumerate(cpus)]
         else:
             for i, sender_cpu in enumerate(cpus):
                 for j, receiver_cpu in enumerate(cpus):
-                    procs.append(run_iperf(sender_cpu, addr, BASE_PORT + i * MAX_CONNECTIONS + j, duration, window))
-    else:
+                    flows.append((sender_cpu, BASE_PORT + i * MAX_CONNECTIONS + j))
+
+    return flows
+
+
+# We run one netperf process per short flow
+def run_flows(flow_type, config, engine, send_mode, addr, num_connections, num_rpcs, cpus, duration, window, rpc_size):
+    procs = []
+    if flow_type == "mixed":
+        for _ in range(num_rpcs):
+            procs.append(run_netperf(cpus[0], addr, ADDITIONAL_BASE_PORT, duration, rpc_size))
+    elif flow_type == "short":
         if config == "single":
             procs.append(run_netperf(cpus[0], addr, BASE_PORT, duration, rpc_size))
         elif config == "incast":
@@ -199,11 +373,75 @@ def run_flows(flow_type, config, addr, num_connections, num_rpcs, cpus, duration
                 for j, receiver_cpu in enumerate(cpus):
                     procs.append(run_netperf(sender_cpu, addr, BASE_PORT + j, duration, rpc_size))
 
-    return procs
+    flows = long_flows(flow_type, config, num_connections, cpus)
+    return run_long_flows(engine, send_mode, addr, flows, duration, window) + procs
+
+
+# Aggregate throughput of all the long flows, one sample per second, read
+# while the flows are running
+class ThroughputMonitor:
+    def __init__(self, streams, num_flows):
+        self.num_flows = num_flows
+        self.cond = threading.Condition()
+        self.flows = {}
+        self.running = len(streams)
+        for i, stream in enumerate(streams):
+            stream.subscribe(lambda lines, closed, i=i: self.feed(i, lines, closed))
+
+    def feed(self, i, lines, closed):
+        with self.cond:
+            for line in lines:
+                sample = process_interval_line(line)
+                if sample is not None:
+                    flow, second, throughput = sample
+                    self.flows.setdefault((i, flow), {})[second] = throughput
+
+            if closed:
+                self.running -= 1
+            self.cond.notify_all()
+
+    # Sum of the throughput of the seconds all flows reported
+    def samples(self):
+        if len(self.flows) < self.num_flows:
+            return []
+
+        return aggregate_throughput_intervals(list(self.flows.values()))
+
+    # Wait till there are more than num_samples samples
+    # Returns the samples and whether the flows are still running
+    def wait(self, num_samples):
+        with self.cond:
+            while len(self.samples()) <= num_samples and self.running > 0:
+                self.cond.wait()
+
+            return self.samples(), self.running > 0
+
+
+# Wait till the throughput converges (or the flows are done) and stop the flows
+# The first seconds of ramp-up are not used
+def run_adaptive(args, label, procs, streams):
+    monitor = ThroughputMonitor(streams, len(long_flows(args.flow_type, args.config, args.num_connections, args.cpus)))
+    samples = []
+    running = True
+    while running:
+        samples, running = monitor.wait(len(samples))
+        steady = samples[ADAPTIVE_WARMUP:]
+        if len(steady) >= ADAPTIVE_MIN_SAMPLES and relative_width(steady) <= args.ci_width:
+            break
+
+    for p in procs:
+        p.send_signal(signal.SIGINT)
+        p.wait()
 
+    throughput, half_width = confidence_interval(steady) if len(steady) > 0 else (0, 0)
+    print("[{}] {} after {} s: throughput {:.3f} +/- {:.3f} Gbps".format(label, "converged" if running else "not converged", len(samples), throughput, half_width))
+    return throughput
 
-def run_perf_cache(cpus):
+
+def run_perf_cache(cpus, interval):
     args = [PERF_PATH, "stat", "-C", ",".join(map(str, set(cpus))), "-e", "LLC-loads,LLC-load-misses,LLC-stores,LLC-store-misses"]
+    if interval:
+        args += ["-I", "1000"]
     return subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, universal_newlines=True)
 
 
@@ -227,6 +465,22 @@ def run_perf_report(perf_data_file):
     return subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, universal_newlines=True)
 
 
+# Kernel lines of the perf report of a recording, and its profile by CPU
+# The recording is read directly, unless the kernel symbols can't be read (then
+# there's no profile)
+def read_perf_report(perf_data_file):
+    try:
+        profile = kernel_profile(perf_data_file)
+        return perf_report_lines(profile), profile
+    except (OSError, ValueError) as e:
+        print("[perf] can't read {} directly, running perf report: {}".format(perf_data_file, e))
+
+    perf = run_perf_report(perf_data_file)
+    lines = perf.stdout.readlines()
+    perf.wait()
+    return lines, None
+
+
 def run_flamegraph(perf_data_file, output_svg_file):
     os.system("{} script -i {} | {}/stackcollapse-perf.pl > out.perf-folded".format(PERF_PATH, perf_data_file, FLAME_PATH))
     os.system("{}/flamegraph.pl out.perf-folded > {}".format(FLAME_PATH, output_svg_file))
@@ -237,419 +491,514 @@ def run_sar(cpus):
     return subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, universal_newlines=True)
 
 
-if __name__ == "__main__":
-    # Parse args
-    args = parse_args()
-    if args.verbose:
-        subprocess.enable_logging()
+def raw_output_path(output, filename):
+    return None if output is None else os.path.join(output, filename)
 
-    # Create the XMLRPC proxy
-    receiver = xmlrpc.client.ServerProxy("http://{}:{}".format(args.receiver, COMM_PORT), allow_none=True)
 
-    # Wait till receiver is ready
-    while True:
-        try:
-            receiver.system.listMethods()
-            break
-        except ConnectionRefusedError:
-            time.sleep(1)
+def write_raw_output(output, filename, lines):
+    if output is not None:
+        with open(os.path.join(output, filename), "w") as f:
+            f.writelines(lines)
 
-    # Print the output directory
-    if args.output is not None:
-        print("[output] writing results to {}".format(args.output))
 
-    # Run the experiments
-    clear_processes()
-    header = []
-    output = []
-    if args.throughput:
-        # Wait till receiver starts
-        receiver.mark_sender_ready()
-        receiver.is_receiver_ready()
-        print("[throughput] starting experiment...")
+# Run a single traffic window and measure all the metrics assigned to it
+def run_window(receiver, args, window, results):
+    label = window_label(window)
+    prefix = window_prefix(window)
+    metrics = window_metrics(window)
+    cpus = list(set(args.cpus + args.affinity))
 
-        # Start iperf and/or netperf instances
-        procs = run_flows(args.flow_type, args.config, args.addr, args.num_connections, args.num_rpcs, args.cpus, args.duration, args.window, args.rpc_size)
+    # Wait till receiver starts
+    receiver.signal("sender-ready")
+    receiver.wait("receiver-ready")
+    print("[{}] starting experiment...".format(label))
 
-        # Wait till all experiments finish
-        for p in procs:
-            p.wait()
+    # Start iperf and/or netperf instances
+    start = time.monotonic()
+    duration = args.max_duration if args.adaptive else args.duration
+    procs = run_flows(args.flow_type, args.config, args.engine, args.send_mode, args.addr, args.num_connections, args.num_rpcs, args.cpus, duration, args.window, args.rpc_size)
 
-        # Sender is done sending
-        receiver.mark_sender_done()
-        print("[throughput] finished experiment.")
-
-        # Process and write the raw output
-        total_throughput = 0
-        for i, p in enumerate(procs):
-            lines = p.stdout.readlines()
-            if args.output is not None:
-                with open(os.path.join(args.output, "throughput_benchmark_{}.log".format(i)), "w") as f:
-                    f.writelines(lines)
-            total_throughput += process_throughput_output(lines)
-
-        # Print the output
-        print("[throughput] total throughput: {:.3f}".format(total_throughput))
-        header.append("throughput (Gbps)")
-        output.append("{:.3f}".format(total_throughput))
+    # Drain the output of the flows as it arrives, writing the raw output on the way
+    readers = get_reader_pool()
+    streams = [readers.add(p, raw_output_path(args.output, "{}_benchmark_{}.log".format(prefix, i))) for i, p in enumerate(procs)]
 
-    if args.utilisation:
-        # Wait till receiver starts
-        receiver.mark_sender_ready()
-        receiver.is_receiver_ready()
-        print("[utilisation] starting experiment...")
+    # Start the collectors for this window
+    collectors = {}
+    if "utilisation" in metrics:
+        collectors["sar"] = run_sar(cpus)
 
-        # Start iperf and/or netperf instances
-        procs = run_flows(args.flow_type, args.config, args.addr, args.num_connections, args.num_rpcs, args.cpus, args.duration, args.window, args.rpc_size)
+    if "cache_miss" in metrics:
+        collectors["perf_stat"] = run_perf_cache(cpus, args.steady_state)
 
-        # Start the sar instance
-        sar = run_sar(list(set(args.cpus + args.affinity)))
+    if len(metrics & {"util_breakdown", "cache_breakdown", "flame"}) > 0:
+        output_dir = tempfile.TemporaryDirectory()
+        perf_data_file = os.path.join(output_dir.name, "perf.data")
+        if "util_breakdown" in metrics:
+            collectors["perf_record"] = run_perf_record_util(cpus, perf_data_file)
+        elif "cache_breakdown" in metrics:
+            collectors["perf_record"] = run_perf_record_cache(cpus, perf_data_file)
+        else:
+            collectors["perf_record"] = run_perf_record_flame(cpus, perf_data_file)
+
+    outputs = {}
+    for name, filename in [("sar", "utilisation_sar.log"), ("perf_stat", "cache-miss_perf.log")]:
+        if name in collectors:
+            outputs[name] = readers.add(collectors[name], raw_output_path(args.output, filename))
 
-        # Wait till all experiments finish
+    # Wait till all experiments finish
+    if args.adaptive:
+        adaptive_throughput = run_adaptive(args, label, procs, streams)
+    else:
         for p in procs:
             p.wait()
 
-        # Sender is done sending
-        receiver.mark_sender_done()
-
-        # Kill the sar instance
-        sar.send_signal(signal.SIGINT)
-        sar.wait()
-        print("[utilisation] finished experiment.")
-
-        # Process and write the raw output
-        throughput = 0
-        for i, p in enumerate(procs):
-            lines = p.stdout.readlines()
-            if args.output is not None:
-                with open(os.path.join(args.output, "utilisation_benchmark_{}.log".format(i)), "w") as f:
-                    f.writelines(lines)
-            throughput += process_throughput_output(lines)
-
-        lines = sar.stdout.readlines()
-        cpu_util = sum(process_util_output(lines).values())
-        if args.output is not None:
-            with open(os.path.join(args.output, "utilisation_sar.log"), "w") as f:
-                f.writelines(lines)
-
-        # Print the output
-        print("[utilisation] total throughput: {:.3f}\tutilisation: {:.3f}".format(throughput, cpu_util))
-        header.append("sender utilisation (%)")
-        output.append("{:.3f}".format(cpu_util))
-
-    if args.cache_miss:
-        # Wait till receiver starts
-        receiver.mark_sender_ready()
-        receiver.is_receiver_ready()
-        print("[cache miss] starting experiment...")
+    # Sender is done sending
+    receiver.signal("sender-done")
+    duration = time.monotonic() - start
+    flow_outputs = [stream.readlines() for stream in streams]
+    intervals = process_throughput_intervals(flow_outputs)
+
+    # Pick the steady-state window from the throughput of each second, and
+    # hand it to the receiver so that it measures over the same seconds
+    if args.steady_state:
+        samples = aggregate_throughput_intervals(list(intervals.values()))
+        begin, end = steady_state_window(samples)
+        receiver.send("steady-state", begin=begin, end=end)
+        print("[{}] steady state: {}-{} s of {} s".format(label, begin, end, len(samples)))
+
+    # Kill the collectors
+    for p in collectors.values():
+        p.send_signal(signal.SIGINT)
+        p.wait()
+    print("[{}] finished experiment.".format(label))
+
+    # Record how late the receiver learnt that the sender is done
+    results["control"].append({"window": label, "sender_done_skew": receiver.skew("sender-done"), "duration": duration})
+
+    # Keep the throughput of every long flow in every second, and the total
+    series = flow_series_from_intervals(intervals)
+    if args.output is not None and len(series) > 0:
+        save_flow_series(os.path.join(args.output, "{}_flows.bin".format(prefix)), series)
+    if "throughput" in metrics and len(series) > 0:
+        results["throughput_series"] = aggregate_throughput_intervals(list(intervals.values()))
+
+    # Process the raw output
+    # With --adaptive, the throughput is the mean of the samples used to converge
+    throughput = 0
+    for lines in flow_outputs:
+        throughput += sum(process_throughput_output(flow_lines) for flow_lines in split_flow_output(lines))
+
+    if args.steady_state:
+        throughput = window_mean(samples, begin, end)
+    elif args.adaptive:
+        throughput = adaptive_throughput
+
+    if "throughput" in metrics:
+        results["throughput"] = throughput
+        print("[throughput] total throughput: {:.3f}".format(throughput))
+
+    # Compare the flows over the same seconds as the throughput
+    if "throughput" in metrics and len(series) > 1:
+        if args.steady_state:
+            fair_window = (begin, end)
+        elif args.adaptive:
+            fair_window = (ADAPTIVE_WARMUP, series.num_intervals)
+        else:
+            fair_window = (max(0, series.num_intervals - 11), series.num_intervals - 1)
 
-        # Start iperf and/or netperf instances
-        procs = run_flows(args.flow_type, args.config, args.addr, args.num_connections, args.num_rpcs, args.cpus, args.duration, args.window, args.rpc_size)
+        fairness = flow_fairness(series, *fair_window)
+        results["fairness"] = fairness
 
-        # Start the perf instance
-        perf = run_perf_cache(list(set(args.cpus + args.affinity)))
+        # Keep the flows starved in each second, lined up with the throughput
+        # of each second (NaN outside of the compared seconds)
+        results["starved_series"] = [math.nan] * fair_window[0] + fairness["starved"]
+        write_raw_output(args.output, "{}_starved.log".format(prefix), ["second\tstarved flows\n"] + ["{}\t{}\n".format(fair_window[0] + k, count) for k, count in enumerate(fairness["starved"])])
+        print("[throughput] jain's fairness index: {:.3f}\tmin/p50/max flow throughput: {:.3f}/{:.3f}/{:.3f}\tstarved flows: {}".format(fairness["jain"], fairness["min"], fairness["p50"], fairness["max"], max(fairness["starved"], default=0)))
 
-        # Wait till all experiments finish
-        for p in procs:
-            p.wait()
-
-        # Sender is done sending
-        receiver.mark_sender_done()
-
-        # Kill the perf instance
-        perf.send_signal(signal.SIGINT)
-        perf.wait()
-        print("[cache miss] finished experiment.")
-
-        # Process and write the raw output
-        throughput = 0
-        for i, p in enumerate(procs):
-            lines = p.stdout.readlines()
-            if args.output is not None:
-                with open(os.path.join(args.output, "cache-miss_benchmark_{}.log".format(i)), "w") as f:
-                    f.writelines(lines)
-            throughput += process_throughput_output(lines)
-
-        lines = perf.stdout.readlines()
-        cache_miss = process_cache_miss_output(lines)
-        if args.output is not None:
-            with open(os.path.join(args.output, "cache-miss_perf.log"), "w") as f:
-                f.writelines(lines)
+    if "utilisation" in metrics:
+        lines = outputs["sar"].readlines()
+        if args.steady_state:
+            cpu_util = window_mean(process_util_series(lines), begin, end)
+        else:
+            cpu_util = sum(process_util_output(lines).values())
+        results["cpu_util"] = cpu_util
+        print("[utilisation] total throughput: {:.3f}\tutilisation: {:.3f}".format(throughput, cpu_util))
 
-        # Print the output
+    if "cache_miss" in metrics:
+        lines = outputs["perf_stat"].readlines()
+        if args.steady_state:
+            cache_miss = window_mean(process_cache_miss_series(lines), begin, end)
+        else:
+            cache_miss = process_cache_miss_output(lines)
+        results["cache_miss"] = cache_miss
         print("[cache miss] total throughput: {:.3f}\tcache miss: {:.3f}".format(throughput, cache_miss))
-        header.append("sender cache miss (%)")
-        output.append("{:.3f}".format(cache_miss))
 
-    if args.util_breakdown:
-        # Wait till receiver starts
-        receiver.mark_sender_ready()
-        receiver.is_receiver_ready()
-        print("[util breakdown] starting experiment...")
-
-        # Start iperf and/or netperf instances
-        procs = run_flows(args.flow_type, args.config, args.addr, args.num_connections, args.num_rpcs, args.cpus, args.duration, args.window, args.rpc_size)
+    for name, metric_label, metric_prefix, key, role_key in [("util_breakdown", "util breakdown", "util-breakdown", "util_contibutions", "util_role_contibutions"), ("cache_breakdown", "cache breakdown", "cache-breakdown", "cache_contibutions", "cache_role_contibutions")]:
+        if name in metrics:
+            # Read the recording
+            lines, profile = read_perf_report(perf_data_file)
+            total_contrib, unaccounted_contrib, contributions, not_found = process_util_breakdown_output(lines)
+            results[key] = contributions
+            write_raw_output(args.output, "{}_perf.log".format(metric_prefix), lines)
+
+            # Split the breakdown between the application and the IRQ cores
+            if profile is not None:
+                cpu_contributions, results[role_key] = process_util_breakdown_by_cpu(profile, args.cpus, args.affinity)
+                keys = sorted(contributions.keys())
+                cpu_lines = ["\t".join(["cpu", "role"] + keys) + "\n"]
+                for cpu in sorted(cpu_contributions):
+                    cpu_lines.append("\t".join([str(cpu), cpu_role(cpu, args.cpus, args.affinity)] + ["{:.3f}".format(cpu_contributions[cpu][k]) for k in keys]) + "\n")
+                write_raw_output(args.output, "{}_cpus.log".format(metric_prefix), cpu_lines)
+
+            # Print the output
+            print("[{}] total throughput: {:.3f}\ttotal contribution: {:.3f}\tunaccounted contribution: {:.3f}".format(metric_label, throughput, total_contrib, unaccounted_contrib))
+            if unaccounted_contrib > 5 and args.verbose:
+                print("[{}] unknown symbols: {}".format(metric_label, ", ".join(not_found)))
+
+    if "flame" in metrics:
+        output_svg_file = os.path.join(args.output, "flame.svg")
+        run_flamegraph(perf_data_file, output_svg_file)
+        print("[flame] total throughput: {:.3f}".format(throughput))
 
-        # Start the perf instance
-        output_dir = tempfile.TemporaryDirectory()
-        perf_data_file = os.path.join(output_dir.name, "perf.data")
-        perf = run_perf_record_util(list(set(args.cpus + args.affinity)), perf_data_file)
+    if "latency" in metrics:
+        print("[latency] total throughput: {:.3f}".format(throughput))
 
-        # Wait till all experiments finish
-        for p in procs:
-            p.wait()
+    if "skb_hist" in metrics:
+        print("[skb hist] total throughput: {:.3f}".format(throughput))
 
-        # Sender is done sending
-        receiver.mark_sender_done()
-
-        # Kill the perf instance
-        perf.send_signal(signal.SIGINT)
-        perf.wait()
-        print("[util breakdown] finished experiment.")
-
-        # Process and write the raw output
-        throughput = 0
-        for i, p in enumerate(procs):
-            lines = p.stdout.readlines()
-            if args.output is not None:
-                with open(os.path.join(args.output, "util-breakdown_benchmark_{}.log".format(i)), "w") as f:
-                    f.writelines(lines)
-            throughput += process_throughput_output(lines)
-
-        # Run a perf report instance
-        perf = run_perf_report(perf_data_file)
-        lines = []
-        while True:
-            new_lines =  perf.stdout.readlines()
-            lines += new_lines
-            if len(new_lines) == 0:
-                break
-        perf.wait()
+    if "perf_record" in collectors:
         output_dir.cleanup()
-        total_contrib, unaccounted_contrib, util_contibutions, not_found = process_util_breakdown_output(lines)
-        if args.output is not None:
-            with open(os.path.join(args.output, "util-breakdown_perf.log"), "w") as f:
-                f.writelines(lines)
-
-        # Print the output
-        print("[util breakdown] total throughput: {:.3f}\ttotal contribution: {:.3f}\tunaccounted contribution: {:.3f}".format(throughput, total_contrib, unaccounted_contrib))
-        if unaccounted_contrib > 5 and args.verbose:
-            print("[util breakdown] unknown symbols: {}".format(", ".join(not_found)))
 
-    if args.cache_breakdown:
-        # Wait till receiver starts
-        receiver.mark_sender_ready()
-        receiver.is_receiver_ready()
-        print("[cache breakdown] starting experiment...")
 
-        # Start iperf and/or netperf instances
-        procs = run_flows(args.flow_type, args.config, args.addr, args.num_connections, args.num_rpcs, args.cpus, args.duration, args.window, args.rpc_size)
+# Run all the windows of an experiment against the given control peer
+def run_experiment(receiver, args):
+    # Print the output directory
+    if args.output is not None:
+        print("[output] writing results to {}".format(args.output))
 
-        # Start the perf instance
-        output_dir = tempfile.TemporaryDirectory()
-        perf_data_file = os.path.join(output_dir.name, "perf.data")
-        perf = run_perf_record_cache(list(set(args.cpus + args.affinity)), perf_data_file)
+    # Run the experiments, one traffic window at a time
+    clear_processes()
+    results = {"control": []}
+    for window in plan_windows(args, args.combined):
+        run_window(receiver, args, window, results)
 
-        # Wait till all experiments finish
-        for p in procs:
-            p.wait()
+    return results
 
-        # Sender is done sending
-        receiver.mark_sender_done()
-
-        # Kill the perf instance
-        perf.send_signal(signal.SIGINT)
-        perf.wait()
-        print("[cache breakdown] finished experiment.")
-
-        # Process and write the raw output
-        throughput = 0
-        for i, p in enumerate(procs):
-            lines = p.stdout.readlines()
-            if args.output is not None:
-                with open(os.path.join(args.output, "cache-breakdown_benchmark_{}.log".format(i)), "w") as f:
-                    f.writelines(lines)
-            throughput += process_throughput_output(lines)
-
-        # Run a perf report instance
-        perf = run_perf_report(perf_data_file)
-        lines = []
-        while True:
-            new_lines =  perf.stdout.readlines()
-            lines += new_lines
-            if len(new_lines) == 0:
-                break
-        perf.wait()
-        total_contrib, unaccounted_contrib, cache_contibutions, not_found = process_util_breakdown_output(lines)
-        if args.output is not None:
-            with open(os.path.join(args.output, "cache-breakdown_perf.log"), "w") as f:
-                f.writelines(lines)
 
-        # Print the output
-        print("[cache breakdown] total throughput: {:.3f}\ttotal contribution: {:.3f}\tunaccounted contribution: {:.3f}".format(throughput, total_contrib, unaccounted_contrib))
-        if unaccounted_contrib > 5 and not args.verbose:
-            print("[cache breakdown] unknown symbols: {}".format(", ".join(not_found)))
+# Summary of the sender and receiver results
+# Returns the [summary] columns and values, and the tables printed after it as
+# (name, categories, values)
+def build_summary(args, results, receiver_results):
+    # Collect the summary in the order of the metrics
+    header = []
+    output = []
+    if args.throughput:
+        header.append("throughput (Gbps)")
+        output.append("{:.3f}".format(results["throughput"]))
 
-    if args.flame:
-        # Wait till receiver starts
-        receiver.mark_sender_ready()
-        receiver.is_receiver_ready()
-        print("[flame] starting experiment...")
+    if args.utilisation:
+        header.append("sender utilisation (%)")
+        output.append("{:.3f}".format(results["cpu_util"]))
 
-        # Start iperf and/or netperf instances
-        procs = run_flows(args.flow_type, args.config, args.addr, args.num_connections, args.num_rpcs, args.cpus, args.duration, args.window, args.rpc_size)
+    if args.cache_miss:
+        header.append("sender cache miss (%)")
+        output.append("{:.3f}".format(results["cache_miss"]))
 
-        # Start the perf instance
-        output_dir = tempfile.TemporaryDirectory()
-        perf_data_file = os.path.join(output_dir.name, "perf.data")
-        perf = run_perf_record_flame(list(set(args.cpus + args.affinity)), perf_data_file)
+    header += receiver_results["header"]
+    output += receiver_results["output"]
+    if args.throughput and args.utilisation:
+        header.append("throughput per core (Gbps)")
+        if args.config == "outcast":
+            output.append("{:.3f}".format(results["throughput"] * 100 / results["cpu_util"]))
+        else:
+            output.append("{:.3f}".format(results["throughput"] * 100 / receiver_results["cpu_util"]))
+
+    # Per-flow statistics for multi-flow configs go last so the earlier columns
+    # stay in place
+    if args.throughput and "fairness" in results:
+        fairness = results["fairness"]
+        header += ["jain's fairness index", "min flow throughput (Gbps)", "p50 flow throughput (Gbps)", "max flow throughput (Gbps)", "flow throughput CoV", "max starved flows"]
+        output += ["{:.3f}".format(fairness[key]) for key in ["jain", "min", "p50", "max", "cov"]]
+        output.append("{}".format(max(fairness["starved"], default=0)))
+
+    tables = []
+
+    # Utilisation and cache breakdowns, and their split between the
+    # application and the IRQ cores
+    for name, metric_label, key, role_key in [("util_breakdown", "utilisation", "util_contibutions", "util_role_contibutions"), ("cache_breakdown", "cache", "cache_contibutions", "cache_role_contibutions")]:
+        if getattr(args, name):
+            for side, side_results in [("sender", results), ("receiver", receiver_results)]:
+                keys = sorted(side_results[key].keys())
+                tables.append(("{} {} breakdown".format(side, metric_label), keys, [side_results[key][k] for k in keys]))
+
+            for side, side_results in [("sender", results), ("receiver", receiver_results)]:
+                for role, contributions in sorted(side_results.get(role_key, {}).items()):
+                    keys = sorted(contributions.keys())
+                    tables.append(("{} {} breakdown: {}".format(side, metric_label, role), keys, [contributions[k] for k in keys]))
+
+    # Distribution of the data copy latency
+    if args.latency and "latency_hist" in receiver_results:
+        histogram = LatencyHistogram.from_dict(receiver_results["latency_hist"])
+        keys = ["p{}".format(p) for p in REPORTED_PERCENTILES] + ["max"]
+        tables.append(("data copy latency percentiles (us)", keys, [histogram.percentile(p) / 1000 for p in REPORTED_PERCENTILES] + [(histogram.max or 0) / 1000]))
+
+    # skb sizes histogram
+    if args.skb_hist:
+        keys = ["{}-{}".format(a, b) for a, b in zip(range(0, 65, 5), range(5, 70, 5))]
+        if "skb_size_bins" in receiver_results:
+            keys = ["{:g}-{:g}".format(a, b) for a, b in receiver_results["skb_size_bins"]]
+        tables.append(("skb sizes histogram", keys, receiver_results["skb_sizes"]))
 
-        # Wait till all experiments finish
-        for p in procs:
-            p.wait()
+    return header, output, tables
 
-        # Sender is done sending
-        receiver.mark_sender_done()
 
-        # Kill the perf instance
-        perf.send_signal(signal.SIGINT)
-        perf.wait()
-        print("[flame] finished experiment.")
+# Print the summary of the sender and receiver results
+def print_summary(args, results, receiver_results):
+    header, output, tables = build_summary(args, results, receiver_results)
 
-        # Process and write the raw output
-        throughput = 0
-        for i, p in enumerate(procs):
-            lines = p.stdout.readlines()
-            if args.output is not None:
-                with open(os.path.join(args.output, "flame_benchmark_{}.log".format(i)), "w") as f:
-                    f.writelines(lines)
-            throughput += process_throughput_output(lines)
+    # Print final stats
+    if len(header) > 0 or args.util_breakdown or args.cache_breakdown:
+        print("[summary]")
 
-        # Run a perf report instance
-        output_svg_file = os.path.join(args.output, "flame.svg")
-        run_flamegraph(perf_data_file, output_svg_file)
-        output_dir.cleanup()
+    if len(header) > 0:
+        print("\t".join(header))
+        print("\t".join(output))
 
-        # Print the output
-        print("[flame] total throughput: {:.3f}".format(throughput))
+    for name, keys, values in tables:
+        print("[{}]".format(name))
+        print("\t".join(keys))
+        print("\t".join(["{:.3f}".format(value) for value in values]))
 
-    if args.latency:
-        # Wait till receiver starts
-        receiver.mark_sender_ready()
-        receiver.is_receiver_ready()
-        print("[latency] starting experiment...")
 
-        # Start iperf and/or netperf instances
-        procs = run_flows(args.flow_type, args.config, args.addr, args.num_connections, args.num_rpcs, args.cpus, args.duration, args.window, args.rpc_size)
+# Experiment options a run is keyed by in the results store
+def store_params(args):
+    ignored = ["receiver", "output", "daemon", "num_experiments", "verbose", "store", "no_store", "suite", "label", "force", "repeat", "trial"]
+    return {key: value for key, value in sorted(vars(args).items()) if key not in ignored}
 
-        # Wait till all experiments finish
-        for p in procs:
-            p.wait()
 
-        # Sender is done sending
-        receiver.mark_sender_done()
-        print("[latency] finished experiment.")
+# Key of a trial in the results store: a hash of the experiment options, the
+# trial and the state of both hosts (the receiver's comes with its hello)
+# Returns the key and what was hashed
+def run_key(args, receiver_state, trial):
+    spec = {
+        "suite": args.suite,
+        "label": args.label,
+        "params": store_params(args),
+        "trial": trial,
+        "sender": host_state_for(host_state(), args.addr, route_interface(args.addr)),
+        "receiver": None if receiver_state is None else host_state_for(receiver_state, args.addr),
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest(), spec
 
-        # Process and write the raw output
-        throughput = 0
-        for i, p in enumerate(procs):
-            lines = p.stdout.readlines()
-            if args.output is not None:
-                with open(os.path.join(args.output, "latency_benchmark_{}.log".format(i)), "w") as f:
-                    f.writelines(lines)
-            throughput += process_throughput_output(lines)
 
-        # Print the output
-        print("[latency] total throughput: {:.3f}".format(throughput))
+# Run of the results store with the given key, or None
+def cached_run(args, key):
+    if not os.path.exists(args.store):
+        return None
 
-    if args.skb_hist:
-        # Wait till receiver starts
-        receiver.mark_sender_ready()
-        receiver.is_receiver_ready()
-        print("[skb hist] starting experiment...")
+    store = ResultsStore(args.store)
+    run = store.cached_run(key)
+    store.close()
+    return run
 
-        # Start iperf and/or netperf instances
-        procs = run_flows(args.flow_type, args.config, args.addr, args.num_connections, args.num_rpcs, args.cpus, args.duration, args.window, args.rpc_size)
 
-        # Wait till all experiments finish
-        for p in procs:
-            p.wait()
+# Add the summary of the sender and receiver results to the results store,
+# along with the full distribution of the data copy latency and the throughput
+# of every second
+def store_summary(args, results, receiver_results, key=None, spec=None, trial=0):
+    if args.no_store:
+        return
 
-        # Sender is done sending
-        receiver.mark_sender_done()
-        print("[skb hist] finished experiment.")
+    header, output, tables = build_summary(args, results, receiver_results)
+    metrics = [(name, float(value)) for name, value in zip(header, output)]
 
-        # Process and write the raw output
-        throughput = 0
-        for i, p in enumerate(procs):
-            lines = p.stdout.readlines()
-            if args.output is not None:
-                with open(os.path.join(args.output, "skb-hist_benchmark_{}.log".format(i)), "w") as f:
-                    f.writelines(lines)
-            throughput += process_throughput_output(lines)
+    histograms = []
+    if "latency_hist" in receiver_results:
+        histogram = LatencyHistogram.from_dict(receiver_results["latency_hist"])
+        histograms.append(("data copy latency (ns)", [bucket_range(index) + (count,) for index, count in sorted(histogram.counts.items())]))
 
-        # Print the output
-        print("[skb hist] total throughput: {:.3f}".format(throughput))
+    if args.skb_hist:
+        bins = receiver_results.get("skb_size_bins", list(zip(range(0, 65, 5), range(5, 70, 5))))
+        histograms.append(("skb sizes (KB)", [(low, high, fraction) for (low, high), fraction in zip(bins, receiver_results["skb_sizes"])]))
+
+    series = []
+    if "throughput_series" in results:
+        series.append(("throughput (Gbps)", 1., results["throughput_series"]))
+    if "starved_series" in results:
+        series.append(("starved flows", 1., results["starved_series"]))
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.store)), exist_ok=True)
+    store = ResultsStore(args.store)
+    run = store.add_run(args.suite, args.label, store_params(args), metrics, tables, histograms, series, key, spec, trial)
+    store.close()
+    print("[store] added run {} to {}".format(run, args.store))
+
+
+# Summary of a trial from the results store, lined up with the summary of a
+# trial that was just run
+def stored_summary(args, run, like):
+    header, _, tables = like
+    store = ResultsStore(args.store)
+    metrics = store.metrics(run)
+    stored_tables = []
+    for name, keys, _ in tables:
+        values = dict(zip(*store.table(run, name)))
+        stored_tables.append((name, keys, [values.get(k) for k in keys]))
+    store.close()
+
+    return header, [metrics.get(name) for name in header], stored_tables
+
+
+# Print the mean of every metric over the trials, followed by its bootstrap
+# confidence interval and the number of trials it was measured in
+def print_trials_summary(summaries):
+    header, _, tables = summaries[0]
+    rows = [("summary", header, [[s[1][i] for s in summaries] for i in range(len(header))])]
+    for j, (name, keys, _) in enumerate(tables):
+        rows.append((name, keys, [[s[2][j][2][i] for s in summaries] for i in range(len(keys))]))
+
+    for name, keys, samples in rows:
+        if len(keys) == 0:
+            continue
+
+        samples = [[float(value) for value in values if value is not None] for values in samples]
+        intervals = [bootstrap_interval(values) for values in samples]
+        print("[{}]".format(name))
+        print("\t".join(keys))
+        print("\t".join(["{:.3f}".format(mean(values)) if len(values) > 0 else "-" for values in samples]))
+        print("[{}: 95% confidence interval]".format(name))
+        print("\t".join(["statistic"] + keys))
+        for i, statistic in enumerate(["low", "high"]):
+            print("\t".join([statistic] + ["-" if interval is None else "{:.3f}".format(interval[i]) for interval in intervals]))
+        print("\t".join(["trials"] + [str(len(values)) for values in samples]))
+
+
+# Arguments of a single trial, whose raw outputs go to their own directory if
+# there are several trials
+def trial_args(args, trial):
+    if args.repeat == 1 or args.output is None:
+        return args
+
+    args = copy.copy(args)
+    args.output = os.path.join(args.output, "trial-{}".format(trial))
+    os.makedirs(args.output, exist_ok=True)
+    return args
 
-    # Sync with receiver before exiting
-    receiver.is_receiver_ready()
 
-    # Get the results from receiver-side
-    receiver_results = receiver.get_results()
-    header += receiver_results["header"]
-    output += receiver_results["output"]
-    if args.throughput and args.utilisation:
-        header.append("throughput per core (Gbps)")
-        if args.config == "outcast":
-            output.append("{:.3f}".format(total_throughput * 100 / cpu_util))
+# Print how much of each window was lost to coordination
+# Each row is (window, receiver ready skew, sender done skew, duration) in seconds
+def print_control(rows):
+    print("[control]")
+    print("\t".join(["window", "receiver ready skew (us)", "sender done skew (us)", "window lost (%)"]))
+    for window, receiver_ready_skew, sender_done_skew, duration in rows:
+        skews = [receiver_ready_skew, sender_done_skew]
+        if None in skews:
+            print("\t".join([window, "-", "-", "-"]))
         else:
-            output.append("{:.3f}".format(total_throughput * 100 / receiver_results["cpu_util"]))
-
-    # Mark sender as done
-    receiver.mark_sender_ready()
+            print("\t".join([window] + ["{:.1f}".format(skew * 1e6) for skew in skews] + ["{:.4f}".format(sum(skews) * 100 / duration)]))
 
-    # Sleep before beginning the next experiment
-    time.sleep(1)
 
-    # Print final stats
-    if len(header) > 0 or args.util_breakdown or args.cache_breakdown:
-        print("[summary]")
+if __name__ == "__main__":
+    # Parse args
+    args = parse_args()
+    if args.verbose:
+        subprocess.enable_logging()
 
-    if len(header) > 0:
-        print("\t".join(header))
-        print("\t".join(output))
+    # Run as an agent for the coordinator
+    if args.daemon:
+        server = ControlServer(AGENT_PORT)
+        print("[daemon] waiting for experiments on port {}...".format(AGENT_PORT))
+        num_experiments = 0
+        while args.num_experiments is None or num_experiments < args.num_experiments:
+            coordinator = server.accept()
+            coordinator.send("hello", daemon=True)
+
+            # Get the experiment from the coordinator and push back the results
+            try:
+                experiment_args, error = parse_spec(coordinator.expect("experiment")["spec"], args)
+                if error is not None:
+                    coordinator.send("rejected", error=error)
+                    coordinator.close()
+                    continue
+
+                coordinator.send("accepted")
+                results = run_experiment(coordinator, experiment_args)
+                coordinator.send("results", results=results)
+                num_experiments += 1
+            except ConnectionError:
+                print("[daemon] lost connection to the coordinator, cleaning up.")
+                clear_processes()
+            coordinator.close()
+
+        server.close()
+        exit(0)
 
-    # Print utilisation breakdown if required
-    if args.util_breakdown:
-        keys = sorted(util_contibutions.keys())
-        print("[sender utilisation breakdown]")
-        print("\t".join(keys))
-        print("\t".join(["{:.3f}".format(util_contibutions[k]) for k in keys]))
+    # Connect to the receiver, waiting till it is ready
+    receiver = connect(args.receiver, COMM_PORT)
+    hello = receiver.expect("hello")
+
+    # Skip the trials whose results are already in the results store
+    trials = list(range(args.trial, args.trial + args.repeat))
+    keys = {}
+    cached = {}
+    if not args.no_store:
+        for trial in trials:
+            keys[trial] = run_key(args, hello.get("host_state"), trial)
+            run = None if args.force else cached_run(args, keys[trial][0])
+            if run is not None:
+                cached[trial] = run
+
+    missing = [trial for trial in trials if trial not in cached]
+    if len(missing) == 0:
+        print("[store] runs {} in {} have the results of this experiment, skipping it (use --force to run it again).".format(", ".join(str(run) for run in cached.values()), args.store))
+        receiver.send("skip")
+        receiver.close()
+        exit(0)
 
-        util_contibutions = receiver_results["util_contibutions"]
-        keys = sorted(util_contibutions.keys())
-        print("[receiver utilisation breakdown]")
-        print("\t".join(keys))
-        print("\t".join(["{:.3f}".format(util_contibutions[k]) for k in keys]))
+    if len(cached) > 0:
+        print("[store] trials {} are in {} already, running trials {}.".format(", ".join(str(trial) for trial in cached), args.store, ", ".join(str(trial) for trial in missing)))
 
-    # Print cache breakdown if required
-    if args.cache_breakdown:
-        keys = sorted(cache_contibutions.keys())
-        print("[sender cache breakdown]")
-        print("\t".join(keys))
-        print("\t".join(["{:.3f}".format(cache_contibutions[k]) for k in keys]))
+    # Hand the experiment to the receiver if it runs as a daemon
+    if hello["daemon"]:
+        receiver.send("experiment", spec=build_receiver_spec(args), trials=missing, trial_output=args.repeat > 1)
+    else:
+        receiver.send("start", trials=missing, trial_output=args.repeat > 1, windows=window_options(args))
+
+    # The receiver rejects options it can't run, or (if it has its own) that
+    # plan different traffic windows
+    reply = receiver.expect("accepted", "rejected")
+    if reply["type"] == "rejected":
+        print("[{}] receiver rejected the experiment: {}".format("daemon" if hello["daemon"] else "start", reply["error"]))
+        receiver.close()
+        exit(1)
 
-        cache_contibutions = receiver_results["cache_contibutions"]
-        keys = sorted(cache_contibutions.keys())
-        print("[receiver cache breakdown]")
-        print("\t".join(keys))
-        print("\t".join(["{:.3f}".format(cache_contibutions[k]) for k in keys]))
+    # Run the trials, getting the results pushed by the receiver after each
+    # Every trial is stored as soon as it's done, so that an interrupted
+    # experiment only runs the missing trials again
+    summaries = []
+    control = []
+    for trial in missing:
+        if len(trials) > 1:
+            print("[trial] running trial {} ({} of {})...".format(trial, len(summaries) + 1, len(missing)))
+
+        results = run_experiment(receiver, trial_args(args, trial))
+        receiver_results = receiver.expect("results")["results"]
+        summaries.append(build_summary(args, results, receiver_results))
+        store_summary(args, results, receiver_results, *keys.get(trial, (None, None)), trial)
+        for s, r in zip(results["control"], receiver_results["control"]):
+            window = s["window"] if len(trials) == 1 else "{} (trial {})".format(s["window"], trial)
+            control.append((window, r["receiver_ready_skew"], s["sender_done_skew"], s["duration"]))
+
+    # Close the control connection
+    receiver.close()
 
-    # Print skb sizes histogram
-    if args.skb_hist:
-        skb_sizes = receiver_results["skb_sizes"]
-        keys = ["{}-{}".format(a, b) for a, b in zip(range(0, 65, 5), range(5, 70, 5))]
-        print("[skb sizes histogram]")
-        print("\t".join(keys))
-        print("\t".join(["{:.3f}".format(s) for s in skb_sizes]))
+    # Sleep before beginning the next experiment
+    time.sleep(1)
 
+    # Print final stats
+    if len(trials) == 1:
+        print_summary(args, results, receiver_results)
+    else:
+        summaries += [stored_summary(args, run, summaries[0]) for run in cached.values()]
+        print_trials_summary(summaries)
+    print_control(control)
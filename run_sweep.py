@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+from constants import *
+from control import *
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the trials of every point of a sweep in a random order.")
+
+    # Add arguments
+    parser.add_argument("sweep", type=str, help="JSON file describing the sweep.")
+    parser.add_argument("--receiver", type=str, required=True, help="Address of the receiver to communicate metadata (running run_experiment_receiver.py --daemon).")
+    parser.add_argument("--addr", type=str, required=True, help="Address of the receiver interface to run experiments on.")
+    parser.add_argument("--iface", type=str, required=True, help="Sender interface to set up for each label.")
+    parser.add_argument("--receiver-iface", type=str, required=True, help="Receiver interface to set up for each label.")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of trials of every point.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the order of the points (random by default).")
+    parser.add_argument("--store", type=str, default=RESULTS_STORE_PATH, help="Add the results to this results store.")
+    parser.add_argument("--output", type=str, default=None, help="Write raw output to the directory.")
+    parser.add_argument("--force", action="store_true", help="Run the points even if the results store already has their results.")
+    parser.add_argument("--restore-nic", action="store_true", help="Restore the NIC configuration of both hosts after the sweep.")
+
+    # Parse and verify arguments
+    args = parser.parse_args()
+    with open(args.sweep, "r") as f:
+        sweep = json.load(f)
+
+    # Report errors
+    if args.repeat < 1:
+        print("Can't set --repeat < 1.")
+        exit(1)
+
+    if "suite" not in sweep or len(sweep.get("labels", [])) == 0:
+        print("Please provide the \"suite\" and at least one label in \"labels\".")
+        exit(1)
+
+    for label in sweep["labels"]:
+        if "label" not in label:
+            print("Please provide the \"label\" of every label in \"labels\".")
+            exit(1)
+
+    if args.seed is None:
+        args.seed = random.randrange(2 ** 32)
+
+    # Fill in the defaults
+    args.suite = sweep["suite"]
+    args.options = sweep.get("options", [])
+    args.labels = sweep["labels"]
+    args.points = sweep.get("points", [[]])
+
+    # Return parsed and verified arguments
+    return args
+
+
+# Order of the (trial, label, point) runs
+# Each round runs every (label, point) once, in a random order, so that a
+# configuration isn't confounded with whatever drifts over the sweep (e.g., the
+# temperature of the hosts)
+def plan_sweep(num_labels, num_points, repeat, seed):
+    rng = random.Random(seed)
+    order = []
+    for trial in range(repeat):
+        runs = [(label, point) for label in range(num_labels) for point in range(num_points)]
+        rng.shuffle(runs)
+        order += [(trial, label, point) for label, point in runs]
+    return order
+
+
+# Run network_setup.py on both hosts (on the receiver through its daemon)
+def setup_hosts(args, sender_setup, receiver_setup):
+    setup_args = [args.iface] + sender_setup
+    if subprocess.run([sys.executable, NETWORK_SETUP_PATH] + setup_args, stdin=subprocess.DEVNULL).returncode != 0:
+        return False
+
+    receiver = connect(args.receiver, COMM_PORT)
+    if not receiver.expect("hello")["daemon"]:
+        print("[setup] the receiver is not running as a daemon.")
+        exit(1)
+
+    receiver.send("setup", args=[args.receiver_iface] + receiver_setup)
+    returncode = receiver.expect("setup-done")["returncode"]
+    receiver.close()
+    return returncode == 0
+
+
+# Set up the NIC of both hosts for a label
+# The setup of a label must set everything the label depends on, since the
+# labels don't run in a fixed order
+def setup_label(args, label):
+    print("[setup] {}: network_setup.py {} {}".format(label["label"], args.iface, " ".join(label.get("sender_setup", []))))
+    return setup_hosts(args, label.get("sender_setup", []), label.get("receiver_setup", []))
+
+
+# Run a single trial of a point with run_experiment_sender.py
+# The sender skips it if the results store already has it
+def run_point(args, trial, label, point_index, point):
+    command = [sys.executable, SENDER_PATH, "--receiver", args.receiver, "--addr", args.addr, "--store", args.store, "--suite", args.suite, "--label", label["label"], "--trial", str(trial)]
+    command += args.options + label.get("options", []) + point
+    if args.output is not None:
+        command += ["--output", os.path.join(args.output, "{}_{}_{}_trial-{}".format(args.suite, label["label"], point_index, trial))]
+    if args.force:
+        command.append("--force")
+
+    return subprocess.run(command, stdin=subprocess.DEVNULL).returncode
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    order = plan_sweep(len(args.labels), len(args.points), args.repeat, args.seed)
+    print("[sweep] {} runs of {} labels and {} points, seed {}".format(len(order), len(args.labels), len(args.points), args.seed))
+
+    # Snapshot the NIC configuration of both hosts to restore it at the end
+    if args.restore_nic and not setup_hosts(args, ["--save-state"], ["--save-state"]):
+        print("[setup] failed to save the NIC configuration.")
+        exit(1)
+
+    # Only set up the NIC when the label changes
+    current = None
+    failed = []
+    try:
+        for i, (trial, label_index, point_index) in enumerate(order):
+            label = args.labels[label_index]
+            point = args.points[point_index]
+            if label_index != current:
+                if not setup_label(args, label):
+                    print("[setup] failed to set up {}, skipping the run.".format(label["label"]))
+                    current = None
+                    failed.append((trial, label["label"], point))
+                    continue
+                current = label_index
+
+            print("[sweep] run {} of {}: trial {} of {} {}".format(i + 1, len(order), trial, label["label"], " ".join(point)))
+            if run_point(args, trial, label, point_index, point) != 0:
+                failed.append((trial, label["label"], point))
+    finally:
+        if args.restore_nic:
+            print("[setup] restoring the NIC configuration")
+            setup_hosts(args, ["--restore-state"], ["--restore-state"])
+
+    # Failed runs are picked up by running the sweep again
+    for trial, label, point in failed:
+        print("[sweep] failed: trial {} of {} {}".format(trial, label, " ".join(point)))
+    exit(1 if len(failed) > 0 else 0)
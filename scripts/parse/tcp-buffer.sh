@@ -7,20 +7,11 @@ DIR=$(realpath $(dirname $(readlink -f $0))/../..)
 results_dir=${1:-$DIR/results}
 
 # Print the results
-tmp=`mktemp`
+query="$DIR/query_results.py --store $results_dir/results.db --suite tcp-buffer"
 echo -e "*** tcp-buffer summary ***"
 echo -e "****** throughput per core and receiver cache miss for varying TCP buffer size and all optimisations ******"
-echo -e "tcp buffer (KB)\t$(awk -F'\t' '/summary/{getline; print $5 "\t" $8}' $results_dir/tcp-buffer_all-opts_100.log)" > $tmp
-for n in 100 200 400 800 1600 3200 6400 12800; do
-    echo -e "${n}\t$(awk -F'\t' '/summary/{getline; getline; print $5 "\t" $8}' $results_dir/tcp-buffer_all-opts_${n}.log)" >> $tmp
-done
-column -t -s $'\t' $tmp
+$query --labels all-opts --by window --names "tcp buffer (KB)" --metrics "receiver cache miss (%)" "throughput per core (Gbps)" | column -t -s $'\t'
 echo
 
 echo -e "****** average and tail data copy latency for varying TCP buffer size and all optimisations ******"
-echo -e "tcp buffer (KB)\t$(awk -F'\t' '/summary/{getline; print $6 "\t" $7}' $results_dir/tcp-buffer_all-opts_100.log)" > $tmp
-for n in 100 200 400 800 1600 3200 6400 12800; do
-    echo -e "${n}\t$(awk -F'\t' '/summary/{getline; getline; print $6 "\t" $7}' $results_dir/tcp-buffer_all-opts_${n}.log)" >> $tmp
-done
-column -t -s $'\t' $tmp
-rm $tmp
+$query --labels all-opts --by window --names "tcp buffer (KB)" --metrics "avg. data copy latency (us)" "tail data copy latency (us)" | column -t -s $'\t'
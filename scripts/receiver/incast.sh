@@ -12,24 +12,16 @@ mkdir -p $results_dir
 
 # No Optimisations
 $DIR/network_setup.py $iface --no-lro --no-gso --no-gro --no-tso --mtu 1500 --sock-size  --no-arfs --config incast --receiver
-for i in 8 16 24; do
-        $DIR/run_experiment_receiver.py --config incast --num-connections $i --throughput --utilisation --output $results_dir/incast_${i}_no-opts | tee $results_dir/incast_${i}_no-opts.log
-done
+$DIR/run_experiment_receiver.py --daemon --num-experiments 3 --output $results_dir | tee $results_dir/incast_no-opts.log
 
 # TSO/GRO
 $DIR/network_setup.py $iface --gro --tso
-for i in 8 16 24; do
-        $DIR/run_experiment_receiver.py --config incast --num-connections $i --throughput --utilisation --output $results_dir/incast_${i}_tsogro | tee $results_dir/incast_${i}_tsogro.log
-done
+$DIR/run_experiment_receiver.py --daemon --num-experiments 3 --output $results_dir | tee $results_dir/incast_tsogro.log
 
 # TSO/GRO+Jumbo Frame
 $DIR/network_setup.py $iface --mtu 9000
-for i in 8 16 24; do
-        $DIR/run_experiment_receiver.py --config incast --num-connections $i --throughput --utilisation --output $results_dir/incast_${i}_tsogro+jumbo | tee $results_dir/incast_${i}_tsogro+jumbo.log
-done
+$DIR/run_experiment_receiver.py --daemon --num-experiments 3 --output $results_dir | tee $results_dir/incast_tsogro+jumbo.log
 
 # TSO/GRO+Jumbo Frame+aRFS
 $DIR/network_setup.py $iface --arfs
-for i in 8 16 24; do
-        $DIR/run_experiment_receiver.py --config incast --num-connections $i --throughput --utilisation --cache-miss --util-breakdown --arfs --output $results_dir/incast_${i}_all-opts | tee $results_dir/incast_${i}_all-opts.log
-done
+$DIR/run_experiment_receiver.py --daemon --num-experiments 3 --output $results_dir | tee $results_dir/incast_all-opts.log
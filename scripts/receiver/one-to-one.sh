@@ -12,24 +12,16 @@ mkdir -p $results_dir
 
 # No Optimisations
 $DIR/network_setup.py $iface --no-lro --no-gso --no-gro --no-tso --no-arfs --config one-to-one --receiver --mtu 1500 --sock-size
-for i in 8 16 24; do
-        $DIR/run_experiment_receiver.py --config one-to-one --num-connections $i --throughput --utilisation --output $results_dir/one-to-one_${i}_no-opts | tee $results_dir/one-to-one_${i}_no-opts.log
-done
+$DIR/run_experiment_receiver.py --daemon --num-experiments 3 --output $results_dir | tee $results_dir/one-to-one_no-opts.log
 
 # TSO/GRO
 $DIR/network_setup.py $iface --gro --tso
-for i in 8 16 24; do
-        $DIR/run_experiment_receiver.py --config one-to-one --num-connections $i --throughput --utilisation --output $results_dir/one-to-one_${i}_tsogro | tee $results_dir/one-to-one_${i}_tsogro.log
-done
+$DIR/run_experiment_receiver.py --daemon --num-experiments 3 --output $results_dir | tee $results_dir/one-to-one_tsogro.log
 
 # TSO/GRO+Jumbo Frame
 $DIR/network_setup.py $iface --mtu 9000
-for i in 8 16 24; do
-        $DIR/run_experiment_receiver.py --config one-to-one --num-connections $i --throughput --utilisation --output $results_dir/one-to-one_${i}_tsogro+jumbo | tee $results_dir/one-to-one_${i}_tsogro+jumbo.log
-done
+$DIR/run_experiment_receiver.py --daemon --num-experiments 3 --output $results_dir | tee $results_dir/one-to-one_tsogro+jumbo.log
 
 # TSO/GRO+Jumbo Frame+aRFS
 $DIR/network_setup.py $iface --arfs
-for i in 8 16 24; do
-        $DIR/run_experiment_receiver.py --config one-to-one --num-connections $i --throughput --utilisation --util-breakdown --arfs --output $results_dir/one-to-one_${i}_all-opts | tee $results_dir/one-to-one_${i}_all-opts.log
-done
+$DIR/run_experiment_receiver.py --daemon --num-experiments 3 --output $results_dir | tee $results_dir/one-to-one_all-opts.log
@@ -12,25 +12,17 @@ mkdir -p $results_dir
 
 # No Optimisations
 $DIR/network_setup.py $iface --no-lro --no-gso --no-gro --no-tso --no-arfs --receiver --mtu 1500 --sock-size
-for i in 100 1000 10000; do
-    $DIR/run_experiment_receiver.py --packet-drop $i --throughput --utilisation --output $results_dir/packet-loss_no-opts_${i} | tee $results_dir/packet-loss_no-opts_${i}.log
-done
+$DIR/run_experiment_receiver.py --daemon --num-experiments 3 --output $results_dir | tee $results_dir/packet-loss_no-opts.log
 
 # TSO/GRO
 $DIR/network_setup.py $iface --gro --tso
-for i in 100 1000 10000; do
-    $DIR/run_experiment_receiver.py --packet-drop $i --throughput --utilisation --output $results_dir/packet-loss_tsogro_${i} | tee $results_dir/packet-loss_tsogro_${i}.log
-done
+$DIR/run_experiment_receiver.py --daemon --num-experiments 3 --output $results_dir | tee $results_dir/packet-loss_tsogro.log
 
 # TSO/GRO+Jumbo Frame
 $DIR/network_setup.py $iface --mtu 9000
-for i in 100 1000 10000; do
-    $DIR/run_experiment_receiver.py --packet-drop $i --throughput --utilisation --output $results_dir/packet-loss_tsogro+jumbo_${i} | tee $results_dir/packet-loss_tsogro+jumbo_${i}.log
-done
+$DIR/run_experiment_receiver.py --daemon --num-experiments 3 --output $results_dir | tee $results_dir/packet-loss_tsogro+jumbo.log
 
 # TSO/GRO+Jumbo Frame+aRFS
 $DIR/network_setup.py $iface --arfs
-for i in 100 1000 10000; do
-    $DIR/run_experiment_receiver.py --packet-drop $i --throughput --utilisation --util-breakdown --arfs --output $results_dir/packet-loss_all-opts_${i} | tee $results_dir/packet-loss_all-opts_${i}.log
-done
+$DIR/run_experiment_receiver.py --daemon --num-experiments 3 --output $results_dir | tee $results_dir/packet-loss_all-opts.log
 
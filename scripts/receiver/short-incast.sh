@@ -12,24 +12,16 @@ mkdir -p $results_dir
 
 # No Optimisations
 $DIR/network_setup.py $iface --no-lro --no-gso --no-gro --no-tso --mtu 1500 --sock-size --no-arfs --flow-type short --config incast --receiver
-for i in 4000 16000 32000 64000; do
-        $DIR/run_experiment_receiver.py --config incast --flow-type short --num-connections 16 --throughput --utilisation --output $results_dir/short-incast_16_${i}_no-opts | tee $results_dir/short-incast_16_${i}_no-opts.log
-done
+$DIR/run_experiment_receiver.py --daemon --num-experiments 4 --output $results_dir | tee $results_dir/short-incast_16_no-opts.log
 
 # TSO/GRO
 $DIR/network_setup.py $iface --gro --tso
-for i in 4000 16000 32000 64000; do
-        $DIR/run_experiment_receiver.py --config incast --flow-type short --num-connections 16 --throughput --utilisation --output $results_dir/short-incast_16_${i}_tsogro | tee $results_dir/short-incast_16_${i}_tsogro.log
-done
+$DIR/run_experiment_receiver.py --daemon --num-experiments 4 --output $results_dir | tee $results_dir/short-incast_16_tsogro.log
 
 # TSO/GRO+Jumbo Frame
 $DIR/network_setup.py $iface --mtu 9000
-for i in 4000 16000 32000 64000; do
-        $DIR/run_experiment_receiver.py --config incast --flow-type short --num-connections 16 --throughput --utilisation --output $results_dir/short-incast_16_${i}_tsogro+jumbo | tee $results_dir/short-incast_16_${i}_tsogro+jumbo.log
-done
+$DIR/run_experiment_receiver.py --daemon --num-experiments 4 --output $results_dir | tee $results_dir/short-incast_16_tsogro+jumbo.log
 
 # TSO/GRO+Jumbo Frame+aRFS
 $DIR/network_setup.py $iface --arfs
-for i in 4000 16000 32000 64000; do
-        $DIR/run_experiment_receiver.py --config incast --flow-type short --num-connections 16 --throughput --utilisation --util-breakdown --arfs --output $results_dir/short-incast_16_${i}_all-opts | tee $results_dir/short-incast_16_${i}_all-opts.log
-done
+$DIR/run_experiment_receiver.py --daemon --num-experiments 4 --output $results_dir | tee $results_dir/short-incast_16_all-opts.log
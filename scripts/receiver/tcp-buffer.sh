@@ -12,6 +12,4 @@ mkdir -p $results_dir
 
 # TSO/GRO+Jumbo Frame+aRFS
 $DIR/network_setup.py $iface --gro --tso --mtu 9000 --sock-size --arfs
-for i in 100 200 400 800 1600 3200 6400 12800; do
-    $DIR/run_experiment_receiver.py --window $i --throughput --utilisation --cache-miss --latency --arfs --output $results_dir/tcp-buffer_all-opts_${i} | tee $results_dir/tcp-buffer_all-opts_${i}.log
-done
+$DIR/run_experiment_receiver.py --daemon --num-experiments 8 --output $results_dir | tee $results_dir/tcp-buffer_all-opts.log
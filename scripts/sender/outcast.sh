@@ -15,25 +15,25 @@ mkdir -p $results_dir
 # No Optimisations
 $DIR/network_setup.py $iface --no-lro --no-gso --no-gro --no-tso --no-arfs --sender --config outcast --mtu 1500 --sock-size
 for i in 2 4 8; do
-        $DIR/run_experiment_sender.py --addr $device_dst_ip --receiver $public_dst_ip --config outcast --num-connections $i --throughput --utilisation --output $results_dir/outcast_${i}_no-opts | tee $results_dir/outcast_${i}_no-opts.log
+        $DIR/run_experiment_sender.py --addr $device_dst_ip --receiver $public_dst_ip --config outcast --num-connections $i --throughput --utilisation --store $results_dir/results.db --suite outcast --label no-opts --output $results_dir/outcast_${i}_no-opts | tee $results_dir/outcast_${i}_no-opts.log
 done
 
 # TSO/GRO
 $DIR/network_setup.py $iface --gro --tso
 for i in 2 4 8; do
-        $DIR/run_experiment_sender.py --addr $device_dst_ip --receiver $public_dst_ip --config outcast --num-connections $i --throughput --utilisation --output $results_dir/outcast_${i}_tsogro | tee $results_dir/outcast_${i}_tsogro.log
+        $DIR/run_experiment_sender.py --addr $device_dst_ip --receiver $public_dst_ip --config outcast --num-connections $i --throughput --utilisation --store $results_dir/results.db --suite outcast --label tsogro --output $results_dir/outcast_${i}_tsogro | tee $results_dir/outcast_${i}_tsogro.log
 done
 
 # TSO/GRO+Jumbo Frame
 $DIR/network_setup.py $iface --mtu 9000
 for i in 2 4 8; do
-        $DIR/run_experiment_sender.py --addr $device_dst_ip --receiver $public_dst_ip --config outcast --num-connections $i --throughput --utilisation --output $results_dir/outcast_${i}_tsogro+jumbo | tee $results_dir/outcast_${i}_tsogro+jumbo.log
+        $DIR/run_experiment_sender.py --addr $device_dst_ip --receiver $public_dst_ip --config outcast --num-connections $i --throughput --utilisation --store $results_dir/results.db --suite outcast --label tsogro+jumbo --output $results_dir/outcast_${i}_tsogro+jumbo | tee $results_dir/outcast_${i}_tsogro+jumbo.log
 done
 
 # TSO/GRO+Jumbo Frame+aRFS
 $DIR/network_setup.py $iface --arfs
 for i in 2 4 8; do
-        $DIR/run_experiment_sender.py --addr $device_dst_ip --receiver $public_dst_ip --config outcast --num-connections $i --throughput --utilisation --util-breakdown --arfs --output $results_dir/outcast_${i}_all-opts | tee $results_dir/outcast_${i}_all-opts.log
+        $DIR/run_experiment_sender.py --addr $device_dst_ip --receiver $public_dst_ip --config outcast --num-connections $i --throughput --utilisation --util-breakdown --arfs --store $results_dir/results.db --suite outcast --label all-opts --output $results_dir/outcast_${i}_all-opts | tee $results_dir/outcast_${i}_all-opts.log
 done
 
 # Print results
@@ -15,25 +15,25 @@ mkdir -p $results_dir
 # No Optimisations
 $DIR/network_setup.py $iface --no-lro --no-gso --no-gro --no-tso --no-arfs --sender --mtu 1500 --sock-size
 for i in 100 1000 10000; do
-    $DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --throughput --utilisation --output $results_dir/packet-loss_no-opts_${i} | tee $results_dir/packet-loss_no-opts_${i}.log
+    $DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --packet-drop $i --throughput --utilisation --store $results_dir/results.db --suite packet-loss --label no-opts --output $results_dir/packet-loss_no-opts_${i} | tee $results_dir/packet-loss_no-opts_${i}.log
 done
 
 # TSO/GRO
 $DIR/network_setup.py $iface --gro --tso
 for i in 100 1000 10000; do
-    $DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --throughput --utilisation --output $results_dir/packet-loss_tsogro_${i} | tee $results_dir/packet-loss_tsogro_${i}.log
+    $DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --packet-drop $i --throughput --utilisation --store $results_dir/results.db --suite packet-loss --label tsogro --output $results_dir/packet-loss_tsogro_${i} | tee $results_dir/packet-loss_tsogro_${i}.log
 done
 
 # TSO/GRO+Jumbo Frame
 $DIR/network_setup.py $iface --mtu 9000
 for i in 100 1000 10000; do
-    $DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --throughput --utilisation --output $results_dir/packet-loss_tsogro+jumbo_${i} | tee $results_dir/packet-loss_tsogro+jumbo_${i}.log
+    $DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --packet-drop $i --throughput --utilisation --store $results_dir/results.db --suite packet-loss --label tsogro+jumbo --output $results_dir/packet-loss_tsogro+jumbo_${i} | tee $results_dir/packet-loss_tsogro+jumbo_${i}.log
 done
 
 # TSO/GRO+Jumbo Frame+aRFS
 $DIR/network_setup.py $iface --arfs
 for i in 100 1000 10000; do
-    $DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --throughput --utilisation --util-breakdown --arfs --output $results_dir/packet-loss_all-opts_${i} | tee $results_dir/packet-loss_all-opts_${i}.log
+    $DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --packet-drop $i --throughput --utilisation --util-breakdown --arfs --store $results_dir/results.db --suite packet-loss --label all-opts --output $results_dir/packet-loss_all-opts_${i} | tee $results_dir/packet-loss_all-opts_${i}.log
 done
 
 # Print results
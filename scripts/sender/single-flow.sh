@@ -14,31 +14,31 @@ mkdir -p $results_dir
 
 # No Optimisations
 $DIR/network_setup.py $iface --no-lro --no-gso --no-gro --no-tso --no-arfs --sender --mtu 1500 --sock-size
-$DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --throughput --utilisation --util-breakdown --output $results_dir/single-flow_no-opts | tee $results_dir/single-flow_no-opts.log
+$DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --throughput --utilisation --util-breakdown --store $results_dir/results.db --suite single-flow --label no-opts --output $results_dir/single-flow_no-opts | tee $results_dir/single-flow_no-opts.log
 
 # TSO/GRO
 $DIR/network_setup.py $iface --gro --tso
-$DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --throughput --utilisation --util-breakdown --output $results_dir/single-flow_tsogro | tee $results_dir/single-flow_tsogro.log
+$DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --throughput --utilisation --util-breakdown --store $results_dir/results.db --suite single-flow --label tsogro --output $results_dir/single-flow_tsogro | tee $results_dir/single-flow_tsogro.log
 
 # Jumbo
 $DIR/network_setup.py $iface --no-gro --no-tso --mtu 9000
-$DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --throughput --utilisation --output $results_dir/single-flow_jumbo | tee $results_dir/single-flow_jumbo.log
+$DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --throughput --utilisation --store $results_dir/results.db --suite single-flow --label jumbo --output $results_dir/single-flow_jumbo | tee $results_dir/single-flow_jumbo.log
 
 # TSO/GRO+Jumbo Frame
 $DIR/network_setup.py $iface --gro --tso
-$DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --throughput --utilisation --util-breakdown --output $results_dir/single-flow_tsogro+jumbo | tee $results_dir/single-flow_tsogro+jumbo.log
+$DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --throughput --utilisation --util-breakdown --store $results_dir/results.db --suite single-flow --label tsogro+jumbo --output $results_dir/single-flow_tsogro+jumbo | tee $results_dir/single-flow_tsogro+jumbo.log
 
 # TSO/GRO+aRFS
 $DIR/network_setup.py $iface --gro --tso --arfs --mtu 1500
-$DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --throughput --utilisation --arfs --output $results_dir/single-flow_tsogro+arfs | tee $results_dir/single-flow_tsogro+arfs.log
+$DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --throughput --utilisation --arfs --store $results_dir/results.db --suite single-flow --label tsogro+arfs --output $results_dir/single-flow_tsogro+arfs | tee $results_dir/single-flow_tsogro+arfs.log
 
 # Jumbo+aRFS
 $DIR/network_setup.py $iface --no-gro --no-tso --mtu 9000
-$DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --throughput --utilisation --arfs --output $results_dir/single-flow_jumbo+arfs | tee $results_dir/single-flow_jumbo+arfs.log
+$DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --throughput --utilisation --arfs --store $results_dir/results.db --suite single-flow --label jumbo+arfs --output $results_dir/single-flow_jumbo+arfs | tee $results_dir/single-flow_jumbo+arfs.log
 
 # TSO/GRO+Jumbo Frame+aRFS
 $DIR/network_setup.py $iface --gro --tso
-$DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --throughput --utilisation --util-breakdown --arfs --output $results_dir/single-flow_all-opts | tee $results_dir/single-flow_all-opts.log
+$DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --throughput --utilisation --util-breakdown --arfs --store $results_dir/results.db --suite single-flow --label all-opts --output $results_dir/single-flow_all-opts | tee $results_dir/single-flow_all-opts.log
 
 # Print results
 $DIR/scripts/parse/single-flow.sh $results_dir
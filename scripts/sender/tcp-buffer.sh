@@ -15,7 +15,7 @@ mkdir -p $results_dir
 # TSO/GRO+Jumbo Frame+aRFS
 $DIR/network_setup.py $iface --gro --tso --arfs --mtu 9000 --sock-size
 for i in 100 200 400 800 1600 3200 6400 12800; do
-    $DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --window $i --throughput --utilisation --cache-miss --latency --arfs --output $results_dir/tcp-buffer_all-opts_${i} | tee $results_dir/tcp-buffer_all-opts_${i}.log
+    $DIR/run_experiment_sender.py --receiver $public_dst_ip --addr $device_dst_ip --window $i --throughput --utilisation --cache-miss --latency --arfs --store $results_dir/results.db --suite tcp-buffer --label all-opts --output $results_dir/tcp-buffer_all-opts_${i} | tee $results_dir/tcp-buffer_all-opts_${i}.log
 done
 
 # Print results
@@ -0,0 +1,181 @@
+import itertools
+import math
+import random
+
+
+# Two-sided 95% quantiles of Student's t distribution for 1-30 degrees of freedom
+T_95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+# Normal approximation for more degrees of freedom
+Z_95 = 1.960
+
+# Resamples drawn for a bootstrap confidence interval
+BOOTSTRAP_RESAMPLES = 2000
+
+# Splits of the pooled samples a permutation test enumerates; with more, it
+# draws as many at random
+PERMUTATION_SPLITS = 20000
+
+
+def mean(samples):
+    return sum(samples) / len(samples)
+
+
+def stdev(samples):
+    m = mean(samples)
+    return math.sqrt(sum((s - m) ** 2 for s in samples) / (len(samples) - 1))
+
+
+# Mean and half width of the 95% confidence interval of the mean
+def confidence_interval(samples):
+    if len(samples) < 2:
+        return mean(samples), math.inf
+
+    df = len(samples) - 1
+    t = T_95[df - 1] if df <= len(T_95) else Z_95
+    return mean(samples), t * stdev(samples) / math.sqrt(len(samples))
+
+
+# Percentile bootstrap 95% confidence interval of the mean, or None with fewer
+# than two samples
+# The resamples are seeded so that the same samples (in any order) give the
+# same interval
+def bootstrap_interval(samples, resamples=BOOTSTRAP_RESAMPLES, seed=0):
+    if len(samples) < 2:
+        return None
+
+    rng = random.Random(seed)
+    samples = sorted(samples)
+    means = [mean(rng.choices(samples, k=len(samples))) for _ in range(resamples)]
+    return percentile(means, 2.5), percentile(means, 97.5)
+
+
+# Percentile bootstrap 95% confidence interval of the difference of the means
+# of b and a, or None with fewer than two samples on a side
+# It's not a test: with a few samples on each side, the resampled differences
+# are far narrower than the spread of the difference, so a p-value read off
+# them flags noise (see permutation_test)
+def bootstrap_difference(a, b, resamples=BOOTSTRAP_RESAMPLES, seed=0):
+    if len(a) < 2 or len(b) < 2:
+        return None
+
+    rng = random.Random(seed)
+    a = sorted(a)
+    b = sorted(b)
+    differences = [mean(rng.choices(b, k=len(b))) - mean(rng.choices(a, k=len(a))) for _ in range(resamples)]
+    return percentile(differences, 2.5), percentile(differences, 97.5)
+
+
+def combinations_count(n, k):
+    return math.factorial(n) // (math.factorial(k) * math.factorial(n - k))
+
+
+# Two-sided p-value of no difference between the means of a and b, from a
+# permutation test: the share of the splits of the pooled samples into groups
+# of the same sizes whose means are at least as far apart as those of a and b
+# Every split is tried if there are at most splits of them (so the p-value is
+# exact, but can't be below 2 over their number, e.g. 2/70 with 4 samples on
+# each side), otherwise as many are drawn at random (seeded, as the bootstrap)
+def permutation_test(a, b, splits=PERMUTATION_SPLITS, seed=0):
+    pooled = sorted(a) + sorted(b)
+    total = sum(pooled)
+    n = len(pooled)
+
+    def distance(group):
+        group_sum = sum(pooled[i] for i in group)
+        return abs(group_sum / len(b) - (total - group_sum) / len(a))
+
+    # Splits as far apart as a and b may differ in the last bits of the sums
+    observed = distance(range(len(a), n)) - 1e-9 * max(abs(s) for s in pooled)
+    if combinations_count(n, len(b)) <= splits:
+        groups = list(itertools.combinations(range(n), len(b)))
+        return sum(1 for group in groups if distance(group) >= observed) / len(groups)
+
+    rng = random.Random(seed)
+    count = sum(1 for _ in range(splits) if distance(rng.sample(range(n), len(b))) >= observed)
+    return (count + 1) / (splits + 1)
+
+
+# Hedges' g: the difference of the means of b and a over their pooled standard
+# deviation, corrected for the bias of small samples
+def hedges_g(a, b):
+    difference = mean(b) - mean(a)
+    pooled = math.sqrt(((len(a) - 1) * stdev(a) ** 2 + (len(b) - 1) * stdev(b) ** 2) / (len(a) + len(b) - 2))
+    if pooled == 0:
+        return 0. if difference == 0 else math.copysign(math.inf, difference)
+    return difference / pooled * (1 - 3 / (4 * (len(a) + len(b)) - 9))
+
+
+# Benjamini-Hochberg adjusted p-values (q-values), in the order of p_values
+# Flagging the q-values below a threshold keeps the expected share of false
+# discoveries below it, however many comparisons there are
+def benjamini_hochberg(p_values):
+    order = sorted(range(len(p_values)), key=lambda i: p_values[i])
+    q_values = [1.] * len(p_values)
+    q = 1.
+    for rank in range(len(order), 0, -1):
+        i = order[rank - 1]
+        q = min(q, p_values[i] * len(p_values) / rank)
+        q_values[i] = q
+    return q_values
+
+
+# Width of the confidence interval relative to the mean
+def relative_width(samples):
+    m, half_width = confidence_interval(samples)
+    return math.inf if m == 0 else 2 * half_width / m
+
+
+# MSER truncation point: the number of initial samples to drop so that the
+# remaining samples give the tightest estimate of the mean
+# Only the first half of the series can be dropped
+def mser(samples):
+    best_stat = math.inf
+    best_d = 0
+    for d in range(len(samples) // 2 + 1):
+        rest = samples[d:]
+        if len(rest) == 0:
+            break
+
+        m = mean(rest)
+        stat = sum((s - m) ** 2 for s in rest) / len(rest) ** 2
+        if stat < best_stat:
+            best_stat = stat
+            best_d = d
+
+    return best_d
+
+
+# Steady-state window [begin, end) of a per-interval series
+def steady_state_window(samples):
+    return mser(samples), len(samples)
+
+
+# Mean of a series over a window, or 0 if there are no samples in the window
+def window_mean(samples, begin, end):
+    samples = samples[begin:end]
+    return 0 if len(samples) == 0 else mean(samples)
+
+
+# Percentile with linear interpolation between the closest ranks
+def percentile(samples, p):
+    samples = sorted(samples)
+    rank = (len(samples) - 1) * p / 100
+    low = math.floor(rank)
+    high = min(low + 1, len(samples) - 1)
+    return samples[low] + (samples[high] - samples[low]) * (rank - low)
+
+
+# Jain's fairness index: 1 if all samples are equal, 1/n if one takes everything
+def jain_index(samples):
+    total = sum(samples)
+    squares = sum(s ** 2 for s in samples)
+    return 1. if squares == 0 else total ** 2 / (len(samples) * squares)
+
+
+# Coefficient of variation (population standard deviation over the mean)
+def coefficient_of_variation(samples):
+    m = mean(samples)
+    return 0. if m == 0 else math.sqrt(sum((s - m) ** 2 for s in samples) / len(samples)) / m
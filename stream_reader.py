@@ -0,0 +1,138 @@
+import collections
+import os
+import queue
+import selectors
+import threading
+
+
+# Size of each read from a pipe
+READ_SIZE = 64 * 1024
+
+# Lines kept for each stream till they're taken; older lines are dropped, so a
+# long running process can't grow without bound (the parsers only need the
+# last minutes of interval lines, e.g. the last 12 lines of iperf)
+MAX_KEPT_LINES = 64 * 1024
+
+
+# The output of a child process, read by the pool as it arrives
+# Lines are appended to the raw log (if any) straight away, handed to the
+# consumers (if any) as they arrive, and kept till taken (if keep is set, at
+# most the last max_lines of them)
+class Stream:
+    def __init__(self, proc, path, keep, max_lines=MAX_KEPT_LINES):
+        self.proc = proc
+        self.log = None if path is None else open(path, "w")
+        self.keep = keep
+        self.lines = collections.deque(maxlen=max_lines)
+        self.partial = b""
+        self.consumers = []
+        self.cond = threading.Condition()
+        self.closed = False
+
+    # consumer(lines, closed) is called from the pool's thread
+    def subscribe(self, consumer):
+        with self.cond:
+            self.consumers.append(consumer)
+            if len(self.lines) > 0 or self.closed:
+                consumer(list(self.lines), self.closed)
+
+    def feed(self, data):
+        *complete, self.partial = (self.partial + data).split(b"\n")
+        self.write([line.decode(errors="replace") + "\n" for line in complete])
+
+    def close(self):
+        lines = [] if len(self.partial) == 0 else [self.partial.decode(errors="replace")]
+        self.partial = b""
+        self.write(lines, closed=True)
+        if self.log is not None:
+            self.log.close()
+
+    def write(self, lines, closed=False):
+        if self.log is not None:
+            self.log.writelines(lines)
+            self.log.flush()
+
+        with self.cond:
+            if self.keep:
+                self.lines.extend(lines)
+            self.closed = closed
+            for consumer in self.consumers:
+                consumer(lines, closed)
+            self.cond.notify_all()
+
+    # Wait till the process closes its output
+    def wait(self):
+        with self.cond:
+            self.cond.wait_for(lambda: self.closed)
+        self.proc.wait()
+
+    # Return the lines since the last call
+    def take(self):
+        with self.cond:
+            lines = list(self.lines)
+            self.lines.clear()
+        return lines
+
+    # Wait till the process is done and return its output
+    def readlines(self):
+        self.wait()
+        return self.take()
+
+
+# All the streams share a single pool
+__pool = None
+__pool_lock = threading.Lock()
+
+
+def get_reader_pool():
+    global __pool
+    with __pool_lock:
+        if __pool is None:
+            __pool = ReaderPool()
+    return __pool
+
+
+# Drains the output of all the child processes from a single background thread,
+# so that no child blocks on a full pipe
+class ReaderPool:
+    def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        self.added = queue.Queue()
+        self.wakeup_r, self.wakeup_w = os.pipe()
+        self.selector.register(self.wakeup_r, selectors.EVENT_READ, None)
+        threading.Thread(target=self.run, daemon=True).start()
+
+    # Start reading the output of a process, optionally logging it to path
+    # A consumer passed here sees every line, even if nothing is kept
+    def add(self, proc, path=None, keep=True, consumer=None, max_lines=MAX_KEPT_LINES):
+        stream = Stream(proc, path, keep, max_lines)
+        if consumer is not None:
+            stream.subscribe(consumer)
+        self.added.put(stream)
+        os.write(self.wakeup_w, b"\0")
+        return stream
+
+    def run(self):
+        while True:
+            for key, _ in self.selector.select():
+                # New streams are registered from this thread only
+                if key.data is None:
+                    os.read(self.wakeup_r, READ_SIZE)
+                    while not self.added.empty():
+                        stream = self.added.get()
+                        os.set_blocking(stream.proc.stdout.fileno(), False)
+                        self.selector.register(stream.proc.stdout.fileno(), selectors.EVENT_READ, stream)
+                    continue
+
+                stream = key.data
+                try:
+                    data = os.read(key.fd, READ_SIZE)
+                except BlockingIOError:
+                    continue
+
+                if len(data) == 0:
+                    self.selector.unregister(key.fd)
+                    stream.proc.stdout.close()
+                    stream.close()
+                else:
+                    stream.feed(data)
@@ -0,0 +1,142 @@
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+
+# Path to the symbols map file (exact matches) and the rules file (patterns)
+SYMBOL_MAP_FILE = os.path.join(os.path.split(os.path.realpath(__file__))[0], "symbol_mapping.tsv")
+SYMBOL_RULES_FILE = os.path.join(os.path.split(os.path.realpath(__file__))[0], "symbol_rules.tsv")
+
+# Directory of the classification caches, one per version of the two files
+SYMBOL_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "tcp-profiling")
+
+
+# Trie of the prefix rules
+# Each node keeps the index of the first rule ending there (if any)
+class PrefixTrie:
+    def __init__(self):
+        self.root = {}
+
+    def add(self, prefix, index):
+        node = self.root
+        for c in prefix:
+            node = node.setdefault(c, {})
+        node.setdefault(None, index)
+
+    # Index of the first rule whose prefix matches the symbol, or None
+    def match(self, symbol):
+        best = self.root.get(None)
+        node = self.root
+        for c in symbol:
+            node = node.get(c)
+            if node is None:
+                break
+            if None in node and (best is None or node[None] < best):
+                best = node[None]
+        return best
+
+
+# Classifies kernel symbols into categories
+# Exact matches from the symbols map come first, then the first matching rule
+# in file order; rules are globs, and those of the form "prefix*" go in a trie
+class SymbolClassifier:
+    def __init__(self, map_file=SYMBOL_MAP_FILE, rules_file=SYMBOL_RULES_FILE):
+        self.exact = {}
+        self.categories = set()
+        self.rules = []
+        self.trie = PrefixTrie()
+        self.patterns = []
+
+        digest = hashlib.sha256()
+        with open(map_file, "rb") as f:
+            content = f.read()
+            digest.update(content)
+            for line in content.decode().splitlines():
+                comps = line.split()
+                if len(comps) == 2:
+                    self.exact[comps[0]] = comps[1]
+                    self.categories.add(comps[1])
+
+        if os.path.exists(rules_file):
+            with open(rules_file, "rb") as f:
+                content = f.read()
+                digest.update(content)
+                for line in content.decode().splitlines():
+                    comps = line.split()
+                    if len(comps) == 2 and not line.startswith("#"):
+                        self.add_rule(*comps)
+
+        # Results of earlier runs with the same map and rules
+        self.cache_path = os.path.join(SYMBOL_CACHE_DIR, "symbols-{}.json".format(digest.hexdigest()[:16]))
+        self.cache = {}
+        self.num_cached = 0
+        try:
+            with open(self.cache_path, "r") as f:
+                self.cache = json.load(f)
+            self.num_cached = len(self.cache)
+        except (OSError, ValueError):
+            pass
+
+    def add_rule(self, pattern, category):
+        index = len(self.rules)
+        self.rules.append(category)
+        self.categories.add(category)
+        prefix = pattern[:-1]
+        if pattern.endswith("*") and not any(c in prefix for c in "*?["):
+            self.trie.add(prefix, index)
+        else:
+            self.patterns.append((index, re.compile(fnmatch.translate(pattern))))
+
+    # Category of a symbol, or None if nothing matches
+    def classify(self, symbol):
+        if symbol in self.exact:
+            return self.exact[symbol]
+        if symbol in self.cache:
+            return self.cache[symbol]
+
+        index = self.trie.match(symbol)
+        for i, pattern in self.patterns:
+            if index is not None and i > index:
+                break
+            if pattern.match(symbol):
+                index = i
+                break
+
+        category = None if index is None else self.rules[index]
+        self.cache[symbol] = category
+        return category
+
+    # Write the new results to the cache, merging with other processes' results
+    def save(self):
+        if len(self.cache) == self.num_cached:
+            return
+
+        try:
+            os.makedirs(SYMBOL_CACHE_DIR, exist_ok=True)
+            try:
+                with open(self.cache_path, "r") as f:
+                    self.cache = {**json.load(f), **self.cache}
+            except (OSError, ValueError):
+                pass
+
+            fd, path = tempfile.mkstemp(dir=SYMBOL_CACHE_DIR)
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.cache, f)
+            os.replace(path, self.cache_path)
+            self.num_cached = len(self.cache)
+        except OSError:
+            pass
+
+
+# All the breakdowns in a process share a single classifier
+__classifier = None
+
+
+def get_symbol_classifier():
+    global __classifier
+    if __classifier is None:
+        __classifier = SymbolClassifier()
+    return __classifier
@@ -0,0 +1,25 @@
+#!/bin/bash
+# Record a capture to check perf_data.py against perf report (see
+# tests/test_perf_data.py): perf.data, the perf report it's checked against,
+# and the kernel text symbols it was recorded with
+# Run it as root on a host with perf while something runs on the CPUs, and
+# commit the captures/<name> directory
+# Example: ./capture.sh iperf-receiver 0-1 2
+DIR=$(realpath $(dirname $(readlink -f $0)))
+
+# Parse arguments
+name=${1:?Please provide the name of the capture.}
+cpus=${2:-0}
+seconds=${3:-2}
+perf=${PERF:-/usr/bin/perf}
+out=$DIR/captures/$name
+
+mkdir -p $out
+
+# Same options as run_perf_record_util and run_perf_report in
+# run_experiment_receiver.py
+$perf record -C $cpus -o $out/perf.data -- sleep $seconds
+$perf report --stdio --stdio-color never --percent-limit 0.01 -i $out/perf.data > $out/perf-report.txt
+
+# Only the text symbols are looked up, compressed to keep the repository small
+grep -E '^[0-9a-f]+ [tTwW] ' /proc/kallsyms | gzip -9 > $out/kallsyms.gz
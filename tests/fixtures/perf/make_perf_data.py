@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+# Writes perf.data, a small recording laid out as perf record -C writes it
+# (see include/uapi/linux/perf_event.h and tools/perf/util/header.c), with
+# kernel samples on the symbols of the kallsyms file next to it
+# It doesn't use perf_data.py, so that the test doesn't read the file with
+# the same assumptions it was written with
+
+import os
+import struct
+
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perf.data")
+
+# struct perf_event_attr (PERF_ATTR_SIZE_VER8), followed in the file by the
+# section of its ids
+ATTR = struct.Struct("<IIQQQQQIIQQQQIiQIHHIIQQ")
+SECTION = struct.Struct("<QQ")
+HEADER = struct.Struct("<8sQQQQQQQQ32s")
+
+# PERF_SAMPLE_IDENTIFIER | IP | TID | TIME | CPU | PERIOD
+SAMPLE_TYPE = (1 << 16) | (1 << 0) | (1 << 1) | (1 << 2) | (1 << 7) | (1 << 8)
+
+# disabled, mmap, comm, freq, task, sample_id_all, exclude_guest
+FLAGS = (1 << 0) | (1 << 8) | (1 << 9) | (1 << 10) | (1 << 13) | (1 << 18) | (1 << 20)
+
+MISC_KERNEL = 1
+MISC_USER = 2
+MISC_COMM_EXEC = 1 << 13
+
+CPUS = range(8)
+
+# (type, config) of cycles and of the dummy event perf adds to track side
+# band events, and their ids on each CPU
+EVENTS = [(0, 0, [100 + cpu for cpu in CPUS]), (1, 9, [200 + cpu for cpu in CPUS])]
+
+KERNEL = 0xffffffff81000000
+COPY = 0xffffffff81234000
+TCP_RECVMSG = 0xffffffff81300000
+SKB_DATAGRAM_ITER = 0xffffffff81400000
+CPU_IDLE = 0xffffffff81500000
+POLL_RX_CQ = 0xffffffffc0a00000
+HANDLE_RX_CQE = 0xffffffffc0a01000
+
+
+def record(typ, misc, body):
+    return struct.pack("<IHH", typ, misc, 8 + len(body)) + body
+
+
+# Name padded with NULs to a multiple of 8 bytes
+def string(name):
+    name = name.encode() + b"\0"
+    return name + b"\0" * (-len(name) % 8)
+
+
+# Fields of sample_id_all after every non-sample record: TID, TIME, CPU and
+# IDENTIFIER
+def sample_id(pid, tid, time, cpu):
+    return struct.pack("<IIQIIQ", pid, tid, time, cpu, 0, EVENTS[0][2][cpu])
+
+
+def comm(pid, tid, name, time, cpu, misc=0):
+    return record(3, misc, struct.pack("<II", pid, tid) + string(name) + sample_id(pid, tid, time, cpu))
+
+
+def fork(pid, ppid, tid, ptid, time, cpu):
+    return record(7, 0, struct.pack("<IIIIQ", pid, ppid, tid, ptid, time) + sample_id(pid, tid, time, cpu))
+
+
+def mmap(pid, tid, addr, length, pgoff, name, time, cpu, misc):
+    return record(1, misc, struct.pack("<IIQQQ", pid, tid, addr, length, pgoff) + string(name) + sample_id(pid, tid, time, cpu))
+
+
+def sample(misc, ip, pid, tid, time, cpu, period):
+    return record(9, misc, struct.pack("<QQIIQIIQ", EVENTS[0][2][cpu], ip, pid, tid, time, cpu, 0, period))
+
+
+def finished_round():
+    return record(68, 0, b"")
+
+
+def records():
+    time = 1000
+    data = [
+        mmap(0xffffffff, 0xffffffff, KERNEL, 0x1000000, KERNEL, "[kernel.kallsyms]_text", 0, 0, MISC_KERNEL),
+        comm(100, 100, "bash", time, 1),
+        comm(100, 100, "iperf3", time + 1, 1, MISC_COMM_EXEC),
+        mmap(100, 100, 0x7f3a5c000000, 0x100000, 0, "/usr/lib/x86_64-linux-gnu/libc.so.6", time + 2, 1, MISC_USER),
+        fork(100, 100, 101, 100, time + 3, 5),
+        comm(200, 200, "ksoftirqd/1", time + 4, 2),
+        finished_round(),
+    ]
+
+    # (misc, ip, pid, tid, cpu, period), 100000 in total; thread 101 never
+    # sets its name and thread 300 has none
+    samples = [
+        (MISC_KERNEL, COPY + 0x10, 100, 101, 1, 30000),
+        (MISC_KERNEL, COPY + 0x30, 100, 101, 5, 10000),
+        (MISC_KERNEL, COPY + 0x20, 100, 100, 1, 10000),
+        (MISC_KERNEL, POLL_RX_CQ + 0x40, 200, 200, 2, 15000),
+        (MISC_KERNEL, CPU_IDLE + 0x8, 0, 0, 0, 5000),
+        (MISC_KERNEL, SKB_DATAGRAM_ITER + 0x100, 300, 300, 3, 2500),
+        (MISC_KERNEL, TCP_RECVMSG + 0x900, 100, 100, 1, 30),
+        (MISC_KERNEL, HANDLE_RX_CQE + 0x10, 200, 200, 2, 12),
+        (MISC_KERNEL, TCP_RECVMSG + 0x10, 200, 200, 2, 5),
+        (MISC_USER, 0x7f3a5c2e1a40, 100, 100, 1, 27453),
+    ]
+    for n, (misc, ip, pid, tid, cpu, period) in enumerate(samples):
+        data.append(sample(misc, ip, pid, tid, time + 10 + n, cpu, period))
+    data.append(finished_round())
+    return b"".join(data)
+
+
+def perf_data():
+    ids_offset = HEADER.size
+    ids = b"".join(struct.pack("<{}Q".format(len(event_ids)), *event_ids) for _, _, event_ids in EVENTS)
+
+    attrs = b""
+    offset = ids_offset
+    for typ, config, event_ids in EVENTS:
+        attrs += ATTR.pack(typ, ATTR.size, config, 4000, SAMPLE_TYPE, 0, FLAGS, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
+        attrs += SECTION.pack(offset, 8 * len(event_ids))
+        offset += 8 * len(event_ids)
+
+    attrs_offset = ids_offset + len(ids)
+    data_offset = attrs_offset + len(attrs)
+    data = records()
+    header = HEADER.pack(b"PERFILE2", HEADER.size, ATTR.size + SECTION.size, attrs_offset, len(attrs), data_offset, len(data), 0, 0, b"\0" * 32)
+    return header + ids + attrs + data
+
+
+if __name__ == "__main__":
+    with open(PATH, "wb") as f:
+        f.write(perf_data())
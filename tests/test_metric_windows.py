@@ -0,0 +1,34 @@
+import argparse
+
+from metric_windows import *
+
+
+def options(**flags):
+    args = argparse.Namespace(combined=False, steady_state=False, **{metric.name: False for metric in METRICS})
+    for name, value in flags.items():
+        setattr(args, name, value)
+    return args
+
+
+def test_plan_windows():
+    args = options(throughput=True, utilisation=True, util_breakdown=True, flame=True)
+    assert [window_prefix(window) for window in plan_windows(args, False)] == ["throughput", "utilisation", "util-breakdown", "flame"]
+    assert [window_prefix(window) for window in plan_windows(args, True)] == ["throughput+utilisation+util-breakdown", "flame"]
+
+
+def test_window_options_match():
+    args = options(combined=True, throughput=True)
+    assert window_options_mismatch(window_options(args), window_options(args)) is None
+
+
+def test_window_options_mismatch():
+    sender = window_options(options(throughput=True, utilisation=True))
+    receiver = window_options(options(combined=True, throughput=True))
+    assert window_options_mismatch(sender, receiver) == "--combined is set on the receiver but not on the sender. --utilisation is set on the sender but not on the receiver."
+
+
+# The receiver would wait for a steady-state window the sender never sends
+def test_steady_state_mismatch():
+    sender = window_options(options(throughput=True))
+    receiver = window_options(options(throughput=True, steady_state=True))
+    assert window_options_mismatch(sender, receiver) == "--steady-state is set on the receiver but not on the sender."
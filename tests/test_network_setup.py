@@ -0,0 +1,121 @@
+import os
+
+import pytest
+
+import network_setup
+from constants import *
+
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "ethtool", "rules.txt")
+
+# The rules of fixtures/ethtool/rules.txt: 1 matches on an IP address, 2 is
+# UDP, 3 matches on half of the port and 5 drops the packets
+INSTALLED = {
+    0: (30000, None, 2),
+    1: None,
+    2: None,
+    3: None,
+    4: (None, None, 5),
+    5: None,
+    1022: (None, 30001, 3),
+    1023: (None, 30000, 2),
+}
+
+
+# Runs ntuple_set_rules against the output of a fake ethtool -u (None if it
+# can't be read), and returns the commands it ran
+@pytest.fixture
+def ethtool(monkeypatch):
+    commands = []
+    monkeypatch.setattr(network_setup.os, "system", commands.append)
+
+    def run(output, rules):
+        monkeypatch.setattr(network_setup, "command_output", lambda args: output if args == ["ethtool", "-u", "eth0"] else None)
+        network_setup.ntuple_set_rules("eth0", rules)
+        return commands
+
+    return run
+
+
+def fixture_rules():
+    with open(RULES_PATH, "r") as f:
+        return f.read()
+
+
+def test_read_rules(monkeypatch):
+    monkeypatch.setattr(network_setup, "command_output", lambda args: fixture_rules())
+    assert network_setup.ntuple_read_rules("eth0") == INSTALLED
+
+
+def test_read_rules_unreadable(monkeypatch):
+    monkeypatch.setattr(network_setup, "command_output", lambda args: None)
+    assert network_setup.ntuple_read_rules("eth0") is None
+
+
+def test_read_rules_none_installed(monkeypatch):
+    monkeypatch.setattr(network_setup, "command_output", lambda args: "24 RX rings available\nTotal 0 rules\n\n")
+    assert network_setup.ntuple_read_rules("eth0") == {}
+
+
+@pytest.mark.parametrize("mask, wildcard", [
+    ("0xffff", True),
+    ("0xff", True),
+    ("0x0", False),
+    ("0xff00", False),
+    ("255.255.255.255", True),
+    ("255.255.255.0", False),
+    ("0.0.0.0", False),
+    ("FF:FF:FF:FF:FF:FF", True),
+    ("00:00:00:00:00:00", False),
+])
+def test_wildcard_mask(mask, wildcard):
+    assert network_setup.ntuple_wildcard_mask(mask) == wildcard
+
+
+# Only the rules that differ are deleted, and only the missing ones added
+def test_set_port_rules(ethtool):
+    rules = {}
+    for n, queue in enumerate([2, 3]):
+        rules.update(network_setup.ntuple_send_port_to_queue(BASE_PORT + n, queue, n))
+
+    assert ethtool(fixture_rules(), rules) == [
+        "ethtool -U eth0 delete 1",
+        "ethtool -U eth0 delete 2",
+        "ethtool -U eth0 delete 3",
+        "ethtool -U eth0 delete 4",
+        "ethtool -U eth0 delete 5",
+        "ethtool -U eth0 flow-type tcp4 dst-port 30001 action 3 loc 1",
+    ]
+
+
+def test_set_all_traffic_rule(ethtool):
+    assert ethtool(fixture_rules(), network_setup.ntuple_send_all_traffic_to_queue(5, 0)) == [
+        "ethtool -U eth0 delete {}".format(loc) for loc in sorted(INSTALLED)
+    ] + [
+        "ethtool -U eth0 flow-type tcp4 action 5 loc 0",
+    ]
+
+
+def test_set_same_rules(ethtool):
+    rules = {loc: rule for loc, rule in INSTALLED.items() if rule is not None}
+    assert ethtool(fixture_rules(), rules) == [
+        "ethtool -U eth0 delete 1",
+        "ethtool -U eth0 delete 2",
+        "ethtool -U eth0 delete 3",
+        "ethtool -U eth0 delete 5",
+    ]
+
+
+def test_clear_rules(ethtool):
+    assert ethtool(fixture_rules(), {}) == ["ethtool -U eth0 delete {}".format(loc) for loc in sorted(INSTALLED)]
+
+
+# Without ethtool -u, every location is cleared before adding the rules
+def test_set_rules_unreadable(ethtool):
+    rules = network_setup.ntuple_send_port_to_queue(BASE_PORT, 2, 0)
+    assert ethtool(None, rules) == [
+        "ethtool -U eth0 delete {} 2> /dev/null > /dev/null".format(loc) for loc in range(MAX_RULE_LOC + 1)
+    ] + [
+        "ethtool -U eth0 flow-type tcp4 dst-port 30000 action 2 loc 0",
+        "ethtool -U eth0 flow-type tcp4 src-port 30000 action 2 loc 1023",
+    ]
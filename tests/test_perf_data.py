@@ -0,0 +1,90 @@
+import gzip
+import os
+
+import pytest
+
+from perf_data import *
+
+
+# perf.data is written by make_perf_data.py next to it, for the edge cases of
+# the reader; captures/<name> are recorded by perf with capture.sh, along with
+# the report of perf on them
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "perf")
+PERF_DATA_PATH = os.path.join(FIXTURES, "perf.data")
+CAPTURES_PATH = os.path.join(FIXTURES, "captures")
+
+
+def captures():
+    names = sorted(os.listdir(CAPTURES_PATH)) if os.path.isdir(CAPTURES_PATH) else []
+    return names or [pytest.param(None, marks=pytest.mark.skip(reason="no perf captures in {}, record one with capture.sh".format(CAPTURES_PATH)))]
+
+
+@pytest.fixture
+def kallsyms():
+    return Kallsyms(os.path.join(FIXTURES, "kallsyms"))
+
+
+@pytest.mark.parametrize("capture", captures())
+def test_matches_perf_report(capture, tmp_path):
+    path = os.path.join(CAPTURES_PATH, capture)
+    kallsyms_path = tmp_path / "kallsyms"
+    with gzip.open(os.path.join(path, "kallsyms.gz"), "rb") as f:
+        kallsyms_path.write_bytes(f.read())
+    with open(os.path.join(path, "perf-report.txt"), "r") as f:
+        expected = f.read().splitlines()
+
+    lines = perf_report_lines(kernel_profile(os.path.join(path, "perf.data"), Kallsyms(str(kallsyms_path))))
+    assert len(lines) > 0
+    assert compare_reports(lines, expected) == []
+
+
+# What the reader makes of the synthetic recording: shares of all the samples
+# (user space included), the last name of a thread, and the name of the parent
+# for a thread that never set its own
+# These are the conventions of perf report, which only the captures check
+def test_synthetic_profile(kallsyms):
+    assert perf_report_lines(kernel_profile(PERF_DATA_PATH, kallsyms)) == [
+        "    50.00%  iperf3  [kernel.kallsyms]  [k] copy_user_enhanced_fast_string\n",
+        "    15.00%  ksoftirqd/1  [mlx5_core]  [k] mlx5e_poll_rx_cq\n",
+        "     5.00%  swapper  [kernel.kallsyms]  [k] arch_cpu_idle\n",
+        "     2.50%  :300  [kernel.kallsyms]  [k] __skb_datagram_iter\n",
+        "     0.03%  iperf3  [kernel.kallsyms]  [k] tcp_recvmsg\n",
+        "     0.01%  ksoftirqd/1  [mlx5_core]  [k] mlx5e_handle_rx_cqe\n",
+    ]
+
+
+# Data symbols are skipped, and module symbols are in their module
+def test_kallsyms(kallsyms):
+    assert kallsyms.lookup(0xffffffff81300900) == ("tcp_recvmsg", "[kernel.kallsyms]")
+    assert kallsyms.lookup(0xffffffffc0a00040) == ("mlx5e_poll_rx_cq", "[mlx5_core]")
+    assert kallsyms.lookup(0xffffffff80000000) == ("0xffffffff80000000", "[unknown]")
+
+
+def test_kallsyms_hidden(tmp_path):
+    path = tmp_path / "kallsyms"
+    path.write_text("0000000000000000 T _stext\n0000000000000000 t tcp_recvmsg\n")
+    with pytest.raises(ValueError):
+        Kallsyms(str(path))
+
+
+# The thread forked by iperf3 takes its name, the thread that never named
+# itself is shown by its TID
+def test_samples():
+    periods, total_period, comms = read_kernel_samples(PERF_DATA_PATH)
+    assert total_period == 100000
+    assert sum(periods.values()) == 100000 - 27453
+    assert comms == {0: "swapper", 100: "iperf3", 101: "iperf3", 200: "ksoftirqd/1"}
+    assert periods[(5, 101, 0xffffffff81234030)] == 10000
+
+
+def test_compare_reports():
+    lines = ["    50.00%  iperf3  [kernel.kallsyms]  [k] copy_user_enhanced_fast_string\n"]
+    assert compare_reports(lines, ["    50.01%  iperf3  [kernel.kallsyms]  [k] copy_user_enhanced_fast_string"]) == []
+    assert compare_reports(lines, ["    49.00%  iperf3  [kernel.kallsyms]  [k] copy_user_enhanced_fast_string"]) == [(("iperf3", "[kernel.kallsyms]", "copy_user_enhanced_fast_string"), 50.0, 49.0)]
+
+
+def test_not_perf_data(tmp_path):
+    path = tmp_path / "perf.data"
+    path.write_bytes(b"PERFFILE" + bytes(96))
+    with pytest.raises(ValueError):
+        read_kernel_samples(str(path))
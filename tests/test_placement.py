@@ -0,0 +1,55 @@
+import pytest
+
+from placement import *
+from test_topology import ROOT
+
+
+# ens1f0 is on node 1 (CPUs 2-3 and 6-7, cores 2/6 and 3/7), with its RX
+# queues on CPUs 2, 3, 6 and 7
+@pytest.fixture
+def topology():
+    return discover_topology("ens1f0", ROOT)
+
+
+def test_node_cores(topology):
+    assert node_cores(topology, 0) == [[0, 4], [1, 5]]
+    assert node_cores(topology, 1) == [[2, 6], [3, 7]]
+    assert spread_cpus(topology, [1]) == [2, 3, 6, 7]
+    assert spread_cpus(topology, [0, 1]) == [0, 1, 2, 3, 4, 5, 6, 7]
+
+
+@pytest.mark.parametrize("policy, cpus, affinity", [
+    ("nic-local", [2, 6], [3, 7]),
+    ("cross-numa", [0, 1], [2, 3]),
+    ("smt-shared", [2, 3], [6, 7]),
+])
+def test_one_to_one(topology, policy, cpus, affinity):
+    plan = plan_placement(topology, policy, "one-to-one", 2, "receiver")
+    assert plan == {"cpus": cpus, "affinity": affinity, "steering": [(BASE_PORT, affinity[0]), (BASE_PORT + 1, affinity[1])]}
+
+    # Every IRQ CPU has an RX queue to steer the traffic to
+    assert all(cpu in topology["cpu_queues"] for _, cpu in plan["steering"])
+
+
+def test_smt_isolated(topology):
+    assert plan_placement(topology, "smt-isolated", "single", 1, "sender") == {"cpus": [2], "affinity": [3], "steering": [(None, 3)]}
+    with pytest.raises(ValueError, match="node 1 has room for 1"):
+        plan_placement(topology, "smt-isolated", "one-to-one", 2, "receiver")
+
+
+# Outcast runs all the connections on one CPU of the sender
+def test_single_cpu(topology):
+    assert plan_placement(topology, "nic-local", "outcast", 4, "sender") == {"cpus": [2], "affinity": [3], "steering": [(None, 3)]}
+    assert plan_placement(topology, "nic-local", "outcast", 2, "receiver")["cpus"] == [2, 6]
+
+
+def test_all_to_all(topology):
+    assert plan_placement(topology, "cross-numa", "all-to-all", 2, "sender") == {"cpus": [0, 1], "affinity": list(range(8)), "steering": []}
+
+
+# Without a node for the NIC, the node of the first CPU is the local one
+def test_no_iface_node():
+    topology = discover_topology("ens3", ROOT)
+    assert plan_placement(topology, "nic-local", "one-to-one", 2, "receiver")["cpus"] == [0, 4]
+    with pytest.raises(ValueError):
+        plan_placement(topology, "nic-local", "one-to-one", 3, "receiver")
@@ -0,0 +1,39 @@
+import random
+
+from stats import *
+
+
+def test_bootstrap_difference():
+    low, high = bootstrap_difference([10.0, 10.2], [10.3, 10.5])
+    assert low <= 0.3 <= high
+    assert bootstrap_difference([10.0], [10.3, 10.5]) is None
+
+
+# Two trials on each side can't tell anything apart: 2 of the 6 splits are as
+# far apart as the trials themselves
+def test_permutation_test_few_trials():
+    assert permutation_test([10.0, 10.2], [10.3, 10.5]) == 2 / 6
+    assert permutation_test([1., 2., 3., 4.], [11., 12., 13., 14.]) == 2 / 70
+    assert permutation_test([1., 1., 1.], [1., 1., 1.]) == 1.
+
+
+# Past PERMUTATION_SPLITS splits, they're drawn at random
+def test_permutation_test_many_trials():
+    a = [float(n) for n in range(10)]
+    b = [n + 10. for n in range(10)]
+    assert permutation_test(a, b) == 1 / (PERMUTATION_SPLITS + 1)
+    assert permutation_test(a, b) == permutation_test(list(reversed(a)), b)
+    assert permutation_test(a, a) == 1.
+
+
+# Trials of the same distribution are flagged at most as often as the level
+def test_permutation_test_false_positives():
+    rng = random.Random(0)
+    for n in [2, 3, 5]:
+        runs = 300
+        flagged = sum(1 for _ in range(runs) if permutation_test([rng.gauss(10, 1) for _ in range(n)], [rng.gauss(10, 1) for _ in range(n)]) < 0.05)
+        assert flagged / runs <= 0.08
+
+
+def test_benjamini_hochberg():
+    assert benjamini_hochberg([0.01, 0.04, 0.03, 0.5]) == [0.04, 0.04 * 4 / 3, 0.04 * 4 / 3, 0.5]
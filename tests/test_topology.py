@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+from topology import *
+
+
+# sys and proc of a host with 8 CPUs on 2 nodes (node 0 has 0-1 and 4-5), where
+# CPU n and n + 4 are SMT siblings, with the interfaces:
+# ens1f0: mlx5 on node 1, 4 RX queues but 8 completion IRQs, next to the other
+#     port of the NIC (0000:3b:00.1)
+# eth1: i40e on node 0, next to the IRQs of eth10
+# ens3: virtio (virtio0) without a node, next to the IRQs of virtio1
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "topology")
+
+
+def test_parse_cpu_list():
+    assert parse_cpu_list("0-3,8-11") == [0, 1, 2, 3, 8, 9, 10, 11]
+    assert parse_cpu_list("5") == [5]
+    assert parse_cpu_list("") == []
+    assert parse_cpu_list(None) == []
+    assert format_cpu_list([0, 1, 2, 3, 8, 9, 10, 11]) == "0-3,8-11"
+    assert format_cpu_list([4, 0]) == "0,4"
+
+
+def test_cpus():
+    topology = discover_topology(root=ROOT)
+    assert topology["cpus"] == list(range(8))
+    assert topology["nodes"] == {0: 0, 1: 0, 2: 1, 3: 1, 4: 0, 5: 0, 6: 1, 7: 1}
+    assert topology["siblings"] == {cpu: [cpu % 4, cpu % 4 + 4] for cpu in range(8)}
+    assert topology["iface"] is None
+    assert topology["queue_cpus"] == {}
+
+
+# The completion IRQs past the RX queues are left out, and the async IRQ and
+# the IRQs of the other port don't count
+# IRQ 44 (comp3) has no effective affinity, IRQ 43 (comp2) an effective
+# affinity narrower than its affinity
+def test_mlx5():
+    assert interface_pci_slot(ROOT, "ens1f0") == "0000:3b:00.0"
+    assert count_rx_queues(ROOT, "ens1f0") == 4
+    assert discover_queue_irqs(ROOT, "ens1f0") == {n: 41 + n for n in range(8)}
+
+    topology = discover_topology("ens1f0", ROOT)
+    assert topology["iface_node"] == 1
+    assert topology["queue_cpus"] == {0: 2, 1: 3, 2: 6, 3: 7}
+    assert topology["cpu_queues"] == {2: 0, 3: 1, 6: 2, 7: 3}
+
+
+def test_txrx():
+    assert discover_queue_irqs(ROOT, "eth1") == {0: 61, 1: 62}
+
+    topology = discover_topology("eth1", ROOT)
+    assert topology["iface_node"] == 0
+    assert topology["queue_cpus"] == {0: 0, 1: 6}
+    assert topology["cpu_queues"] == {0: 0, 6: 1}
+
+
+# Both RX queues are on the two hyperthreads of a core
+def test_virtio():
+    assert interface_pci_slot(ROOT, "ens3") is None
+    assert interface_device_name(ROOT, "ens3") == "virtio0"
+    assert discover_queue_irqs(ROOT, "ens3") == {0: 26, 1: 28}
+
+    topology = discover_topology("ens3", ROOT)
+    assert topology["iface_node"] is None
+    assert topology["queue_cpus"] == {0: 1, 1: 5}
+    assert topology["cpu_queues"] == {1: 0, 5: 1}
+    assert topology["siblings"][1] == topology["siblings"][5]
+
+
+def test_missing_iface():
+    topology = discover_topology("eth9", ROOT)
+    assert topology["iface_node"] is None
+    assert topology["queue_cpus"] == {}
+
+
+@pytest.mark.parametrize("name, queue", [
+    ("mlx5_comp3@pci:0000:3b:00.0", 3),
+    ("i40e-eth1-TxRx-12", 12),
+    ("eth1-rx-2", 2),
+    ("virtio0-input.1", 1),
+    ("mlx5_async0@pci:0000:3b:00.0", None),
+    ("virtio0-output.1", None),
+    ("i40e-0000:5e:00.0:misc", None),
+])
+def test_rx_queue_irq_name(name, queue):
+    match = RX_QUEUE_IRQ_NAME.search(name.split("@")[0])
+    assert (None if match is None else int(match.group(2))) == queue
+
+
+# The topology survives the JSON cache
+def test_load_topology():
+    topology = discover_topology("ens1f0", ROOT)
+    assert load_topology(json.loads(json.dumps(topology))) == topology
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import re
+import socket
+from constants import *
+
+
+# IRQs of the RX queues are named after the queue (e.g., mlx5_comp3@pci:...,
+# eth0-TxRx-3 or virtio0-input.3)
+RX_QUEUE_IRQ_NAME = re.compile(r"(comp|rx|input)\D*(\d+)$", re.IGNORECASE)
+
+
+# Contents of a file under root, or None if it can't be read
+def read_file(root, path):
+    try:
+        with open(os.path.join(root, path.lstrip("/")), "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+# CPUs of a sysfs CPU list (e.g., "0-3,8-11")
+def parse_cpu_list(text):
+    cpus = []
+    for part in (text or "").split(","):
+        low, sep, high = part.strip().partition("-")
+        if low.isdigit():
+            cpus += list(range(int(low), int(high) + 1)) if sep != "" and high.isdigit() else [int(low)]
+    return sorted(set(cpus))
+
+
+# Inverse of parse_cpu_list
+def format_cpu_list(cpus):
+    ranges = []
+    for cpu in sorted(cpus):
+        if len(ranges) > 0 and ranges[-1][1] == cpu - 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(str(low) if low == high else "{}-{}".format(low, high) for low, high in ranges)
+
+
+def discover_cpus(root):
+    cpus = parse_cpu_list(read_file(root, "/sys/devices/system/cpu/online"))
+    if len(cpus) == 0:
+        names = os.listdir(os.path.join(root, "sys/devices/system/cpu"))
+        cpus = sorted(int(name[3:]) for name in names if re.match(r"cpu\d+$", name))
+    return cpus
+
+
+# NUMA node of every CPU (all of them are on node 0 without NUMA)
+def discover_nodes(root, cpus):
+    nodes = {cpu: 0 for cpu in cpus}
+    try:
+        names = os.listdir(os.path.join(root, "sys/devices/system/node"))
+    except OSError:
+        return nodes
+
+    for name in names:
+        if re.match(r"node\d+$", name):
+            for cpu in parse_cpu_list(read_file(root, "/sys/devices/system/node/{}/cpulist".format(name))):
+                if cpu in nodes:
+                    nodes[cpu] = int(name[4:])
+    return nodes
+
+
+# SMT siblings of every CPU, including the CPU itself
+def discover_siblings(root, cpus):
+    siblings = {}
+    for cpu in cpus:
+        siblings[cpu] = [sibling for sibling in parse_cpu_list(read_file(root, "/sys/devices/system/cpu/cpu{}/topology/thread_siblings_list".format(cpu))) if sibling in cpus] or [cpu]
+    return siblings
+
+
+# PCI address of the device of an interface (e.g., 0000:3b:00.0), or None
+def interface_pci_slot(root, iface):
+    for line in (read_file(root, "/sys/class/net/{}/device/uevent".format(iface)) or "").splitlines():
+        name, _, value = line.partition("=")
+        if name == "PCI_SLOT_NAME":
+            return value
+    return None
+
+
+# Name of the device of an interface (e.g., virtio0 or the PCI address), from
+# the device symlink, or None
+def interface_device_name(root, iface):
+    path = os.path.join(root, "sys/class/net/{}/device".format(iface))
+    return os.path.basename(os.readlink(path)) if os.path.islink(path) else None
+
+
+def count_rx_queues(root, iface):
+    try:
+        return sum(1 for name in os.listdir(os.path.join(root, "sys/class/net/{}/queues".format(iface))) if name.startswith("rx-"))
+    except OSError:
+        return 0
+
+
+# IRQ of every RX queue of an interface, from the names of the IRQs of its
+# device in /proc/interrupts
+# The IRQs are named after the interface, its PCI address or its device
+# (virtio), which must not be followed by more of a name (eth1 vs eth10)
+def discover_queue_irqs(root, iface):
+    names = set(name for name in [iface, interface_pci_slot(root, iface), interface_device_name(root, iface)] if name is not None)
+    device = re.compile("|".join(r"(?<![0-9A-Za-z]){}(?![0-9A-Za-z])".format(re.escape(name)) for name in sorted(names)))
+    irqs = {}
+    for line in (read_file(root, "/proc/interrupts") or "").splitlines():
+        comps = line.split()
+        if len(comps) < 2 or not comps[0].endswith(":") or not comps[0][:-1].isdigit():
+            continue
+
+        # The name is the last column; drop the device suffix of mlx5
+        # (@pci:<slot>) before looking for the queue number
+        name = comps[-1]
+        match = RX_QUEUE_IRQ_NAME.search(name.split("@")[0])
+        if match is not None and device.search(name) is not None:
+            irqs.setdefault(int(match.group(2)), int(comps[0][:-1]))
+    return irqs
+
+
+# CPU an IRQ is delivered to (the first one if it's spread over several)
+def irq_cpu(root, irq):
+    for name in ["effective_affinity_list", "smp_affinity_list"]:
+        cpus = parse_cpu_list(read_file(root, "/proc/irq/{}/{}".format(irq, name)))
+        if len(cpus) > 0:
+            return cpus[0]
+    return None
+
+
+# Discover the CPUs of a host, their NUMA nodes and SMT siblings, and (given
+# an interface) the CPU the IRQ of each RX queue lands on
+# root is prepended to every path, so that a captured copy of /sys and /proc
+# can be read instead
+def discover_topology(iface=None, root="/"):
+    cpus = discover_cpus(root)
+    topology = {
+        "cpus": cpus,
+        "nodes": discover_nodes(root, cpus),
+        "siblings": discover_siblings(root, cpus),
+        "iface": iface,
+        "iface_node": None,
+        "queue_cpus": {},
+        "cpu_queues": {},
+    }
+    if iface is None:
+        return topology
+
+    # The node of the NIC is -1 if the platform doesn't tell
+    node = read_file(root, "/sys/class/net/{}/device/numa_node".format(iface))
+    if node is not None and node.lstrip("-").isdigit() and int(node) >= 0:
+        topology["iface_node"] = int(node)
+
+    # mlx5 has a completion IRQ for every CPU, even if there are fewer queues
+    num_queues = count_rx_queues(root, iface)
+    for queue, irq in sorted(discover_queue_irqs(root, iface).items()):
+        cpu = irq_cpu(root, irq)
+        if queue < num_queues and cpu is not None:
+            topology["queue_cpus"][queue] = cpu
+            topology["cpu_queues"].setdefault(cpu, queue)
+    return topology
+
+
+# JSON turns the CPUs and queues used as keys into strings
+def load_topology(topology):
+    for key in ["nodes", "siblings", "queue_cpus", "cpu_queues"]:
+        topology[key] = {int(k): v for k, v in topology[key].items()}
+    return topology
+
+
+# Topology of this host (see discover_topology), cached in TOPOLOGY_CACHE_PATH
+# until the host reboots
+# refresh discovers it again (e.g., after the IRQ affinity changed)
+def host_topology(iface=None, root="/", refresh=False):
+    if root != "/":
+        return discover_topology(iface, root)
+
+    path = TOPOLOGY_CACHE_PATH.format(socket.gethostname())
+    boot_id = read_file(root, "/proc/sys/kernel/random/boot_id")
+    cache = {}
+    try:
+        with open(path, "r") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    if cache.get("boot_id") != boot_id:
+        cache = {"boot_id": boot_id, "topologies": {}}
+    key = iface or ""
+    if not refresh and key in cache["topologies"]:
+        return load_topology(cache["topologies"][key])
+
+    topology = discover_topology(iface, root)
+    cache["topologies"][key] = topology
+    try:
+        with open(path, "w") as f:
+            json.dump(cache, f)
+    except OSError:
+        pass
+    return topology
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the CPU, NUMA and RX queue topology of the host.")
+    parser.add_argument("iface", type=str, nargs="?", default=None, help="Network interface whose RX queues to map to CPUs.")
+    parser.add_argument("--root", type=str, default="/", help="Read /sys and /proc under this directory (e.g., a copy captured on another host).")
+    parser.add_argument("--refresh", action="store_true", help="Discover the topology again instead of using the cached one.")
+    args = parser.parse_args()
+
+    topology = host_topology(args.iface, args.root, args.refresh)
+    print("\t".join(["cpu", "node", "siblings"] + (["rx queue"] if args.iface is not None else [])))
+    for cpu in topology["cpus"]:
+        columns = [str(cpu), str(topology["nodes"][cpu]), format_cpu_list(topology["siblings"][cpu])]
+        if args.iface is not None:
+            columns.append(str(topology["cpu_queues"].get(cpu, "-")))
+        print("\t".join(columns))
+
+    if args.iface is not None:
+        print("{} is on node {}, {} RX queues mapped to CPUs".format(args.iface, "-" if topology["iface_node"] is None else topology["iface_node"], len(topology["queue_cpus"])))
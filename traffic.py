@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+
+import argparse
+import errno
+import fcntl
+import mmap
+import os
+import selectors
+import socket
+import struct
+import tempfile
+import time
+
+
+# Size of each send/recv call (same as the iperf default)
+BUFFER_SIZE = 128 * 1024
+
+# Interval between reports (seconds)
+INTERVAL = 1
+
+# How long to retry connecting to a server that is still starting (seconds)
+CONNECT_TIMEOUT = 5
+CONNECT_RETRY_INTERVAL = 0.01
+
+# Size of the file the sendfile/splice modes send from
+SOURCE_SIZE = 64 * BUFFER_SIZE
+
+# MSG_ZEROCOPY constants from the kernel headers (not exported by Python)
+SO_ZEROCOPY = 60
+MSG_ZEROCOPY = 0x4000000
+SO_EE_ORIGIN_ZEROCOPY = 5
+SO_EE_CODE_ZEROCOPY_COPIED = 1
+
+# struct sock_extended_err
+EXTENDED_ERR = struct.Struct("=IBBBBII")
+
+# Reap the zerocopy completions once this many sends are outstanding
+MAX_ZEROCOPY_PENDING = 32
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run all the flows of a CPU in a single process.")
+
+    # Add arguments
+    parser.add_argument("mode", choices=["client", "server"], help="Send or receive traffic.")
+    parser.add_argument("--addr", type=str, help="Address of the receiver interface (client only).")
+    parser.add_argument("--ports", type=int, nargs="+", required=True, help="Ports of the flows.")
+    parser.add_argument("--duration", type=int, default=20, help="Duration of the flows in seconds (client only).")
+    parser.add_argument("--window", type=float, default=None, help="Specify the socket buffer size (KB).")
+    parser.add_argument("--send-mode", choices=["write", "sendfile", "zerocopy", "splice"], default="write", help="How to send data (client only).")
+
+    # Parse and verify arguments
+    args = parser.parse_args()
+    if args.mode == "client" and args.addr is None:
+        print("Please provide --addr.")
+        exit(1)
+
+    return args
+
+
+def set_window(sock, window):
+    if window is not None:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, int(window * 1024))
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, int(window * 1024))
+
+
+# Byte counts of a single flow, reported in the same format as iperf
+class Flow:
+    def __init__(self, flow_id, sock, start):
+        self.id = flow_id
+        self.sock = sock
+        self.start = start
+        self.reported = start
+        self.interval_bytes = 0
+        self.total_bytes = 0
+
+    def count(self, num_bytes):
+        self.interval_bytes += num_bytes
+        self.total_bytes += num_bytes
+
+    def print_interval(self, begin, end, num_bytes):
+        rate = 0 if end == begin else num_bytes * 8 / (end - begin) / 1e9
+        print("[{:3d}] {:4.1f}-{:4.1f} sec  {:.2f} GBytes  {:.2f} Gbits/sec".format(self.id, begin - self.start, end - self.start, num_bytes / 2 ** 30, rate), flush=True)
+
+    # Report the intervals that are over
+    # Intervals end at start + k * INTERVAL like iperf's, however late the
+    # report comes (the late bytes count towards the interval that just ended)
+    def report(self, now):
+        while now - self.reported >= INTERVAL:
+            self.print_interval(self.reported, self.reported + INTERVAL, self.interval_bytes)
+            self.reported += INTERVAL
+            self.interval_bytes = 0
+
+    # Report the last (partial) interval if anything was sent in it, and the
+    # whole flow
+    # A remainder shorter than half an interval (e.g., the few ms between the
+    # last boundary and the sender closing the flow) only counts in the total,
+    # so that the output has a line per second and the total, like iperf's
+    def finish(self, now):
+        self.report(now)
+        if now - self.reported >= INTERVAL / 2 and self.interval_bytes > 0:
+            self.print_interval(self.reported, now, self.interval_bytes)
+        self.print_interval(self.start, now, self.total_bytes)
+
+
+# Plain copying send() from a user buffer
+class WriteSender:
+    def __init__(self, sock, source):
+        self.sock = sock
+        self.buf = memoryview(bytearray(BUFFER_SIZE))
+
+    def send(self):
+        return self.sock.send(self.buf)
+
+    def summary(self):
+        return None
+
+
+# sendfile() from a file kept in the page cache
+class SendfileSender:
+    def __init__(self, sock, source):
+        self.sock = sock
+        self.source = source
+        self.offset = 0
+
+    def send(self):
+        sent = os.sendfile(self.sock.fileno(), self.source.fileno(), self.offset, min(BUFFER_SIZE, SOURCE_SIZE - self.offset))
+        self.offset = (self.offset + sent) % SOURCE_SIZE
+        return sent
+
+    def summary(self):
+        return None
+
+
+# send() with MSG_ZEROCOPY, reaping the completions from the error queue
+# The buffer is never modified, so it can be reused before its sends complete
+class ZerocopySender:
+    def __init__(self, sock, source):
+        self.sock = sock
+        self.buf = memoryview(bytearray(BUFFER_SIZE))
+        self.sock.setsockopt(socket.SOL_SOCKET, SO_ZEROCOPY, 1)
+        self.num_sends = 0
+        self.num_completed = 0
+        self.num_copied = 0
+
+    def send(self):
+        if self.num_sends - self.num_completed >= MAX_ZEROCOPY_PENDING:
+            self.reap()
+
+        try:
+            sent = self.sock.send(self.buf, MSG_ZEROCOPY)
+        except OSError as e:
+            # Too many outstanding sends
+            if e.errno != errno.ENOBUFS:
+                raise
+            self.reap()
+            return 0
+
+        self.num_sends += 1
+        return sent
+
+    # Each completion covers the range of sends [ee_info, ee_data]
+    def reap(self):
+        while True:
+            try:
+                _, ancdata, _, _ = self.sock.recvmsg(0, socket.CMSG_SPACE(EXTENDED_ERR.size + 16), socket.MSG_ERRQUEUE)
+            except BlockingIOError:
+                return
+
+            for _, _, data in ancdata:
+                _, origin, _, code, _, first, last = EXTENDED_ERR.unpack_from(data)
+                if origin == SO_EE_ORIGIN_ZEROCOPY:
+                    self.num_completed += last - first + 1
+                    if code & SO_EE_CODE_ZEROCOPY_COPIED:
+                        self.num_copied += last - first + 1
+
+    # The kernel falls back to copying when it can't send from user pages
+    # (e.g., over loopback), which makes the mode pointless
+    def summary(self):
+        self.reap()
+        return "zerocopy: {} sends, {} completed, {} copied".format(self.num_sends, self.num_completed, self.num_copied)
+
+
+# splice() from a file into a pipe, and from the pipe into the socket
+class SpliceSender:
+    def __init__(self, sock, source):
+        self.sock = sock
+        self.source = source
+        self.offset = 0
+        self.pipe_r, self.pipe_w = os.pipe()
+        fcntl.fcntl(self.pipe_w, fcntl.F_SETPIPE_SZ, BUFFER_SIZE)
+        self.pending = 0
+
+    def send(self):
+        # Refill the pipe once the socket took everything in it
+        if self.pending == 0:
+            self.pending = os.splice(self.source.fileno(), self.pipe_w, min(BUFFER_SIZE, SOURCE_SIZE - self.offset), offset_src=self.offset)
+            self.offset = (self.offset + self.pending) % SOURCE_SIZE
+
+        sent = os.splice(self.pipe_r, self.sock.fileno(), self.pending, flags=os.SPLICE_F_MOVE | os.SPLICE_F_NONBLOCK)
+        self.pending -= sent
+        return sent
+
+    def summary(self):
+        os.close(self.pipe_r)
+        os.close(self.pipe_w)
+        return None
+
+
+SEND_MODES = {
+    "write": WriteSender,
+    "sendfile": SendfileSender,
+    "zerocopy": ZerocopySender,
+    "splice": SpliceSender,
+}
+
+
+# File the sendfile/splice modes send from
+# It's filled through a memory mapping so that all its pages are in memory
+def create_source():
+    source = tempfile.TemporaryFile()
+    source.truncate(SOURCE_SIZE)
+    with mmap.mmap(source.fileno(), SOURCE_SIZE) as m:
+        m.write(b"\xaa" * SOURCE_SIZE)
+
+    return source
+
+
+# Time till the next report is due
+def next_report(flows, now):
+    if len(flows) == 0:
+        return None
+    return max(0, min(flow.reported for flow in flows) + INTERVAL - now)
+
+
+def connect(addr, port, window):
+    deadline = time.monotonic() + CONNECT_TIMEOUT
+    while True:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        set_window(sock, window)
+        try:
+            sock.connect((addr, port))
+            sock.setblocking(False)
+            return sock
+        except ConnectionRefusedError:
+            sock.close()
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(CONNECT_RETRY_INTERVAL)
+
+
+# Send on all the flows till the duration is over
+def run_client(args):
+    sel = selectors.DefaultSelector()
+    source = create_source() if args.send_mode in ["sendfile", "splice"] else None
+
+    # Open all the connections first so that all flows start together
+    socks = []
+    for port in args.ports:
+        socks.append(connect(args.addr, port, args.window))
+
+    start = time.monotonic()
+    end = start + args.duration
+    flows = [Flow(n + 1, sock, start) for n, sock in enumerate(socks)]
+    senders = [SEND_MODES[args.send_mode](sock, source) for sock in socks]
+    for flow, sender in zip(flows, senders):
+        sel.register(flow.sock, selectors.EVENT_WRITE, (flow, sender))
+
+    # The sender stops the flows early with SIGINT (like iperf)
+    now = start
+    try:
+        while now < end:
+            for key, _ in sel.select(min(end - now, next_report(flows, now))):
+                flow, sender = key.data
+                try:
+                    flow.count(sender.send())
+                except BlockingIOError:
+                    pass
+
+            now = time.monotonic()
+            for flow in flows:
+                flow.report(now)
+    except KeyboardInterrupt:
+        now = time.monotonic()
+
+    for flow, sender in zip(flows, senders):
+        flow.finish(now)
+        summary = sender.summary()
+        if summary is not None:
+            print("flow {} {}".format(flow.id, summary), flush=True)
+        sel.unregister(flow.sock)
+        flow.sock.close()
+
+
+# Receive on all the ports till killed
+def run_server(args):
+    sel = selectors.DefaultSelector()
+    buf = bytearray(BUFFER_SIZE)
+
+    for port in args.ports:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        set_window(sock, args.window)
+        sock.bind(("0.0.0.0", port))
+        sock.listen()
+        sock.setblocking(False)
+        sel.register(sock, selectors.EVENT_READ, None)
+
+    flows = set()
+    num_flows = 0
+    while True:
+        for key, _ in sel.select(next_report(flows, time.monotonic())):
+            # New flow
+            if key.data is None:
+                sock, _ = key.fileobj.accept()
+                sock.setblocking(False)
+                num_flows += 1
+                flow = Flow(num_flows, sock, time.monotonic())
+                flows.add(flow)
+                sel.register(sock, selectors.EVENT_READ, flow)
+                continue
+
+            flow = key.data
+            try:
+                num_bytes = flow.sock.recv_into(buf)
+            except BlockingIOError:
+                continue
+            except ConnectionError:
+                num_bytes = 0
+
+            # The sender closed the flow
+            if num_bytes == 0:
+                flow.finish(time.monotonic())
+                flows.remove(flow)
+                sel.unregister(flow.sock)
+                flow.sock.close()
+            else:
+                flow.count(num_bytes)
+
+        now = time.monotonic()
+        for flow in flows:
+            flow.report(now)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.mode == "client":
+        run_client(args)
+    else:
+        run_server(args)